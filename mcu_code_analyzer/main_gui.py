@@ -17,6 +17,15 @@ import tempfile
 import webbrowser
 import shutil
 import traceback
+import hashlib
+import subprocess
+import functools
+import bisect
+import importlib.util
+import io
+import string
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 
 # 版本管理
 try:
@@ -45,7 +54,6 @@ try:
     from core.chip_detector import ChipDetector, ChipInfo
 except ImportError:
     # Fallback: try absolute import
-    import importlib.util
     core_path = os.path.join(current_dir, 'core', 'chip_detector.py')
     if os.path.exists(core_path):
         spec = importlib.util.spec_from_file_location("chip_detector", core_path)
@@ -141,6 +149,949 @@ try:
 except ImportError:
     MATPLOTLIB_AVAILABLE = False
 
+# 调试日志前缀（debug_log输出的消息带此前缀）
+_DEBUG_LOG_PREFIX = "🔧 DEBUG:"
+
+# 内置mermaid.js版本（参与SVG缓存键计算，升级后旧缓存自动失效）
+_MERMAID_JS_VERSION = "10.6.1"
+
+# 内置mermaid.js路径（导入时解析一次，渲染时不再重复拼路径和stat）
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_MERMAID_JS_PATH = os.path.join(_SCRIPT_DIR, "assets", "mermaid.min.js")
+_MERMAID_JS_EXISTS = os.path.exists(_MERMAID_JS_PATH)
+
+# Mermaid解析用正则（模块加载时编译一次）
+_MERMAID_NODE_QUOTED_RE = re.compile(r'(\w+)\["([^"]+)"\]')
+_MERMAID_NODE_BRACKET_RE = re.compile(r'(\w+)\[([^\]]+)\]')
+_MERMAID_ARROW_RE = re.compile(r'^[ \t]*(.+?)-->(.+?)[ \t]*$', re.M)
+_MERMAID_EDGE_RE = re.compile(r'(\w+)(?:\["([^"]+)"\])?\s*-->\s*(\w+)(?:\["([^"]+)"\])?')
+_MERMAID_STYLE_RE = re.compile(r'style\s+(\w+)\s+fill:(#[0-9a-fA-F]{6})')
+
+# 节点标签分类用的关键字正则（对小写标签匹配，一次扫描代替逐个关键字的in判断）
+_NODE_HAL_RE = re.compile(r'hal_|gpio_|uart_|spi_|i2c_')
+_NODE_INIT_RE = re.compile(r'init|config|setup')
+# 外设接口函数名前缀（流程图节点分类，见_classify_node）
+_INTERFACE_FUNC_RE = re.compile(r'(?:HAL|GPIO|UART|SPI|I2C|TIM|ADC|DMA)_')
+
+# 后台命令行子进程的启动参数：Windows下不分配控制台窗口（CREATE_NO_WINDOW），
+# 其它平台放到独立会话，避免与GUI进程共享终端信号
+_SUBPROC_KWARGS = {"creationflags": 0x08000000} if sys.platform == "win32" else {"start_new_session": True}
+
+# Mermaid位图的固定"母版"分辨率和DPI：只按此尺寸渲染一次，窗口缩放时只做Pillow缩小
+_MASTER_PNG_SIZE = (2400, 1800)
+_MASTER_PNG_DPI = 200
+
+# 母版图像素数上限：显示时只缩小不放大，超出预览区的分辨率只占内存（约17MB RGBA）
+_MASTER_PNG_MAX_PIXELS = _MASTER_PNG_SIZE[0] * _MASTER_PNG_SIZE[1]
+
+# 母版图按(宽, 高)缓存的缩小结果数量上限（显示器尺寸、分栏位置通常只有少数几种组合）
+_RESIZED_MASTER_CACHE_SIZE = 4
+
+# Text控件中最多显示的字符数，超出部分截断（复制/保存仍使用完整内容）
+_TEXT_DISPLAY_MAX_CHARS = 200_000
+
+# 调用图节点数不超过此值时直接在Tk Canvas上绘制，跳过Mermaid渲染链（可由mermaid.native_canvas_max_nodes覆盖）
+_NATIVE_CANVAS_MAX_NODES = 40
+
+# get_ui_actual_size结果的缓存时间（秒）：同一次缩放过程中的重复调用不再强制重算几何
+_UI_SIZE_CACHE_TTL = 0.05
+
+# 配置修改后延迟写入配置文件的时间（毫秒）：短时间内的多次修改合并为一次写入
+_CONFIG_FLUSH_DELAY_MS = 2000
+
+# 流程图视口裁剪（布局坐标像素）：进入可见区域外扩CREATE范围的节点创建图元，
+# 离开外扩KEEP范围后才删除，中间留出滞后区避免慢速滚动时反复增删
+_VIEWPORT_CREATE_MARGIN = 200
+_VIEWPORT_KEEP_MARGIN = 600
+
+# Canvas流程图位图层的最大像素数，超过时退回逐个创建Canvas图元
+_FLOWCHART_BITMAP_MAX_PIXELS = 4096 * 4096
+
+# Canvas版Mermaid样式流程图的节点样式：(填充色, 边框色, 文字色)
+_MERMAID_MAIN_STYLE = ("#ff6b6b", "#e55656", "white")
+_MERMAID_INTERFACE_STYLE = ("#51cf66", "#40c057", "white")
+_MERMAID_USER_STYLE = ("#339af0", "#228be6", "white")
+_MERMAID_DEEP_STYLE = ("#ffd43b", "#fab005", "black")
+# 连线样式：(颜色, 线宽)
+_MERMAID_CONNECTION_STYLE = ("#495057", 2)
+
+_MERMAID_FLOWCHART_STYLE = {
+    'main_node': _MERMAID_MAIN_STYLE,
+    'interface_node': _MERMAID_INTERFACE_STYLE,
+    'user_node': _MERMAID_USER_STYLE,
+    'deep_node': _MERMAID_DEEP_STYLE,
+    'connection': _MERMAID_CONNECTION_STYLE,
+}
+
+# 专业级流程图的默认样式（每个实例复制一份到self.mermaid_style）
+_PROFESSIONAL_FLOWCHART_STYLE = {
+    'main_node': {
+        'fill': '#ff6b6b',
+        'stroke': '#e55656',
+        'text_color': 'white',
+        'shadow': True
+    },
+    'interface_node': {
+        'fill': '#51cf66',
+        'stroke': '#40c057',
+        'text_color': 'white',
+        'shadow': True
+    },
+    'user_node': {
+        'fill': '#339af0',
+        'stroke': '#228be6',
+        'text_color': 'white',
+        'shadow': True
+    },
+    'connection': {
+        'stroke': '#495057',
+        'width': 2,
+        'arrow_size': 8
+    }
+}
+
+# mermaid-cli配置（内容固定，JSON只序列化一次，配置文件每个进程只写一次）
+_MERMAID_CLI_CONFIG = {
+    "theme": "default",
+    "themeVariables": {
+        "primaryColor": "#ff6b6b",
+        "primaryTextColor": "#000000",
+        "primaryBorderColor": "#333333",
+        "lineColor": "#333333",
+        "secondaryColor": "#51cf66",
+        "tertiaryColor": "#74c0fc",
+        "background": "#ffffff",
+        "mainBkg": "#ffffff",
+        "secondBkg": "#f8f9fa",
+        "tertiaryBkg": "#e9ecef"
+    },
+    "flowchart": {
+        "useMaxWidth": True,
+        "htmlLabels": True,
+        "curve": "basis"
+    },
+    "fontFamily": "Microsoft YaHei, Arial, sans-serif",
+    "fontSize": "14px",
+    "fontWeight": "bold"
+}
+_MERMAID_CLI_CONFIG_JSON = json.dumps(_MERMAID_CLI_CONFIG, indent=2)
+
+# CEF消息循环驱动间隔（毫秒）：加载时用最小值，空闲时逐步退避到最大值
+_CEF_PUMP_MIN_MS = 10
+_CEF_PUMP_MAX_MS = 100
+
+# CEF中mermaid.js的虚拟地址：页面通过<script src>引用，由_CefMermaidJsHandler从内存提供，
+# data URL中不再内联约3MB的脚本
+_CEF_MERMAID_JS_URL = "https://mermaid.local/mermaid.min.js"
+
+# CEF启动参数：关闭垂直同步和帧率限制，减少嵌入式渲染的等待
+_CEF_SWITCHES = {
+    "disable-gpu-vsync": "",
+    "disable-frame-rate-limit": "",
+}
+
+# Mermaid页面共用的初始化脚本：手动渲染并在失败时显示错误信息
+_MERMAID_INIT_JS = """
+        console.log('Starting Mermaid initialization...');
+
+        try {
+            mermaid.initialize({
+                startOnLoad: false,
+                theme: 'default',
+                flowchart: {
+                    useMaxWidth: true,
+                    htmlLabels: true,
+                    curve: 'basis'
+                },
+                securityLevel: 'loose'
+            });
+
+            // 手动渲染 - 参考VSCode MPE
+            document.addEventListener('DOMContentLoaded', function() {
+                console.log('DOM loaded, starting Mermaid rendering...');
+
+                mermaid.run().then(() => {
+                    console.log('Mermaid rendering completed successfully');
+                    document.getElementById('loading').style.display = 'none';
+                    document.getElementById('mermaid-container').style.display = 'block';
+                }).catch((error) => {
+                    console.error('Mermaid rendering failed:', error);
+                    document.getElementById('loading').style.display = 'none';
+                    document.getElementById('mermaid-container').innerHTML =
+                        '<div class="error">Mermaid渲染失败: ' + error.message + '<br><br>请检查Mermaid语法是否正确</div>';
+                    document.getElementById('mermaid-container').style.display = 'block';
+                });
+            });
+        } catch (error) {
+            console.error('Mermaid initialization failed:', error);
+            document.getElementById('loading').style.display = 'none';
+            document.getElementById('mermaid-container').innerHTML =
+                '<div class="error">Mermaid初始化失败: ' + error.message + '</div>';
+            document.getElementById('mermaid-container').style.display = 'block';
+        }
+
+        // 全局错误处理
+        window.addEventListener('error', function(e) {
+            console.error('Global error:', e);
+            document.getElementById('loading').style.display = 'none';
+            document.getElementById('mermaid-container').innerHTML =
+                '<div class="error">页面加载出错: ' + e.message + '</div>';
+            document.getElementById('mermaid-container').style.display = 'block';
+        });
+"""
+
+def _build_mermaid_page_chunks(title, styles, header_html):
+    """组装Mermaid页面骨架，返回(头部, 代码与mermaid.js之间, 尾部)三段
+
+    完整页面 = 头部 + Mermaid代码 + 中段 + mermaid.js + 尾部
+    """
+    head = ("""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>""" + title + """</title>
+    <style>""" + styles + """    </style>
+</head>
+<body>
+    <div class="container">
+""" + header_html + """
+        <div id="loading" class="loading">正在渲染Mermaid图形...</div>
+        <div id="mermaid-container" style="display:none;">
+            <div class="mermaid">
+""")
+    middle = """
+            </div>
+        </div>
+    </div>
+
+    <script>
+"""
+    tail = """
+    </script>
+
+    <script>""" + _MERMAID_INIT_JS + """    </script>
+</body>
+</html>"""
+    return head, middle, tail
+
+# VSCode风格页面与预渲染SVG页面共用的布局样式
+_VSCODE_PAGE_CSS = """
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            margin: 0;
+            padding: 20px;
+            background: white;
+            overflow: auto;
+        }
+        .container {
+            background: white;
+            padding: 20px;
+            border-radius: 8px;
+            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+            max-width: 100%;
+            overflow: auto;
+        }
+        .header {
+            text-align: center;
+            color: #333;
+            margin-bottom: 20px;
+            padding: 10px;
+            background-color: #f8f9fa;
+            border-radius: 5px;
+            border-left: 4px solid #007acc;
+        }
+"""
+
+# VSCode风格Mermaid HTML模板片段（按块写出，避免拼接整页字符串）
+_VSCODE_MERMAID_HTML_HEAD, _VSCODE_MERMAID_HTML_MIDDLE, _VSCODE_MERMAID_HTML_TAIL = _build_mermaid_page_chunks(
+    "Mermaid Diagram - UI Internal Rendering",
+    _VSCODE_PAGE_CSS + """        .mermaid {
+            text-align: center;
+            background-color: white;
+            max-width: 100%;
+            overflow: auto;
+            min-height: 400px;
+        }
+        .error {
+            color: #d73a49;
+            text-align: center;
+            padding: 20px;
+            border: 2px solid #d73a49;
+            border-radius: 5px;
+            margin: 20px;
+            background-color: #ffeaea;
+        }
+        .loading {
+            color: #0366d6;
+            text-align: center;
+            padding: 20px;
+            font-size: 16px;
+        }
+""",
+    """        <div class="header">
+            <h2>🧜‍♀️ MCU代码调用关系流程图</h2>
+            <p>UI内部渲染 - 参考VSCode Markdown Preview Enhanced实现</p>
+        </div>
+""",
+)
+
+# mermaid.js通过<script src>外部引用时使用的中段（脚本内容块留空）
+_VSCODE_MERMAID_HTML_MIDDLE_EXTERNAL_JS = _VSCODE_MERMAID_HTML_MIDDLE.replace(
+    "<script>", f'<script src="{_CEF_MERMAID_JS_URL}">'
+)
+
+# 预渲染SVG的Mermaid HTML模板片段（SVG直接内嵌，不含mermaid.js）
+_PRERENDERED_MERMAID_HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Mermaid Diagram - UI Internal Rendering</title>
+    <style>""" + _VSCODE_PAGE_CSS + """        .mermaid-svg {
+            text-align: center;
+            max-width: 100%;
+            overflow: auto;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h2>🧜‍♀️ MCU代码调用关系流程图</h2>
+            <p>UI内部渲染 - 预渲染SVG</p>
+        </div>
+        <div class="mermaid-svg">
+"""
+
+_PRERENDERED_MERMAID_HTML_TAIL = """
+        </div>
+    </div>
+</body>
+</html>"""
+
+# 离线Mermaid HTML模板（导入时编译一次，渲染时只做$mermaid_js/$mermaid_code替换）
+_OFFLINE_MERMAID_HTML_HEAD, _OFFLINE_MERMAID_HTML_MIDDLE, _OFFLINE_MERMAID_HTML_TAIL = _build_mermaid_page_chunks(
+    "Mermaid Diagram - 离线渲染",
+    """
+        body {
+            margin: 0;
+            padding: 20px;
+            font-family: Arial, sans-serif;
+            background-color: white;
+            overflow: auto;
+        }
+        .mermaid {
+            text-align: center;
+            background-color: white;
+            max-width: 100%;
+            overflow: auto;
+        }
+        .error {
+            color: red;
+            text-align: center;
+            padding: 20px;
+            border: 2px solid red;
+            border-radius: 5px;
+            margin: 20px;
+        }
+        .loading {
+            color: blue;
+            text-align: center;
+            padding: 20px;
+        }
+        .header {
+            text-align: center;
+            color: #333;
+            margin-bottom: 20px;
+            padding: 10px;
+            background-color: #f0f0f0;
+            border-radius: 5px;
+        }
+""",
+    """        <div class="header">
+            <h2>🧜‍♀️ MCU代码调用关系流程图 (离线渲染)</h2>
+            <p>使用本地mermaid.js v10.6.1 - 完全离线无网络依赖</p>
+        </div>
+""",
+)
+_OFFLINE_MERMAID_HTML_TEMPLATE = string.Template(
+    _OFFLINE_MERMAID_HTML_HEAD + "$mermaid_code" + _OFFLINE_MERMAID_HTML_MIDDLE
+    + "$mermaid_js" + _OFFLINE_MERMAID_HTML_TAIL
+)
+
+# 离线Mermaid渲染结果说明文本（只替换mermaid.js路径和大小）
+_OFFLINE_MERMAID_INFO_TEMPLATE = string.Template("""🎉 离线Mermaid渲染成功！
+
+✨ 特性:
+• 使用本地mermaid.js v""" + _MERMAID_JS_VERSION + """
+• 完全离线，无需网络连接
+• 高质量SVG渲染
+• 支持完整Mermaid语法
+
+🔧 技术说明:
+• 本地mermaid.js文件: $mermaid_js_path
+• 文件大小: $size_mb MB
+• 渲染引擎: 原生JavaScript + SVG
+
+📖 使用方法:
+1. 点击"导出HTML文件"按钮生成临时文件
+2. 在浏览器中打开该HTML文件
+3. 图形将自动渲染显示
+
+💡 提示: 此HTML文件包含完整的mermaid.js库，可以离线使用！
+""")
+
+# SVG预览HTML模板片段
+_SVG_PREVIEW_HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+    <title>Mermaid Flowchart</title>
+    <meta charset="UTF-8">
+    <style>
+        body {
+            margin: 20px;
+            text-align: center;
+            font-family: "Microsoft YaHei", "SimHei", Arial, sans-serif;
+            background-color: #f8f9fa;
+        }
+        .container {
+            max-width: 1200px;
+            margin: 0 auto;
+            background: white;
+            padding: 20px;
+            border-radius: 8px;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+        }
+        svg {
+            max-width: 100%;
+            height: auto;
+            border: 1px solid #ddd;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>🧜‍♀️ Mermaid流程图</h1>
+        <p>在线渲染成功 ✅ (UI内显示遇到问题，请在浏览器中查看)</p>
+        """
+
+_SVG_PREVIEW_HTML_TAIL = """
+    </div>
+</body>
+</html>"""
+
+# create_mermaid_html_content的页面模板：mermaid.js标签和Mermaid代码分别插在HEAD/MIDDLE、MIDDLE/TAIL之间
+_MERMAID_HTML_PAGE_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+    <title>STM32 Call Flow Chart - Mermaid (离线版)</title>
+    <meta charset="utf-8">
+"""
+
+_MERMAID_HTML_PAGE_MIDDLE = """
+    <style>
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            margin: 0;
+            padding: 20px;
+            background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
+            min-height: 100vh;
+        }
+        .container {
+            background: white;
+            padding: 30px;
+            border-radius: 15px;
+            box-shadow: 0 10px 30px rgba(0,0,0,0.1);
+            max-width: 100%;
+            margin: 0 auto;
+        }
+        h1 {
+            color: #2c3e50;
+            text-align: center;
+            margin-bottom: 30px;
+            font-size: 28px;
+            text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
+        }
+        .mermaid {
+            text-align: center;
+            background: white;
+            padding: 20px;
+            border-radius: 10px;
+            margin: 20px 0;
+            box-shadow: 0 4px 15px rgba(0,0,0,0.05);
+        }
+        .legend {
+            margin-top: 30px;
+            padding: 20px;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            border-radius: 10px;
+            box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+        }
+        .legend h3 {
+            margin-top: 0;
+            color: white;
+            text-shadow: 1px 1px 2px rgba(0,0,0,0.3);
+        }
+        .legend ul {
+            list-style: none;
+            padding: 0;
+        }
+        .legend li {
+            margin: 10px 0;
+            padding: 8px 15px;
+            background: rgba(255,255,255,0.1);
+            border-radius: 5px;
+            backdrop-filter: blur(10px);
+        }
+        .zoom-controls {
+            position: fixed;
+            top: 20px;
+            right: 20px;
+            background: white;
+            padding: 10px;
+            border-radius: 8px;
+            box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+            z-index: 1000;
+        }
+        .zoom-btn {
+            background: #3498db;
+            color: white;
+            border: none;
+            padding: 8px 12px;
+            margin: 0 2px;
+            border-radius: 4px;
+            cursor: pointer;
+            font-size: 14px;
+        }
+        .zoom-btn:hover {
+            background: #2980b9;
+        }
+    </style>
+</head>
+<body>
+    <div class="zoom-controls">
+        <button class="zoom-btn" onclick="zoomIn()">🔍+</button>
+        <button class="zoom-btn" onclick="zoomOut()">🔍-</button>
+        <button class="zoom-btn" onclick="resetZoom()">↻</button>
+    </div>
+
+    <div class="container">
+        <h1>🔄 STM32项目调用流程图</h1>
+        <div class="mermaid" id="mermaid-diagram">
+"""
+
+_MERMAID_HTML_PAGE_TAIL = """
+        </div>
+
+        <div class="legend">
+            <h3>📖 图例说明</h3>
+            <ul>
+                <li>🔴 <strong>红色节点</strong>: main函数 (程序入口)</li>
+                <li>🟢 <strong>绿色节点</strong>: HAL/GPIO/UART等接口函数</li>
+                <li>🔵 <strong>蓝色节点</strong>: 用户自定义函数</li>
+                <li>🟡 <strong>黄色节点</strong>: 深层调用函数</li>
+            </ul>
+        </div>
+    </div>
+
+    <script>
+        // 初始化Mermaid
+        mermaid.initialize({
+            startOnLoad: true,
+            theme: 'default',
+            flowchart: {
+                useMaxWidth: true,
+                htmlLabels: true,
+                curve: 'basis'
+            },
+            themeVariables: {
+                primaryColor: '#ff6b6b',
+                primaryTextColor: '#fff',
+                primaryBorderColor: '#e55656',
+                lineColor: '#495057',
+                secondaryColor: '#51cf66',
+                tertiaryColor: '#339af0'
+            }
+        });
+
+        // 缩放功能
+        let currentZoom = 1;
+        const diagram = document.getElementById('mermaid-diagram');
+
+        function zoomIn() {
+            currentZoom += 0.1;
+            diagram.style.transform = `scale(${currentZoom})`;
+        }
+
+        function zoomOut() {
+            currentZoom = Math.max(0.3, currentZoom - 0.1);
+            diagram.style.transform = `scale(${currentZoom})`;
+        }
+
+        function resetZoom() {
+            currentZoom = 1;
+            diagram.style.transform = 'scale(1)';
+        }
+
+        // 键盘快捷键
+        document.addEventListener('keydown', function(e) {
+            if (e.ctrlKey) {
+                if (e.key === '=') {
+                    e.preventDefault();
+                    zoomIn();
+                } else if (e.key === '-') {
+                    e.preventDefault();
+                    zoomOut();
+                } else if (e.key === '0') {
+                    e.preventDefault();
+                    resetZoom();
+                }
+            }
+        });
+    </script>
+</body>
+</html>"""
+
+# render_mermaid_in_browser的离线页面模板：mermaid.js和Mermaid代码分别插在HEAD/MIDDLE、MIDDLE/TAIL之间
+_BROWSER_MERMAID_HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+    <title>STM32 Call Flow Chart - 离线渲染</title>
+    <script>
+"""
+
+_BROWSER_MERMAID_HTML_MIDDLE = """
+    </script>
+    <style>
+        body {
+            font-family: Arial, sans-serif;
+            margin: 20px;
+            background-color: #f5f5f5;
+        }
+        .container {
+            background-color: white;
+            padding: 20px;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }
+        .mermaid {
+            text-align: center;
+            background-color: white;
+        }
+        h1 {
+            color: #333;
+            text-align: center;
+        }
+        .legend {
+            margin-top: 20px;
+            padding: 15px;
+            background-color: #f8f9fa;
+            border-radius: 5px;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>🔄 STM32项目调用流程图</h1>
+        <div class="mermaid">
+"""
+
+_BROWSER_MERMAID_HTML_TAIL = """
+        </div>
+        <div class="legend">
+            <h3>📖 图例说明:</h3>
+            <ul>
+                <li>🔴 <strong>红色节点</strong>: main函数 (程序入口)</li>
+                <li>🟢 <strong>绿色节点</strong>: HAL/GPIO/UART等接口函数</li>
+                <li>🔵 <strong>蓝色节点</strong>: 第一层用户函数</li>
+                <li>🟡 <strong>黄绿节点</strong>: 第二层用户函数</li>
+                <li>🟡 <strong>黄色节点</strong>: 更深层函数</li>
+            </ul>
+        </div>
+    </div>
+    <script>
+        mermaid.initialize({
+            startOnLoad: true,
+            theme: 'default',
+            flowchart: {
+                useMaxWidth: true,
+                htmlLabels: true
+            }
+        });
+    </script>
+</body>
+</html>"""
+
+@functools.lru_cache(maxsize=1)
+def _load_mermaid_js(mermaid_js_path):
+    """读取本地mermaid.js（每个进程只读一次），返回(内容, 文件大小MB)"""
+    with open(mermaid_js_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return content, os.path.getsize(mermaid_js_path) / 1024 / 1024
+
+@functools.lru_cache(maxsize=1)
+def _load_mermaid_js_bytes(mermaid_js_path):
+    """读取本地mermaid.js原始字节（每个进程只读一次），供CEF资源拦截直接返回"""
+    with open(mermaid_js_path, 'rb') as f:
+        return f.read()
+
+class _CefMermaidJsResource:
+    """cefpython3资源处理器：从内存分块返回mermaid.js
+
+    on_finished在数据读完或请求取消时调用一次，用于释放请求回调对本对象的引用
+    """
+
+    def __init__(self, on_finished):
+        self._data = _load_mermaid_js_bytes(_MERMAID_JS_PATH)
+        self._offset = 0
+        self._on_finished = on_finished
+
+    def _finish(self):
+        if self._on_finished is not None:
+            self._on_finished(self)
+            self._on_finished = None
+
+    def ProcessRequest(self, request, callback):
+        callback.Continue()
+        return True
+
+    def GetResponseHeaders(self, response, response_length_out, redirect_url_out):
+        response.SetStatus(200)
+        response.SetStatusText("OK")
+        response.SetMimeType("application/javascript")
+        response_length_out[0] = len(self._data)
+
+    def ReadResponse(self, data_out, bytes_to_read, bytes_read_out, callback):
+        if self._offset >= len(self._data):
+            bytes_read_out[0] = 0
+            self._finish()
+            return False
+        chunk = self._data[self._offset:self._offset + bytes_to_read]
+        self._offset += len(chunk)
+        data_out[0] = chunk
+        bytes_read_out[0] = len(chunk)
+        return True
+
+    def CanGetCookie(self, cookie):
+        return True
+
+    def CanSetCookie(self, cookie):
+        return True
+
+    def Cancel(self):
+        self._finish()
+
+class _CefMermaidJsHandler:
+    """cefpython3请求回调：拦截_CEF_MERMAID_JS_URL，其它请求照常走网络"""
+
+    def __init__(self):
+        # cefpython要求Python侧持有资源处理器的引用，直到请求结束（读完或取消时移除）
+        self._resources = set()
+
+    def GetResourceHandler(self, browser, frame, request):
+        if request.GetUrl() != _CEF_MERMAID_JS_URL:
+            return None
+        resource = _CefMermaidJsResource(self._resources.discard)
+        self._resources.add(resource)
+        return resource
+
+# 本地plantuml.jar候选路径（按优先级查找）
+_PLANTUML_JAR_PATHS = (
+    'plantuml.jar',
+    'lib/plantuml.jar',
+    os.path.expanduser('~/plantuml.jar'),
+    'C:/plantuml/plantuml.jar',
+)
+
+@functools.lru_cache(maxsize=1)
+def _find_java():
+    """在PATH中查找java可执行文件（每个进程只查找一次，不启动JVM），未找到返回None"""
+    return shutil.which('java')
+
+@functools.lru_cache(maxsize=1)
+def _find_plantuml_jar():
+    """查找第一个存在的plantuml.jar（每个进程只查找一次），未找到返回None"""
+    for jar_path in _PLANTUML_JAR_PATHS:
+        if os.path.exists(jar_path):
+            return jar_path
+    return None
+
+# 可选渲染后端 -> 对应模块名（启动时探测一次是否已安装）
+_RENDER_BACKEND_MODULES = {
+    'cef': 'cefpython3',
+    'webview': 'webview',
+    'tkhtml': 'tkinter.html',
+}
+
+def _module_installed(module_name):
+    """只查找模块是否存在，不实际导入"""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+@functools.lru_cache(maxsize=2048)
+def _node_color(label):
+    """根据节点标签确定颜色（纯文本到颜色的映射，结果按标签缓存）"""
+    label_lower = label.lower()
+
+    if 'main' in label_lower:
+        return '#e74c3c'  # 红色 - main函数
+    elif _NODE_HAL_RE.search(label_lower):
+        return '#27ae60'  # 绿色 - HAL函数
+    elif _NODE_INIT_RE.search(label_lower):
+        return '#3498db'  # 蓝色 - 初始化函数
+    else:
+        return '#f39c12'  # 橙色 - 其他函数
+
+def _draw_pil_arrow(draw, start, end, fill, width=1, dash=None):
+    """在PIL ImageDraw上绘制带箭头的直线（箭头形状与Tk默认arrowshape相近），dash为(实线长, 间隔长)"""
+    (x1, y1), (x2, y2) = start, end
+    length = ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5
+    if length == 0:
+        return
+    ux, uy = (x2 - x1) / length, (y2 - y1) / length
+
+    # 线段终点停在箭头底部，避免线宽盖住箭头尖
+    head_length, head_half_width = 8 + width, 4 + width
+    line_length = max(0.0, length - head_length)
+    if dash:
+        on, off = dash
+        pos = 0.0
+        while pos < line_length:
+            seg_end = min(pos + on, line_length)
+            draw.line([(x1 + ux * pos, y1 + uy * pos), (x1 + ux * seg_end, y1 + uy * seg_end)],
+                      fill=fill, width=width)
+            pos = seg_end + off
+    else:
+        draw.line([(x1, y1), (x1 + ux * line_length, y1 + uy * line_length)], fill=fill, width=width)
+
+    base_x, base_y = x2 - ux * head_length, y2 - uy * head_length
+    draw.polygon([
+        (x2, y2),
+        (base_x - uy * head_half_width, base_y + ux * head_half_width),
+        (base_x + uy * head_half_width, base_y - ux * head_half_width),
+    ], fill=fill)
+
+def _rounded_rect_points(x1, y1, x2, y2, radius=10):
+    """圆角矩形的平滑多边形顶点（create_polygon(..., smooth=True)使用）"""
+    points = []
+    for x, y in [(x1, y1 + radius), (x1, y1), (x1 + radius, y1),
+                (x2 - radius, y1), (x2, y1), (x2, y1 + radius),
+                (x2, y2 - radius), (x2, y2), (x2 - radius, y2),
+                (x1 + radius, y2), (x1, y2), (x1, y2 - radius)]:
+        points.extend([x, y])
+    return points
+
+def _arrow_head_points(segments, arrow_size, angle=0.5):
+    """计算每条连接线(x1, y1, x2, y2)末端箭头的两个底角，返回[(ax1, ay1, ax2, ay2)或None（零长度）]
+
+    箭头方向取起点到终点的连线方向；NumPy可用时对所有连接线一次性做向量运算
+    """
+    if not segments:
+        return []
+
+    try:
+        import numpy as np
+    except ImportError:
+        heads = []
+        for x1, y1, x2, y2 in segments:
+            dx = x2 - x1
+            dy = y2 - y1
+            length = (dx**2 + dy**2)**0.5
+            if length > 0:
+                dx /= length
+                dy /= length
+                heads.append((x2 - arrow_size * (dx + dy * angle), y2 - arrow_size * (dy - dx * angle),
+                              x2 - arrow_size * (dx - dy * angle), y2 - arrow_size * (dy + dx * angle)))
+            else:
+                heads.append(None)
+        return heads
+
+    points = np.asarray(segments, dtype=float)
+    tips = points[:, 2:4]
+    vectors = tips - points[:, 0:2]
+    lengths = np.hypot(vectors[:, 0], vectors[:, 1])
+    valid = lengths > 0
+    unit = vectors / np.where(valid, lengths, 1.0)[:, np.newaxis]
+    # (dy, -dx) * angle：箭头两边相对主方向的偏转
+    offset = np.stack((unit[:, 1], -unit[:, 0]), axis=1) * angle
+    corners = np.hstack((tips - arrow_size * (unit + offset), tips - arrow_size * (unit - offset)))
+    return [tuple(head) if ok else None for head, ok in zip(corners.tolist(), valid.tolist())]
+
+@functools.lru_cache(maxsize=4096)
+def _classify_node(func_name):
+    """流程图节点分类：0 主函数、1 外设接口函数、2 用户函数（结果按函数名缓存，各流程图共用）"""
+    if func_name == 'main':
+        return 0
+    elif _INTERFACE_FUNC_RE.match(func_name):
+        return 1
+    else:
+        return 2
+
+# Canvas流程图节点类型（_classify_node结果）对应的填充色：主函数红、接口函数绿、用户函数蓝
+_CANVAS_FLOWCHART_COLORS = ("#ff9999", "#99ff99", "#99ccff")
+# 调用图（Mermaid/PlantUML代码、原生Canvas调用图）节点类型对应的填充色，顺序同上
+_CALL_GRAPH_NODE_COLORS = ("#ff6b6b", "#51cf66", "#74c0fc")
+
+def _layout_flowchart_tree(call_tree, start_x, start_y, level_gap, node_gap):
+    """Canvas流程图布局：显式栈遍历调用树，节点访问和连线顺序与原递归绘制相同
+
+    节点按列存放：'name'、'x'、'y'（左上角）、'type'（_CANVAS_FLOWCHART_COLORS下标）、
+    'parent'（父节点行号，根为-1），第i个节点是各列的第i项。'order'为绘制顺序：
+    ('node', 行号, -1)或('edge', 父行号, 子行号)，连线端点取绘制时该函数名最近一次出现的节点
+    """
+    names, xs, ys, types, parents = [], [], [], [], []
+    order = []
+    latest = {}  # 函数名 -> 最近一次出现的行号
+
+    # 栈帧：('node', 节点, x, y, 父行号) 或 ('edge', 父函数名, 子函数名)；子树处理完后才出栈连线
+    stack = [('node', call_tree, start_x, start_y, -1)]
+    while stack:
+        frame = stack.pop()
+        if frame[0] == 'edge':
+            _, parent_name, child_name = frame
+            if child_name in latest:
+                order.append(('edge', latest[parent_name], latest[child_name]))
+            continue
+
+        _, node, x, y, parent = frame
+        if not node:
+            continue
+
+        func_name = node['name']
+        node_type = _classify_node(func_name)
+
+        row = len(names)
+        names.append(func_name)
+        xs.append(x)
+        ys.append(y)
+        types.append(node_type)
+        parents.append(parent)
+        latest[func_name] = row
+        order.append(('node', row, -1))
+
+        # 子节点逆序压栈，保证最左侧的子树最先处理，其连线在子树之后
+        children = node.get('children', [])
+        if children:
+            child_y = y + level_gap
+            child_start_x = x - (len(children) - 1) * node_gap / 2
+            for i in range(len(children) - 1, -1, -1):
+                child = children[i]
+                stack.append(('edge', func_name, child['name']))
+                stack.append(('node', child, child_start_x + i * node_gap, child_y, row))
+
+    return {'name': names, 'x': xs, 'y': ys, 'type': types, 'parent': parents, 'order': order}
+
+def _professional_node_type(func_name):
+    """专业级流程图节点类型（见_classify_node）"""
+    return ('main_node', 'interface_node', 'user_node')[_classify_node(func_name)]
+
+# 专业级流程图节点文本：候选字号（从大到小）、节点最大宽度、文本两侧留白之和
+_PROFESSIONAL_NODE_FONT_SIZES = (12, 11, 10, 9)
+_PROFESSIONAL_NODE_MAX_WIDTH = 252
+_PROFESSIONAL_NODE_TEXT_PADDING = 40
+
 def safe_json_serialize(obj):
     f"""{loc.get_text('safe_json_serialization')}"""
     if isinstance(obj, set):
@@ -155,17 +1106,51 @@ def safe_json_serialize(obj):
 class MCUAnalyzerGUI:
     """MCU Code Analyzer GUI Main Class"""
 
+    # cef.Initialize()是进程级的，整个进程只能调用一次
+    _cef_initialized = False
+
     def __init__(self):
+        # Mermaid代码版本号（每次赋值mermaid_code时递增）和上次复制到剪贴板时的版本号
+        self._mermaid_code_version = 0
+        self._last_copied_version = -1
+        self._mermaid_code = ""
+        self.call_graph = {}
+
+        # 按需创建的控件：未创建时为None，渲染路径中直接判断，不再逐次hasattr
+        self.graph_status_label = None
+        self.preview_control_frame = None
+        self.professional_canvas = None
+
+        # 缩放后PhotoImage的LRU缓存：(图片路径, 宽, 高) -> PhotoImage，Mermaid代码变化时清空
+        self._resize_cache = OrderedDict()
+
+        # 本地渲染的Mermaid母版图及其键（代码哈希+渲染参数）
+        self._master_mermaid_image = None
+        self._master_mermaid_key = None
+        # 母版图的缩小结果：(宽, 高) -> PIL图像，母版变化时清空
+        self._resized_master = OrderedDict()
+
+        # 已解码的流程图PNG（RGBA）及其键（图片路径, Mermaid代码版本），所有缩放都从它读取
+        self._decoded_mermaid_png = None
+        self._decoded_mermaid_key = None
+
         self.root = tk.Tk()
 
         # Initialize core components
         self.chip_detector = ChipDetector()
 
-        # Load global configuration
+        # Load global configuration（读取期间调试日志尚未开启，debug_log需要_debug已存在）
+        self._debug = False
         self.config = self.load_global_config()
 
+        # 调试模式（config.yaml中app.debug）：关闭时不输出🔧 DEBUG日志
+        self._debug = bool((self.config or {}).get('app', {}).get('debug', False))
+
         # {loc.get_text('config_file_path_hidden')}
         self.config_file = self.get_config_file_path()
+        self._config_cache = {}  # 配置文件内容的内存副本（启动时读取一次，之后只在写入时落盘）
+        self._config_dirty = False  # 内存副本是否有尚未写入配置文件的修改
+        self._config_flush_after_id = None  # 待执行的配置写入定时器
 
         # {loc.get_text('add_canvas_rounded_rect')}
         self.create_rounded_rectangle_method()
@@ -187,11 +1172,95 @@ class MCUAnalyzerGUI:
         self.last_call_analysis = None
         self.last_analysis_results = False
         self.last_interfaces = {}
+        # 最近一次生成流程图所用的调用分析数据和每行节点数（原生Canvas调用图按此重绘）
+        self.call_analysis_data = None
+        self.last_nodes_per_row = 5
 
         # 初始化流程图格式选择
         self.current_flowchart_format = 'mermaid'  # 默认使用mermaid格式
         self.plantuml_code = ""  # 存储PlantUML代码
 
+        # 上次成功的备选渲染方案
+        self._preferred_fallback = None
+
+        # Mermaid SVG内容寻址缓存目录（按代码+mermaid版本的sha256命名）；放在当前用户的缓存目录下，
+        # 不使用共享且路径可预测的系统临时目录
+        cache_root = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or Path.home() / ".cache"
+        self._svg_cache_dir = Path(cache_root) / "mcu_code_analyzer" / "mermaid_svg"
+
+        # 后台渲染线程池（HTML生成、写文件等不占用Tk主线程）
+        self._render_pool = ThreadPoolExecutor(max_workers=2)
+        # 流程图缩放专用单线程池：Pillow缩放时释放GIL，不阻塞Tk事件循环
+        self._resize_pool = ThreadPoolExecutor(max_workers=1)
+
+        # 常驻Mermaid渲染器（Playwright无头浏览器，首次使用时启动）
+        self._mermaid_worker_lock = threading.Lock()
+        self._mermaid_worker_failed = False
+
+        # 嵌入式CEF：(浏览器, 容器Frame)列表，以及进程内唯一的消息循环是否已在运行
+        self._cef_browsers = []
+        self._cef_pump_running = False
+        self._preview_views = {}  # 预览区中可复用的视图（名称 -> 控件字典）
+        self._auto_redraw_after_id = None  # 待执行的自动重绘定时器
+        self._active_flowchart_canvas = None  # 当前显示自适应流程图的Canvas
+        self._ui_size_cache = (0.0, None)  # (时间戳, 预览区可用尺寸)
+        self._svg_content = None  # 最近一次显示的SVG代码（复制/保存/查看源码时使用）
+        self._mermaid_config_path = None  # mermaid-cli配置文件，退出时删除
+        self._mermaid_config_lock = threading.Lock()  # mmdc在后台线程中调用，配置文件只创建一次
+        self._matplotlib_figure_cache = OrderedDict()  # Mermaid代码哈希 -> matplotlib Figure
+        # Mermaid HTML临时文件：本进程私有的临时目录（首次使用时创建，退出时整个删除）及代码哈希 -> 文件路径
+        self._mermaid_html_dir = None
+        self._mermaid_html_files = {}
+        self._node_items = {}  # 专业级流程图：函数名 -> (阴影, 节点体, 文本) Canvas图元id，重绘时复用
+        self._professional_zoom = 1.0  # 专业级流程图当前缩放倍数（相对布局坐标）
+        self._professional_node_layer = None  # 专业级流程图节点位图层（PhotoImage）
+        self._professional_layer_nodes = None  # 生成节点位图层所用的布局节点（位图过大暂用多边形时也保留），缩放时按新倍数重画
+        self._tile_cache = OrderedDict()  # (宽, 高, 圆角, 填充, 边框色, 边框宽) -> 圆角矩形PhotoImage（LRU）
+        # 专业级流程图样式及最近一次绘制的布局和画布尺寸（视口裁剪和缩放时使用）
+        self.mermaid_style = {name: dict(style) for name, style in _PROFESSIONAL_FLOWCHART_STYLE.items()}
+        self._professional_layout = None
+        self._professional_canvas_size = None
+        self._professional_items_per_node = 1  # 1: 节点体在位图层中，只有文本图元；3: 阴影+节点体+文本
+        self._rendered_subtree_hashes = {}  # 专业级流程图：函数名 -> 上次绘制时的子树哈希
+        self._font_cache = {}  # 字号 -> 节点文本字体（tkinter.font.Font）
+        self._measure_cache = {}  # (文本, 字号) -> 文本像素宽度
+        self._viewport_refresh_id = None  # 待执行的可见节点刷新
+        # Canvas流程图（draw_flowchart_on_canvas）：按绘制顺序记录的全部节点/连线及待执行的视口刷新
+        self._canvas_flowchart_ops = None
+        self._canvas_flowchart_refresh_id = None
+        self._canvas_flowchart_items = {}  # ops下标 -> 已创建的图元ID元组
+        # Canvas流程图位图层：(call_graph哈希, 左上角坐标, PhotoImage)，同一份调用关系重复显示时复用
+        self._canvas_flowchart_bitmap = None
+        self._canvas_flowchart_baked = False  # 节点矩形和连线是否已画在位图层中（只需创建文本图元）
+        self._mermaid_generation_future = None  # 后台生成Mermaid代码的任务
+        self._call_graph_sig = None  # 当前call_graph内容的哈希（分析完成时计算）
+        self._mermaid_cache = OrderedDict()  # call_graph哈希 -> 生成的Mermaid代码
+        self._layout_cache = OrderedDict()  # (call_graph哈希, 宽, 高) -> 专业级流程图布局
+        self._preview_generation = 0  # 预览区内容被替换的次数
+        self._last_rendered_sig = None  # 上次调用关系图渲染的(数据, 代码, 模式)签名及当时的预览区版本
+        self.probe_render_backends()
+
+    @property
+    def mermaid_code(self):
+        """当前Mermaid代码"""
+        return self._mermaid_code
+
+    @mermaid_code.setter
+    def mermaid_code(self, value):
+        self._mermaid_code = value
+        self._mermaid_code_version += 1
+        self._resize_cache.clear()
+        self._decoded_mermaid_png = None
+        self._decoded_mermaid_key = None
+
+    def copy_mermaid_code_to_clipboard(self):
+        """复制Mermaid代码到剪贴板；代码自上次复制后未变化时不重复发布（剪贴板仍是上次的内容）"""
+        if self._last_copied_version == self._mermaid_code_version:
+            return
+        self.root.clipboard_clear()
+        self.root.clipboard_append(self.mermaid_code)
+        self._last_copied_version = self._mermaid_code_version
+
     def setup_window(self):
         """Setup window"""
         version_info = get_version_display()
@@ -422,6 +1491,8 @@ class MCUAnalyzerGUI:
         self.status_var.set(loc.get_text('ready'))
         self.mermaid_code = ""
         self.call_graph = {}
+        self._call_graph_sig = None
+        self._last_rendered_sig = None
 
         # Clear canvas and related widgets - 完全重建graph_preview_frame
         if hasattr(self, 'flowchart_canvas'):
@@ -436,8 +1507,7 @@ class MCUAnalyzerGUI:
         if hasattr(self, 'graph_preview_frame'):
             try:
                 # 销毁所有子widget
-                for widget in self.graph_preview_frame.winfo_children():
-                    widget.destroy()
+                self._clear_preview_frame(keep_control=False)
             except tk.TclError:
                 pass
 
@@ -446,7 +1516,7 @@ class MCUAnalyzerGUI:
             try:
                 self.graph_figure.clear()
                 if hasattr(self, 'graph_canvas'):
-                    self.graph_canvas.draw()
+                    self.graph_canvas.draw_idle()
             except:
                 pass
 
@@ -519,13 +1589,13 @@ class MCUAnalyzerGUI:
 
         # 第三行：Start Analysis按钮和LLM分析按钮
         self.button_row = ttk.Frame(self.analysis_options_frame)
-        self.log_message(f"🔧 DEBUG: {loc.get_text('creating_analyze_button')}")  # 添加debug输出
+        self.debug_log(loc.get_text('creating_analyze_button'))  # 添加debug输出
         self.analyze_btn = ttk.Button(
             self.button_row,
             text=loc.get_text('start_analysis'),
             command=self.start_analysis
         )
-        self.log_message(f"🔧 DEBUG: {loc.get_text('analyze_button_created')}")  # 添加debug输出
+        self.debug_log(loc.get_text('analyze_button_created'))  # 添加debug输出
 
         # LLM代码分析按钮
         self.llm_analysis_btn = ttk.Button(
@@ -533,7 +1603,7 @@ class MCUAnalyzerGUI:
             text="🤖 " + loc.get_text('llm_code_analysis'),
             command=self.start_llm_analysis
         )
-        self.log_message(f"🔧 DEBUG: {loc.get_text('llm_analysis_button_created')}")
+        self.debug_log(loc.get_text('llm_analysis_button_created'))
 
         # Progress bar with percentage display
         self.progress_var = tk.DoubleVar()
@@ -628,7 +1698,7 @@ class MCUAnalyzerGUI:
             if hasattr(self, 'output_browse_btn'):
                 self.output_browse_btn.configure(**button_config)
 
-            self.log_message("🔧 DEBUG: Button styles applied directly")
+            self.debug_log("Button styles applied directly")
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to refresh button styles: {e}")
 
@@ -799,9 +1869,12 @@ class MCUAnalyzerGUI:
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
         # 添加窗口尺寸变化监听
-        self.last_window_size = None
+        self.last_window_size = None  # 上次触发重新渲染时的窗口尺寸
         self.resize_timer = None
+        self._render_epoch = 0  # 每次安排重新渲染时递增，过期的定时回调据此放弃执行
+        self._resize_render_pending = False  # 预览区隐藏期间窗口尺寸变化过，再次可见时补渲染一次
         self.root.bind('<Configure>', self.on_window_configure)
+        self.root.bind('<Map>', self.on_preview_mapped, add='+')
 
         # 图形显示区域
         if MATPLOTLIB_AVAILABLE:
@@ -1044,11 +2117,11 @@ class MCUAnalyzerGUI:
 
     def start_analysis(self):
         """Start analysis"""
-        self.log_message(f"🔧 DEBUG: {loc.get_text('start_analysis_called')}")
+        self.debug_log(loc.get_text('start_analysis_called'))
 
         try:
             project_path = self.project_path_var.get().strip()
-            self.log_message(f"🔧 DEBUG: {loc.get_text('project_path_equals', project_path)}")
+            self.debug_log(loc.get_text('project_path_equals', project_path))
 
             if not project_path:
                 self.log_message("🔧 DEBUG: No project path selected")
@@ -1061,14 +2134,14 @@ class MCUAnalyzerGUI:
                 return
 
             output_path = self.output_path_var.get().strip()
-            self.log_message(f"🔧 DEBUG: output_path = '{output_path}'")
+            self.debug_log("output_path = '%s'", output_path)
 
             if not output_path:
                 self.log_message("🔧 DEBUG: No output path selected")
                 messagebox.showerror(loc.get_text('error'), loc.get_text('select_output_dir'))
                 return
 
-            self.log_message(f"🔧 DEBUG: {loc.get_text('all_paths_validated')}")
+            self.debug_log(loc.get_text('all_paths_validated'))
 
             # 禁用按钮并清空结果 - 线程安全
             def prepare_ui():
@@ -1080,15 +2153,15 @@ class MCUAnalyzerGUI:
             self.root.after(0, prepare_ui)
 
             # 清理已有的分析文件夹
-            self.log_message(f"🔧 DEBUG: {loc.get_text('cleaning_existing_folders')}")
+            self.debug_log(loc.get_text('cleaning_existing_folders'))
             self.clean_existing_analysis_folders(output_path)
 
             # 在新线程中执行分析
-            self.log_message(f"🔧 DEBUG: {loc.get_text('starting_analysis_thread')}")
+            self.debug_log(loc.get_text('starting_analysis_thread'))
             analysis_thread = threading.Thread(target=self.run_analysis, args=(project_path, output_path))
             analysis_thread.daemon = True
             analysis_thread.start()
-            self.log_message("🔧 DEBUG: Analysis thread started!")
+            self.debug_log("Analysis thread started!")
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Exception in start_analysis: {e}")
@@ -1142,7 +2215,7 @@ class MCUAnalyzerGUI:
                 if config_path.exists():
                     with open(config_path, 'r', encoding='utf-8') as f:
                         config = yaml.safe_load(f)
-                    self.log_message(f"🔧 DEBUG: Loaded global config from: {config_path}")
+                    self.debug_log("Loaded global config from: %s", config_path)
                     return config
 
             # 如果没有找到配置文件，返回默认配置
@@ -1239,23 +2312,23 @@ class MCUAnalyzerGUI:
 
     def run_analysis(self, project_path, output_path):
         """Run analysis (in background thread)"""
-        self.log_message("🔧 DEBUG: run_analysis() started!")  # 添加debug输出
-        self.log_message(f"🔧 DEBUG: {loc.get_text('project_path_equals', project_path)}")  # 添加debug输出
-        self.log_message(f"🔧 DEBUG: {loc.get_text('output_path_equals', output_path)}")  # 添加debug输出
+        self.debug_log("run_analysis() started!")  # 添加debug输出
+        self.debug_log(loc.get_text('project_path_equals', project_path))  # 添加debug输出
+        self.debug_log(loc.get_text('output_path_equals', output_path))  # 添加debug输出
 
         try:
-            self.log_message(f"🔧 DEBUG: {loc.get_text('about_to_call_log_message')}")  # 添加debug输出
+            self.debug_log(loc.get_text('about_to_call_log_message'))  # 添加debug输出
             self.log_message(loc.get_text('starting_analysis'))
-            self.log_message(f"🔧 DEBUG: {loc.get_text('log_message_called_successfully')}")  # 添加debug输出
+            self.debug_log(loc.get_text('log_message_called_successfully'))  # 添加debug输出
 
-            self.log_message(f"🔧 DEBUG: {loc.get_text('about_to_update_status')}")  # 添加debug输出
+            self.debug_log(loc.get_text('about_to_update_status'))  # 添加debug输出
             self.update_status(loc.get_text('analyzing'))
-            self.log_message(f"🔧 DEBUG: {loc.get_text('status_updated_successfully')}")  # 添加debug输出
+            self.debug_log(loc.get_text('status_updated_successfully'))  # 添加debug输出
 
             # 重置进度条为绿色状态
-            self.log_message(f"🔧 DEBUG: {loc.get_text('about_to_update_progress')}")  # 添加debug输出
+            self.debug_log(loc.get_text('about_to_update_progress'))  # 添加debug输出
             self.update_progress(0, is_error=False)
-            self.log_message(f"🔧 DEBUG: {loc.get_text('progress_updated_successfully')}")  # 添加debug输出
+            self.debug_log(loc.get_text('progress_updated_successfully'))  # 添加debug输出
 
             # Ensure output directory exists
             os.makedirs(output_path, exist_ok=True)
@@ -1460,6 +2533,7 @@ class MCUAnalyzerGUI:
 
         # 保存到实例变量供Mermaid使用
         self.call_graph = result
+        self._call_graph_sig = self.compute_call_graph_signature(result)
 
         # 保存接口使用信息供LLM使用
         self.last_interfaces = interface_usage
@@ -1603,6 +2677,14 @@ class MCUAnalyzerGUI:
 
         return node
 
+    def compute_call_graph_signature(self, call_graph):
+        """计算call_graph内容的哈希，用于缓存Mermaid代码、布局和跳过重复渲染；无法序列化时返回None"""
+        try:
+            return hash(json.dumps(call_graph, sort_keys=True, default=str))
+        except (TypeError, ValueError) as e:
+            self.log_message(f"🔧 DEBUG: Failed to hash call_graph: {e}")
+            return None
+
     def count_functions_in_tree(self, tree):
         """统计调用树中的函数数量"""
         if not tree:
@@ -1737,6 +2819,12 @@ class MCUAnalyzerGUI:
             self.mermaid_code = "graph TD\n    A[未找到main函数或调用关系]"
             return
 
+        ui_width, nodes_per_row = self.prepare_mermaid_generation(call_analysis)
+        mermaid_code = self.build_mermaid_flowchart_code(call_tree, ui_width, nodes_per_row)
+        self.apply_generated_mermaid_code(call_analysis, mermaid_code)
+
+    def prepare_mermaid_generation(self, call_analysis):
+        """读取UI宽度并确定每行节点数，返回(ui_width, nodes_per_row)（访问Tk控件，需在主线程调用）"""
         # 获取UI实际宽度，动态计算布局参数
         ui_width, ui_height = self.get_ui_actual_size()
 
@@ -1750,13 +2838,16 @@ class MCUAnalyzerGUI:
         else:
             nodes_per_row = 5
 
-        self.log_message(f"🔧 DEBUG: UI width: {ui_width}, nodes per row: {nodes_per_row}")
+        self.debug_log("UI width: %s, nodes per row: %s", ui_width, nodes_per_row)
 
         # 保存参数用于UI调整时重新生成
         self.last_ui_width = ui_width
         self.last_nodes_per_row = nodes_per_row
         self.call_analysis_data = call_analysis
+        return ui_width, nodes_per_row
 
+    def build_mermaid_flowchart_code(self, call_tree, ui_width, nodes_per_row):
+        """由调用树生成自适应Mermaid代码并返回（纯计算，不访问Tk控件，可在后台线程调用）"""
         # 收集所有节点，按层级分组
         all_functions = []
         layers = {}
@@ -1790,11 +2881,8 @@ class MCUAnalyzerGUI:
         # 根据UI宽度生成不同的Mermaid布局
         mermaid_lines = self.generate_adaptive_mermaid_layout(layers, nodes_per_row, all_functions)
 
-        # 完成Mermaid代码生成
-        self.mermaid_code = '\n'.join(mermaid_lines)
-
-        # 添加说明注释
-        self.mermaid_code += f"""
+        # 完成Mermaid代码生成，添加说明注释
+        return '\n'.join(mermaid_lines) + f"""
 
     %% 自适应布局说明:
     %% UI宽度: {ui_width}px, 每行节点数: {nodes_per_row}
@@ -1803,12 +2891,60 @@ class MCUAnalyzerGUI:
     %% 🔵 蓝色: 用户自定义函数
 """
 
+    def apply_generated_mermaid_code(self, call_analysis, mermaid_code):
+        """保存生成的Mermaid代码，同步生成PlantUML代码并刷新源码标签页（需在主线程调用）"""
+        self.mermaid_code = mermaid_code
+
         # 同时生成PlantUML代码，确保两种格式使用相同的数据源
         self.generate_plantuml_flowchart(call_analysis)
 
         # 更新Source Mermaid标签页
         self.update_source_mermaid_tab()
 
+    def generate_mermaid_flowchart_async(self, call_analysis, on_done):
+        """在后台线程生成Mermaid代码，完成后回到Tk主线程保存结果并调用on_done()
+
+        已有生成任务在进行时不重复提交。生成期间call_graph被新的分析结果替换时丢弃旧结果
+        """
+        if self._mermaid_generation_future is not None and not self._mermaid_generation_future.done():
+            return
+
+        call_tree = call_analysis.get('call_tree') if call_analysis else None
+        if not call_tree:
+            # 无调用树时只生成一行提示，直接同步完成
+            self.generate_mermaid_flowchart(call_analysis)
+            on_done()
+            return
+
+        sig = self._call_graph_sig
+        ui_width, nodes_per_row = self.prepare_mermaid_generation(call_analysis)
+
+        def finish(future):
+            self._mermaid_generation_future = None
+            try:
+                mermaid_code = future.result()
+            except Exception as e:
+                self.log_message(f"🔧 DEBUG: Background Mermaid generation failed: {e}")
+                self.show_render_error_message()
+                return
+
+            if sig != self._call_graph_sig:
+                # 生成期间分析结果已更新，按新数据重新渲染
+                self.debug_log("call_graph changed during Mermaid generation, discarding result")
+            elif not self.mermaid_code:
+                self.apply_generated_mermaid_code(call_analysis, mermaid_code)
+            on_done()
+
+        def schedule_finish(future):
+            try:
+                self.root.after(0, finish, future)
+            except (RuntimeError, tk.TclError):
+                pass  # 窗口已关闭
+
+        future = self._render_pool.submit(self.build_mermaid_flowchart_code, call_tree, ui_width, nodes_per_row)
+        self._mermaid_generation_future = future
+        future.add_done_callback(schedule_finish)
+
     def generate_plantuml_flowchart(self, call_analysis):
         """根据call_analysis数据生成PlantUML流程图，与Mermaid使用相同的数据源和逻辑"""
         if not call_analysis or 'call_tree' not in call_analysis:
@@ -1833,7 +2969,7 @@ class MCUAnalyzerGUI:
         else:
             nodes_per_row = 5
 
-        self.log_message(f"🔧 DEBUG: PlantUML generation - UI width: {ui_width}, nodes per row: {nodes_per_row}")
+        self.debug_log("PlantUML generation - UI width: %s, nodes per row: %s", ui_width, nodes_per_row)
 
         # 收集所有节点，按层级分组（与Mermaid逻辑完全一致）
         all_functions = []
@@ -1892,7 +3028,7 @@ class MCUAnalyzerGUI:
         self.plantuml_code = "\n".join(plantuml_lines)
 
         # 调试：打印生成的PlantUML代码
-        self.log_message("🔧 DEBUG: Generated PlantUML code:")
+        self.debug_log("Generated PlantUML code:")
         print("=" * 50)
         print(self.plantuml_code)
         print("=" * 50)
@@ -1906,11 +3042,11 @@ class MCUAnalyzerGUI:
         # 定义节点颜色（对应Mermaid的颜色逻辑）
         def get_node_color(func_name):
             if func_name == "main":
-                return "#ff6b6b"  # 红色 - main函数
+                return _CALL_GRAPH_NODE_COLORS[0]  # 红色 - main函数
             elif any(keyword in func_name.lower() for keyword in ['hal_', 'gpio_', 'uart_', 'spi_', 'i2c_', 'tim_', 'adc_', 'dac_']):
-                return "#51cf66"  # 绿色 - HAL/接口函数
+                return _CALL_GRAPH_NODE_COLORS[1]  # 绿色 - HAL/接口函数
             else:
-                return "#74c0fc"  # 蓝色 - 用户自定义函数
+                return _CALL_GRAPH_NODE_COLORS[2]  # 蓝色 - 用户自定义函数
 
         # 为每个函数分配节点ID（与Mermaid逻辑一致）
         for func in all_functions:
@@ -1932,11 +3068,11 @@ class MCUAnalyzerGUI:
 
             # 设置节点颜色
             if func_name == 'main':
-                plantuml_lines.append(f"{node_id} : #ff6b6b")
+                plantuml_lines.append(f"{node_id} : {_CALL_GRAPH_NODE_COLORS[0]}")
             elif func_name.startswith(('HAL_', 'GPIO_', 'UART_', 'SPI_', 'I2C_', 'TIM_', 'ADC_', 'DMA_')):
-                plantuml_lines.append(f"{node_id} : #51cf66")
+                plantuml_lines.append(f"{node_id} : {_CALL_GRAPH_NODE_COLORS[1]}")
             else:
-                plantuml_lines.append(f"{node_id} : #74c0fc")
+                plantuml_lines.append(f"{node_id} : {_CALL_GRAPH_NODE_COLORS[2]}")
 
         plantuml_lines.append("")
 
@@ -2023,7 +3159,7 @@ class MCUAnalyzerGUI:
         try:
             # 调用新的统一更新方法
             self.update_source_flowchart_content()
-            self.log_message("🔧 DEBUG: Source Flowchart tab updated")
+            self.debug_log("Source Flowchart tab updated")
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to update Source Flowchart tab: {e}")
 
@@ -2083,13 +3219,13 @@ class MCUAnalyzerGUI:
                     # 添加节点定义
                     if func_name == 'main':
                         mermaid_lines.append(f"        {node_id}[\"{clean_name}\"]")
-                        mermaid_lines.append(f"        style {node_id} fill:#ff6b6b")
+                        mermaid_lines.append(f"        style {node_id} fill:{_CALL_GRAPH_NODE_COLORS[0]}")
                     elif func_name.startswith(('HAL_', 'GPIO_', 'UART_', 'SPI_', 'I2C_', 'TIM_', 'ADC_', 'DMA_')):
                         mermaid_lines.append(f"        {node_id}[\"{clean_name}\"]")
-                        mermaid_lines.append(f"        style {node_id} fill:#51cf66")
+                        mermaid_lines.append(f"        style {node_id} fill:{_CALL_GRAPH_NODE_COLORS[1]}")
                     else:
                         mermaid_lines.append(f"        {node_id}[\"{clean_name}\"]")
-                        mermaid_lines.append(f"        style {node_id} fill:#74c0fc")
+                        mermaid_lines.append(f"        style {node_id} fill:{_CALL_GRAPH_NODE_COLORS[2]}")
 
                 mermaid_lines.append("    end")
                 mermaid_lines.append("")
@@ -2146,7 +3282,7 @@ class MCUAnalyzerGUI:
         self.flowchart_text.insert(tk.END, self.mermaid_code)
 
         # 添加接口统计
-        if hasattr(self, 'call_graph') and 'interface_usage' in self.call_graph:
+        if self.call_graph and 'interface_usage' in self.call_graph:
             interface_usage = self.call_graph['interface_usage']
             if interface_usage:
                 self.flowchart_text.insert(tk.END, "\n\n## 接口使用统计:\n")
@@ -2177,7 +3313,7 @@ class MCUAnalyzerGUI:
 
     def generate_text_graph_preview(self):
         """生成文本形式的图形预览"""
-        if not hasattr(self, 'call_graph') or not self.call_graph:
+        if not self.call_graph:
             return "暂无调用关系数据"
 
         call_tree = self.call_graph.get('call_tree')
@@ -2246,108 +3382,44 @@ class MCUAnalyzerGUI:
 
     def render_mermaid_in_browser(self):
         """在浏览器中渲染Mermaid图形 - 使用本地mermaid.js"""
-        if not hasattr(self, 'mermaid_code') or not self.mermaid_code:
+        if not self.mermaid_code:
             self.log_message("🔧 DEBUG: No Mermaid code available")
             return
 
         try:
             # 获取本地mermaid.js文件路径
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            mermaid_js_path = os.path.join(script_dir, "assets", "mermaid.min.js")
+            mermaid_js_path = _MERMAID_JS_PATH
 
-            if not os.path.exists(mermaid_js_path):
+            if not _MERMAID_JS_EXISTS:
                 self.log_message(f"🔧 DEBUG: Local mermaid.js not found at {mermaid_js_path}")
                 # 降级到显示源码
                 self.display_mermaid_source_in_ui()
                 return
 
-            # 读取本地mermaid.js内容
-            with open(mermaid_js_path, 'r', encoding='utf-8') as f:
-                mermaid_js_content = f.read()
-
-            # 创建完全离线的HTML文件
-            html_content = f"""<!DOCTYPE html>
-<html>
-<head>
-    <title>STM32 Call Flow Chart - 离线渲染</title>
-    <script>
-{mermaid_js_content}
-    </script>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            margin: 20px;
-            background-color: #f5f5f5;
-        }}
-        .container {{
-            background-color: white;
-            padding: 20px;
-            border-radius: 8px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }}
-        .mermaid {{
-            text-align: center;
-            background-color: white;
-        }}
-        h1 {{
-            color: #333;
-            text-align: center;
-        }}
-        .legend {{
-            margin-top: 20px;
-            padding: 15px;
-            background-color: #f8f9fa;
-            border-radius: 5px;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🔄 STM32项目调用流程图</h1>
-        <div class="mermaid">
-{self.mermaid_code}
-        </div>
-        <div class="legend">
-            <h3>📖 图例说明:</h3>
-            <ul>
-                <li>🔴 <strong>红色节点</strong>: main函数 (程序入口)</li>
-                <li>🟢 <strong>绿色节点</strong>: HAL/GPIO/UART等接口函数</li>
-                <li>🔵 <strong>蓝色节点</strong>: 第一层用户函数</li>
-                <li>🟡 <strong>黄绿节点</strong>: 第二层用户函数</li>
-                <li>🟡 <strong>黄色节点</strong>: 更深层函数</li>
-            </ul>
-        </div>
-    </div>
-    <script>
-        mermaid.initialize({{
-            startOnLoad: true,
-            theme: 'default',
-            flowchart: {{
-                useMaxWidth: true,
-                htmlLabels: true
-            }}
-        }});
-    </script>
-</body>
-</html>"""
-
+            # 读取本地mermaid.js内容
+            mermaid_js_content = _load_mermaid_js(mermaid_js_path)[0]
+
+            # 创建完全离线的HTML文件（固定模板片段 + mermaid.js + Mermaid代码，不拼成一个大字符串）
+            html_parts = (_BROWSER_MERMAID_HTML_HEAD, mermaid_js_content, _BROWSER_MERMAID_HTML_MIDDLE,
+                          self.mermaid_code, _BROWSER_MERMAID_HTML_TAIL)
+
             # 保存到临时文件
 
             with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8') as f:
-                f.write(html_content)
+                f.writelines(html_parts)
                 temp_file = f.name
 
             # 在浏览器中打开
             webbrowser.open(f'file://{temp_file}')
 
             # 更新状态
-            if hasattr(self, 'graph_status_label'):
+            if self.graph_status_label is not None:
                 try:
                     self.graph_status_label.config(text="✅ Mermaid图形已在浏览器中打开")
                 except tk.TclError:
                     pass
 
-            self.log_message(f"🔧 DEBUG: Mermaid rendered in browser: {temp_file}")
+            self.debug_log("Mermaid rendered in browser: %s", temp_file)
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to render Mermaid in browser: {e}")
@@ -2356,14 +3428,14 @@ class MCUAnalyzerGUI:
 
     def render_real_mermaid_in_ui(self):
         """在UI内部渲染真正的Mermaid图形"""
-        if not hasattr(self, 'mermaid_code') or not self.mermaid_code:
+        if not self.mermaid_code:
             self.log_message("🔧 DEBUG: No Mermaid code available")
             return
 
         try:
             # 清理现有内容，保留控制按钮
             widgets_to_keep = []
-            if hasattr(self, 'preview_control_frame'):
+            if self.preview_control_frame is not None:
                 widgets_to_keep.append(self.preview_control_frame)
 
             for widget in self.graph_preview_frame.winfo_children():
@@ -2383,9 +3455,9 @@ class MCUAnalyzerGUI:
     def render_mermaid_with_playwright(self):
         """使用Playwright本地渲染Mermaid图表"""
         try:
-            self.log_message("🔧 DEBUG: Starting Playwright local rendering")
+            self.debug_log("Starting Playwright local rendering")
 
-            if not hasattr(self, 'mermaid_code') or not self.mermaid_code:
+            if not self.mermaid_code:
                 self.log_message("🔧 DEBUG: No Mermaid code available for Playwright rendering")
                 return False
 
@@ -2401,7 +3473,7 @@ class MCUAnalyzerGUI:
                 optimal_width, optimal_height, optimal_dpi = self.calculate_optimal_png_size()
                 width = optimal_width
                 height = optimal_height
-                self.log_message(f"🔧 DEBUG: Using optimal size calculation: {width}x{height} @ {optimal_dpi}DPI")
+                self.debug_log("Using optimal size calculation: %sx%s @ %sDPI", width, height, optimal_dpi)
             except:
                 # 降级到配置文件设置
                 width = self.config.get('mermaid', {}).get('width', 1200)
@@ -2410,8 +3482,21 @@ class MCUAnalyzerGUI:
 
             theme = self.config.get('mermaid', {}).get('theme', 'default')
             scale = self.config.get('mermaid', {}).get('scale', 2.0)  # 高DPI缩放
+            # 视口 × 缩放倍数²不超过母版像素上限
+            scale = min(scale, (_MASTER_PNG_MAX_PIXELS / (width * height)) ** 0.5)
+
+            # Mermaid代码和渲染参数未变时直接复用母版图，只重新缩放显示
+            master_key = (
+                hashlib.blake2b(self.mermaid_code.encode('utf-8'), digest_size=8).digest(),
+                width, height, theme, scale,
+            )
+            if self._master_mermaid_image is not None and self._master_mermaid_key == master_key:
+                self.debug_log("Reusing cached master Mermaid image")
+                self.display_mermaid_image_from_pil_local(self._master_mermaid_image)
+                return True
 
-            self.log_message(f"🔧 DEBUG: Rendering with Playwright - Size: {width}x{height}, Theme: {theme}, Scale: {scale}x")
+            self.debug_log("Rendering with Playwright - Size: %sx%s, Theme: %s, Scale: %sx",
+                           width, height, theme, scale)
 
             # 渲染为PIL图像（高质量）
             pil_image = render_mermaid_to_pil(
@@ -2423,7 +3508,18 @@ class MCUAnalyzerGUI:
             )
 
             if pil_image:
-                self.log_message(f"🔧 DEBUG: Playwright rendering successful, image size: {pil_image.size}")
+                self.debug_log("Playwright rendering successful, image size: %s", pil_image.size)
+                # 截图按SVG实际尺寸裁剪，可能超出视口：超过像素上限时按比例缩小后再作为母版缓存
+                image_width, image_height = pil_image.size
+                if image_width * image_height > _MASTER_PNG_MAX_PIXELS:
+                    from PIL import Image
+                    factor = (_MASTER_PNG_MAX_PIXELS / (image_width * image_height)) ** 0.5
+                    pil_image = pil_image.resize((max(1, int(image_width * factor)), max(1, int(image_height * factor))),
+                                                 Image.Resampling.LANCZOS, reducing_gap=2.0)
+                    self.debug_log("Master image reduced to %s", pil_image.size)
+                self._master_mermaid_image = pil_image
+                self._master_mermaid_key = master_key
+                self._resized_master.clear()
 
                 # 使用现有的PIL图像显示方法
                 self.display_mermaid_image_from_pil_local(pil_image)
@@ -2438,15 +3534,32 @@ class MCUAnalyzerGUI:
             traceback.print_exc()
             return False
 
+    def resize_master_image(self, pil_image, size):
+        """缩小图片；对母版图按尺寸缓存结果，重复显示同一尺寸时不再做LANCZOS"""
+        from PIL import Image
+
+        if pil_image is not self._master_mermaid_image:
+            return pil_image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+        resized = self._resized_master.get(size)
+        if resized is not None:
+            self._resized_master.move_to_end(size)
+            return resized
+
+        resized = pil_image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        self._resized_master[size] = resized
+        if len(self._resized_master) > _RESIZED_MASTER_CACHE_SIZE:
+            self._resized_master.popitem(last=False)
+        return resized
+
     def display_mermaid_image_from_pil_local(self, pil_image):
         """从PIL图像显示本地渲染的Mermaid图表"""
         try:
-            from PIL import Image, ImageTk
-            self.log_message("🔧 DEBUG: Displaying locally rendered Mermaid image from PIL")
+            from PIL import ImageTk
+            self.debug_log("Displaying locally rendered Mermaid image from PIL")
 
             # 清理现有内容
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            self._clear_preview_frame(keep_control=False)
 
             # 创建容器
             container = ttk.LabelFrame(
@@ -2470,26 +3583,11 @@ class MCUAnalyzerGUI:
             if scale < 1.0:
                 new_width = int(image_width * scale)
                 new_height = int(image_height * scale)
-                pil_image = pil_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                self.log_message(f"🔧 DEBUG: Resized image to {new_width}x{new_height} (scale: {scale:.2f})")
+                pil_image = self.resize_master_image(pil_image, (new_width, new_height))
+                self.debug_log("Resized image to %sx%s (scale: %.2f)", new_width, new_height, scale)
 
             # 创建可滚动的显示区域
-            canvas_frame = ttk.Frame(container)
-            canvas_frame.pack(fill=tk.BOTH, expand=True)
-
-            canvas = tk.Canvas(canvas_frame, bg='white', highlightthickness=0)
-            v_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=canvas.yview)
-            h_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=canvas.xview)
-
-            canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-
-            # 布局
-            canvas.grid(row=0, column=0, sticky="nsew")
-            v_scrollbar.grid(row=0, column=1, sticky="ns")
-            h_scrollbar.grid(row=1, column=0, sticky="ew")
-
-            canvas_frame.grid_rowconfigure(0, weight=1)
-            canvas_frame.grid_columnconfigure(0, weight=1)
+            canvas = self._make_scrollable_canvas(container)
 
             # 显示图片
             photo = ImageTk.PhotoImage(pil_image)
@@ -2527,12 +3625,12 @@ class MCUAnalyzerGUI:
                 )
                 if file_path:
                     pil_image.save(file_path)
-                    self.log_message(f"🔧 DEBUG: Image saved to {file_path}")
+                    self.debug_log("Image saved to %s", file_path)
 
             save_btn = ttk.Button(toolbar_frame, text="💾 保存图片", command=save_image)
             save_btn.pack(side=tk.RIGHT, padx=(10, 0))
 
-            self.log_message("🔧 DEBUG: Local Mermaid image displayed successfully")
+            self.debug_log("Local Mermaid image displayed successfully")
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to display local Mermaid image: {e}")
@@ -2540,71 +3638,92 @@ class MCUAnalyzerGUI:
             traceback.print_exc()
 
     def render_mermaid_internal_only(self):
-        """UI内SVG Mermaid渲染 - 严格按配置渲染，不自动降级"""
+        """UI内SVG Mermaid渲染 - 严格按配置的渲染模式渲染，不跨模式降级；成功返回True"""
         try:
-            self.log_message("🔧 DEBUG: Starting UI-internal SVG Mermaid rendering")
+            self.debug_log("Starting UI-internal SVG Mermaid rendering")
 
             # 从配置中获取渲染模式
             rendering_mode = self.config.get('mermaid', {}).get('rendering_mode', 'online')
-            self.log_message(f"🔧 DEBUG: Using rendering mode: {rendering_mode} (strict mode - no auto fallback)")
+            self.debug_log("Using rendering mode: %s (strict mode - no auto fallback)", rendering_mode)
 
             if rendering_mode == 'local':
-                # 本地渲染模式 - 严格使用Playwright，不自动降级
-                self.log_message("🔧 DEBUG: Attempting local Playwright rendering (strict mode)")
+                # 小调用图直接用Canvas绘制，不启动浏览器
+                if self.try_native_canvas_rendering():
+                    self.debug_log("Native canvas rendering succeeded")
+                    return True
+
+                # 本地渲染模式 - 优先使用Playwright，只在本地方案之间降级，不转到在线渲染
+                self.debug_log("Attempting local Playwright rendering (strict mode)")
                 if self.render_mermaid_with_playwright():
-                    self.log_message("🔧 DEBUG: Local Playwright rendering succeeded")
-                    return
-                else:
-                    self.log_message("🔧 DEBUG: Local Playwright rendering failed")
-                    self.show_rendering_failure("本地渲染失败",
-                        "Playwright本地渲染失败。您可以：\n1. 检查Playwright是否正确安装\n2. 手动切换到在线渲染模式\n3. 查看日志获取详细错误信息")
-                    return
+                    self.debug_log("Local Playwright rendering succeeded")
+                    return True
+
+                self.log_message("🔧 DEBUG: Local Playwright rendering failed")
+
+                # 缓存SVG/mmdc/离线mermaid.js（后台渲染，失败时再走本地备选方案）
+                if self.try_local_mermaid_rendering():
+                    self.debug_log("Local mermaid.js rendering started")
+                    return True
+
+                # mermaid.js也不可用：matplotlib -> Canvas -> 源码
+                if self.try_fallback_rendering():
+                    return True
+                self.show_rendering_failure("本地渲染失败",
+                    "Playwright本地渲染失败。您可以：\n1. 检查Playwright是否正确安装\n2. 手动切换到在线渲染模式\n3. 查看日志获取详细错误信息")
+                return False
+
+            elif rendering_mode == 'canvas':
+                # Canvas渲染模式 - 直接按调用树绘制专业级流程图，不依赖浏览器和mermaid.js
+                self.debug_log("Rendering professional Canvas flowchart")
+                self.render_professional_mermaid_in_ui()
+                return True
 
             elif rendering_mode == 'online':
                 # 在线渲染模式 - 失败就失败，不降级
-                self.log_message("🔧 DEBUG: Attempting online rendering only")
+                self.debug_log("Attempting online rendering only")
                 # 获取当前选择的流程图格式
                 current_format = getattr(self, 'current_flowchart_format', 'mermaid')
                 if self.render_flowchart_online(current_format):
-                    self.log_message(f"🔧 DEBUG: Online {current_format} rendering succeeded")
-                    return
+                    self.debug_log("Online %s rendering succeeded", current_format)
+                    return True
                 else:
                     self.log_message(f"🔧 DEBUG: Online {current_format} rendering failed - showing failure message")
                     self.show_rendering_failure("在线渲染失败", f"无法连接到在线{current_format.upper()}服务")
-                    return
+                    return False
 
             else:
                 # 未知渲染模式，默认使用在线渲染（更稳定）
                 self.log_message(f"🔧 DEBUG: Unknown rendering mode: {rendering_mode}, using online as default")
                 current_format = getattr(self, 'current_flowchart_format', 'mermaid')
                 if self.render_flowchart_online(current_format):
-                    self.log_message(f"🔧 DEBUG: Online {current_format} rendering succeeded (default)")
-                    return
+                    self.debug_log("Online %s rendering succeeded (default)", current_format)
+                    return True
                 else:
                     self.log_message("🔧 DEBUG: Online rendering failed")
                     self.show_rendering_failure("在线渲染失败",
                         f"无法连接到在线{current_format.upper()}服务。您可以：\n1. 检查网络连接\n2. 切换到本地渲染模式\n3. 稍后重试")
-                    return
+                    return False
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: render_mermaid_internal_only failed: {e}")
             import traceback
             traceback.print_exc()
             self.show_rendering_failure("渲染错误", f"渲染过程发生错误: {str(e)}")
+            return False
 
     def render_flowchart_online(self, format_type="mermaid", code_content=None):
         """使用kroki.io在线渲染流程图，支持mermaid和plantuml格式"""
         # 确定要渲染的代码内容
         if code_content is None:
             if format_type == "mermaid":
-                if not hasattr(self, 'mermaid_code') or not self.mermaid_code:
+                if not self.mermaid_code:
                     self.log_message("🔧 DEBUG: No mermaid code available")
                     return False
                 code_content = self.mermaid_code
             elif format_type == "plantuml":
                 # 优先使用原始call_analysis数据生成PlantUML代码
                 if hasattr(self, 'last_call_analysis') and self.last_call_analysis:
-                    self.log_message("🔧 DEBUG: Using original call_analysis data for PlantUML rendering")
+                    self.debug_log("Using original call_analysis data for PlantUML rendering")
                     self.generate_plantuml_flowchart(self.last_call_analysis)
                     if hasattr(self, 'plantuml_code') and self.plantuml_code:
                         code_content = self.plantuml_code
@@ -2613,10 +3732,10 @@ class MCUAnalyzerGUI:
                         return False
                 else:
                     # 备用方案：从Mermaid代码转换
-                    if not hasattr(self, 'mermaid_code') or not self.mermaid_code:
+                    if not self.mermaid_code:
                         self.log_message("🔧 DEBUG: No flowchart data available for PlantUML conversion")
                         return False
-                    self.log_message("🔧 DEBUG: Using Mermaid-to-PlantUML conversion as fallback")
+                    self.debug_log("Using Mermaid-to-PlantUML conversion as fallback")
                     code_content = self.convert_mermaid_to_plantuml()
                     if not code_content:
                         self.log_message("🔧 DEBUG: PlantUML code generation failed")
@@ -2631,7 +3750,7 @@ class MCUAnalyzerGUI:
             from PIL import Image, ImageTk
             import io
 
-            self.log_message(f"🔧 DEBUG: Trying online {format_type} rendering with kroki.io")
+            self.debug_log("Trying online %s rendering with kroki.io", format_type)
 
             # 获取在线渲染配置
             mermaid_config = self.config.get('mermaid', {})
@@ -2656,7 +3775,7 @@ class MCUAnalyzerGUI:
             # 尝试kroki.io API - 直接生成PNG
             for attempt in range(max_retries):
                 try:
-                    self.log_message(f"🔧 DEBUG: Attempt {attempt + 1} with kroki.io {format_type} PNG API")
+                    self.debug_log("Attempt %s with kroki.io %s PNG API", attempt + 1, format_type)
 
                     # 根据配置选择编码方式
                     encoding_method = online_config.get('encoding', 'zlib_base64')
@@ -2679,7 +3798,7 @@ class MCUAnalyzerGUI:
                         kroki_png_url = f"{api_url}{encoded}"
                     else:
                         kroki_png_url = f"{api_url}/{encoded}"
-                    self.log_message(f"🔧 DEBUG: Kroki.io {format_type} PNG URL: {kroki_png_url}")
+                    self.debug_log("Kroki.io %s PNG URL: %s", format_type, kroki_png_url)
 
                     # 发送GET请求到kroki.io PNG API
                     response = requests.get(kroki_png_url, headers=headers, timeout=timeout)
@@ -2687,24 +3806,24 @@ class MCUAnalyzerGUI:
                     if response.status_code == 200:
                         # 检查响应类型 - 应该是PNG图片
                         content_type = response.headers.get('content-type', '').lower()
-                        self.log_message(f"🔧 DEBUG: Response content-type: {content_type}")
+                        self.debug_log("Response content-type: %s", content_type)
 
                         # 处理PNG图片响应
                         if 'image' in content_type or 'png' in content_type:
                             # PNG图片响应
                             png_content = response.content
-                            self.log_message(f"🔧 DEBUG: Received {format_type} PNG image, size: {len(png_content)} bytes")
+                            self.debug_log("Received %s PNG image, size: %s bytes", format_type, len(png_content))
 
                             # 保存PNG到文件
                             self.save_png_to_logs(png_content, format_type)
 
                             # 直接加载并显示图片
                             image = Image.open(io.BytesIO(png_content))
-                            self.log_message(f"🔧 DEBUG: {format_type} image size: {image.size}")
+                            self.debug_log("%s image size: %s", format_type, image.size)
 
                             # 显示图片
                             self.display_flowchart_image_from_pil(image, format_type)
-                            self.log_message(f"🔧 DEBUG: Kroki.io {format_type} PNG rendering succeeded")
+                            self.debug_log("Kroki.io %s PNG rendering succeeded", format_type)
                             return True
                         else:
                             self.log_message(f"🔧 DEBUG: Unexpected content type: {content_type}")
@@ -2718,7 +3837,7 @@ class MCUAnalyzerGUI:
             fallback_url = online_config.get('fallback_url')
             if fallback_url:
                 try:
-                    self.log_message(f"🔧 DEBUG: Trying fallback API: {fallback_url}")
+                    self.debug_log("Trying fallback API: %s", fallback_url)
 
                     # 根据API类型选择编码方式
                     if 'mermaid.ink' in fallback_url:
@@ -2739,17 +3858,17 @@ class MCUAnalyzerGUI:
                     else:
                         request_url = f"{fallback_url}/{encoded}"
 
-                    self.log_message(f"🔧 DEBUG: Fallback URL: {request_url[:100]}...")
+                    self.debug_log("Fallback URL: %s...", request_url[:100])
 
                     response = requests.get(request_url, timeout=timeout, headers=headers)
 
                     if response.status_code == 200:
                         content_type = response.headers.get('content-type', '').lower()
-                        self.log_message(f"🔧 DEBUG: Fallback API success, content-type: {content_type}")
+                        self.debug_log("Fallback API success, content-type: %s", content_type)
 
                         if 'image' in content_type:
                             image_content = response.content
-                            self.log_message(f"🔧 DEBUG: Received fallback image, size: {len(image_content)} bytes")
+                            self.debug_log("Received fallback image, size: %s bytes", len(image_content))
 
                             # 保存图片到文件
                             self.save_png_to_logs(image_content, format_type)
@@ -2757,7 +3876,7 @@ class MCUAnalyzerGUI:
                             # 显示图片
                             image = Image.open(io.BytesIO(image_content))
                             self.display_flowchart_image_from_pil(image, format_type)
-                            self.log_message(f"🔧 DEBUG: Fallback {format_type} rendering succeeded")
+                            self.debug_log("Fallback %s rendering succeeded", format_type)
                             return True
                     else:
                         self.log_message(f"🔧 DEBUG: Fallback API failed with status: {response.status_code}")
@@ -2782,14 +3901,14 @@ class MCUAnalyzerGUI:
     def update_flowchart_content(self, format_type):
         """根据格式更新流程图内容"""
         try:
-            self.log_message(f"🔧 DEBUG: Updating flowchart content to {format_type}")
+            self.debug_log("Updating flowchart content to %s", format_type)
 
             # 更新当前格式
             self.current_flowchart_format = format_type
 
             # 根据格式生成相应的代码
             if format_type == "mermaid":
-                if hasattr(self, 'mermaid_code') and self.mermaid_code:
+                if self.mermaid_code:
                     # 重新渲染Mermaid
                     self.render_flowchart_online("mermaid")
                 else:
@@ -2797,7 +3916,7 @@ class MCUAnalyzerGUI:
             elif format_type == "plantuml":
                 # 优先使用原始call_analysis数据生成PlantUML代码
                 if hasattr(self, 'last_call_analysis') and self.last_call_analysis:
-                    self.log_message("🔧 DEBUG: Using original call_analysis data for PlantUML generation")
+                    self.debug_log("Using original call_analysis data for PlantUML generation")
                     self.generate_plantuml_flowchart(self.last_call_analysis)
                     if hasattr(self, 'plantuml_code') and self.plantuml_code:
                         # 渲染PlantUML
@@ -2806,7 +3925,7 @@ class MCUAnalyzerGUI:
                         self.log_message("🔧 DEBUG: Failed to generate PlantUML from call_analysis")
                 else:
                     # 备用方案：从Mermaid代码转换
-                    self.log_message("🔧 DEBUG: Using Mermaid-to-PlantUML conversion as fallback")
+                    self.debug_log("Using Mermaid-to-PlantUML conversion as fallback")
                     plantuml_code = self.convert_mermaid_to_plantuml()
                     if plantuml_code:
                         self.plantuml_code = plantuml_code
@@ -2827,7 +3946,7 @@ class MCUAnalyzerGUI:
             # 获取选择的格式
             if hasattr(self, 'flowchart_format_var'):
                 selected_format = self.flowchart_format_var.get()
-                self.log_message(f"🔧 DEBUG: Flowchart format changed to: {selected_format}")
+                self.debug_log("Flowchart format changed to: %s", selected_format)
 
                 # 更新内容
                 self.update_flowchart_content(selected_format)
@@ -2846,7 +3965,7 @@ class MCUAnalyzerGUI:
 
                 # 根据格式显示相应的源码
                 if current_format == "mermaid":
-                    if hasattr(self, 'mermaid_code') and self.mermaid_code:
+                    if self.mermaid_code:
                         self.flowchart_text.insert(tk.END, self.mermaid_code)
                     else:
                         self.flowchart_text.insert(tk.END, "# 暂无Mermaid代码\n# 请先进行代码分析")
@@ -2856,7 +3975,7 @@ class MCUAnalyzerGUI:
                     else:
                         # 优先使用原始call_analysis数据生成PlantUML代码
                         if hasattr(self, 'last_call_analysis') and self.last_call_analysis:
-                            self.log_message("🔧 DEBUG: Generating PlantUML from original call_analysis data")
+                            self.debug_log("Generating PlantUML from original call_analysis data")
                             self.generate_plantuml_flowchart(self.last_call_analysis)
                             if hasattr(self, 'plantuml_code') and self.plantuml_code:
                                 self.flowchart_text.insert(tk.END, self.plantuml_code)
@@ -2864,7 +3983,7 @@ class MCUAnalyzerGUI:
                                 self.flowchart_text.insert(tk.END, "# PlantUML代码生成失败\n# 请重新进行代码分析")
                         else:
                             # 备用方案：从Mermaid代码转换
-                            self.log_message("🔧 DEBUG: Using Mermaid-to-PlantUML conversion for source display")
+                            self.debug_log("Using Mermaid-to-PlantUML conversion for source display")
                             plantuml_code = self.convert_mermaid_to_plantuml()
                             if plantuml_code:
                                 self.plantuml_code = plantuml_code
@@ -2879,7 +3998,7 @@ class MCUAnalyzerGUI:
         """刷新当前格式的流程图"""
         try:
             current_format = self.get_current_flowchart_format()
-            self.log_message(f"🔧 DEBUG: Refreshing {current_format} flowchart")
+            self.debug_log("Refreshing %s flowchart", current_format)
             self.update_flowchart_content(current_format)
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to refresh flowchart: {e}")
@@ -2890,7 +4009,7 @@ class MCUAnalyzerGUI:
             # 获取选择的格式
             if hasattr(self, 'source_format_var'):
                 selected_format = self.source_format_var.get()
-                self.log_message(f"🔧 DEBUG: Source format changed to: {selected_format}")
+                self.debug_log("Source format changed to: %s", selected_format)
 
                 # 同步流程图页面的格式选择
                 if hasattr(self, 'flowchart_format_var'):
@@ -2910,9 +4029,9 @@ class MCUAnalyzerGUI:
             from PIL import Image, ImageTk
             import io
 
-            self.log_message("🔧 DEBUG: Trying online Mermaid rendering")
+            self.debug_log("Trying online Mermaid rendering")
 
-            if not hasattr(self, 'mermaid_code') or not self.mermaid_code:
+            if not self.mermaid_code:
                 self.log_message("🔧 DEBUG: No mermaid code available")
                 return False
 
@@ -2941,7 +4060,7 @@ class MCUAnalyzerGUI:
             # 尝试主要API (kroki.io) - 直接生成PNG
             for attempt in range(max_retries):
                 try:
-                    self.log_message(f"🔧 DEBUG: Attempt {attempt + 1} with kroki.io PNG API")
+                    self.debug_log("Attempt %s with kroki.io PNG API", attempt + 1)
 
 
 
@@ -2953,7 +4072,7 @@ class MCUAnalyzerGUI:
 
                     # 构建kroki.io PNG API URL
                     kroki_png_url = f"https://kroki.io/mermaid/png/{encoded}"
-                    self.log_message(f"🔧 DEBUG: Kroki.io PNG URL: {kroki_png_url}")
+                    self.debug_log("Kroki.io PNG URL: %s", kroki_png_url)
 
                     # 发送GET请求到kroki.io PNG API
                     response = requests.get(kroki_png_url, headers=headers, timeout=timeout)
@@ -2961,24 +4080,24 @@ class MCUAnalyzerGUI:
                     if response.status_code == 200:
                         # 检查响应类型 - 应该是PNG图片
                         content_type = response.headers.get('content-type', '').lower()
-                        self.log_message(f"🔧 DEBUG: Response content-type: {content_type}")
+                        self.debug_log("Response content-type: %s", content_type)
 
                         # 处理PNG图片响应
                         if 'image' in content_type or 'png' in content_type:
                             # PNG图片响应
                             png_content = response.content
-                            self.log_message(f"🔧 DEBUG: Received PNG image, size: {len(png_content)} bytes")
+                            self.debug_log("Received PNG image, size: %s bytes", len(png_content))
 
                             # 保存PNG到文件
                             self.save_png_to_logs(png_content)
 
                             # 直接加载并显示图片，不做任何调整
                             image = Image.open(io.BytesIO(png_content))
-                            self.log_message(f"🔧 DEBUG: Image size: {image.size}")
+                            self.debug_log("Image size: %s", image.size)
 
                             # 直接显示图片
                             self.display_mermaid_image_from_pil(image)
-                            self.log_message("🔧 DEBUG: Kroki.io PNG rendering succeeded")
+                            self.debug_log("Kroki.io PNG rendering succeeded")
                             return True
                         else:
                             self.log_message(f"🔧 DEBUG: Unexpected content type: {content_type}")
@@ -2990,7 +4109,7 @@ class MCUAnalyzerGUI:
 
             # 尝试备用API (mermaid-live-editor)
             try:
-                self.log_message(f"🔧 DEBUG: Trying fallback API: {fallback_url}")
+                self.debug_log("Trying fallback API: %s", fallback_url)
 
                 # 尝试mermaid-live-editor的API格式
                 # 编码Mermaid代码为base64
@@ -3009,7 +4128,7 @@ class MCUAnalyzerGUI:
                 if response.status_code == 200:
                     # 检查是否是SVG响应
                     content_type = response.headers.get('content-type', '').lower()
-                    self.log_message(f"🔧 DEBUG: Fallback API content-type: {content_type}")
+                    self.debug_log("Fallback API content-type: %s", content_type)
 
                     # 检查响应内容是否是SVG（通过内容判断，不依赖content-type）
                     response_text = response.text.strip()
@@ -3020,13 +4139,13 @@ class MCUAnalyzerGUI:
 
                         # 显示SVG内容
                         self.display_svg_content(svg_content)
-                        self.log_message("🔧 DEBUG: Fallback API SVG rendering succeeded")
+                        self.debug_log("Fallback API SVG rendering succeeded")
                         return True
                     else:
                         # 图片响应
                         image = Image.open(io.BytesIO(response.content))
                         self.display_mermaid_image_from_pil(image)
-                        self.log_message("🔧 DEBUG: Fallback API image rendering succeeded")
+                        self.debug_log("Fallback API image rendering succeeded")
                         return True
 
             except Exception as e:
@@ -3064,8 +4183,8 @@ class MCUAnalyzerGUI:
             with open(png_file_path, 'wb') as f:
                 f.write(png_content)
 
-            self.log_message(f"🔧 DEBUG: {format_type} PNG saved to: {png_file_path}")
-            self.log_message(f"🔧 DEBUG: PNG file size: {len(png_content)} bytes")
+            self.debug_log("%s PNG saved to: %s", format_type, png_file_path)
+            self.debug_log("PNG file size: %s bytes", len(png_content))
 
             # 同时保存一个带时间戳的版本
             from datetime import datetime
@@ -3075,20 +4194,40 @@ class MCUAnalyzerGUI:
             with open(timestamped_file, 'wb') as f:
                 f.write(png_content)
 
-            self.log_message(f"🔧 DEBUG: Timestamped {format_type} PNG saved to: {timestamped_file}")
+            self.debug_log("Timestamped %s PNG saved to: %s", format_type, timestamped_file)
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to save {format_type} PNG to logs: {e}")
 
+    def _make_scrollable_canvas(self, parent):
+        """创建带横竖滚动条的白底Canvas（grid布局），返回Canvas"""
+        canvas_frame = ttk.Frame(parent)
+        canvas_frame.pack(fill=tk.BOTH, expand=True)
+
+        canvas = tk.Canvas(canvas_frame, bg='white', highlightthickness=0)
+        v_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=canvas.yview)
+        h_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=canvas.xview)
+
+        canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+
+        # 布局
+        canvas.grid(row=0, column=0, sticky="nsew")
+        v_scrollbar.grid(row=0, column=1, sticky="ns")
+        h_scrollbar.grid(row=1, column=0, sticky="ew")
+
+        canvas_frame.grid_rowconfigure(0, weight=1)
+        canvas_frame.grid_columnconfigure(0, weight=1)
+
+        return canvas
+
     def display_flowchart_image_from_pil(self, pil_image, format_type="mermaid"):
         """从PIL图像显示流程图"""
         try:
             from PIL import ImageTk
-            self.log_message(f"🔧 DEBUG: Displaying {format_type} image from PIL")
+            self.debug_log("Displaying %s image from PIL", format_type)
 
             # 清理现有内容
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            self._clear_preview_frame(keep_control=False)
 
             # 创建容器
             format_name = "Mermaid" if format_type == "mermaid" else "PlantUML"
@@ -3103,22 +4242,7 @@ class MCUAnalyzerGUI:
             photo = ImageTk.PhotoImage(pil_image)
 
             # 创建可滚动的显示区域
-            canvas_frame = ttk.Frame(container)
-            canvas_frame.pack(fill=tk.BOTH, expand=True)
-
-            canvas = tk.Canvas(canvas_frame, bg='white', highlightthickness=0)
-            v_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=canvas.yview)
-            h_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=canvas.xview)
-
-            canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-
-            # 布局
-            canvas.grid(row=0, column=0, sticky="nsew")
-            v_scrollbar.grid(row=0, column=1, sticky="ns")
-            h_scrollbar.grid(row=1, column=0, sticky="ew")
-
-            canvas_frame.grid_rowconfigure(0, weight=1)
-            canvas_frame.grid_columnconfigure(0, weight=1)
+            canvas = self._make_scrollable_canvas(container)
 
             # 在Canvas中显示图像
             canvas.create_image(10, 10, anchor=tk.NW, image=photo)
@@ -3128,7 +4252,7 @@ class MCUAnalyzerGUI:
             canvas.update_idletasks()
             canvas.configure(scrollregion=canvas.bbox("all"))
 
-            self.log_message(f"🔧 DEBUG: {format_type} image displayed successfully")
+            self.debug_log("%s image displayed successfully", format_type)
             return True
 
         except Exception as e:
@@ -3151,56 +4275,62 @@ class MCUAnalyzerGUI:
             # 确保logs目录存在
             logs_dir.mkdir(exist_ok=True)
 
-            # 保存SVG文件
+            # 保存SVG文件（只编码一次，按字节写出，跳过换行符转换）
             svg_file_path = logs_dir / "temp.svg"
+            svg_bytes = svg_content.encode('utf-8')
 
-            with open(svg_file_path, 'w', encoding='utf-8') as f:
-                f.write(svg_content)
+            svg_file_path.write_bytes(svg_bytes)
 
-            self.log_message(f"🔧 DEBUG: SVG saved to: {svg_file_path}")
-            self.log_message(f"🔧 DEBUG: SVG file size: {len(svg_content)} characters")
+            self.debug_log("SVG saved to: %s", svg_file_path)
+            self.debug_log("SVG file size: %s characters", len(svg_content))
 
             # 同时保存一个带时间戳的版本
             from datetime import datetime
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             timestamped_file = logs_dir / f"mermaid_{timestamp}.svg"
 
-            with open(timestamped_file, 'w', encoding='utf-8') as f:
-                f.write(svg_content)
+            timestamped_file.write_bytes(svg_bytes)
 
-            self.log_message(f"🔧 DEBUG: Timestamped SVG saved to: {timestamped_file}")
+            self.debug_log("Timestamped SVG saved to: %s", timestamped_file)
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to save SVG to logs: {e}")
 
 
 
-    def try_fallback_rendering(self):
-        """尝试备选渲染方案"""
+    def try_fallback_rendering(self, exclude=()):
+        """尝试备选渲染方案（上次成功的方案优先），exclude中的方案跳过（已在后台失败的方案）"""
         try:
-            self.log_message("🔧 DEBUG: Trying fallback rendering methods")
+            self.debug_log("Trying fallback rendering methods")
 
             # 获取备选方案配置
             mermaid_config = self.config.get('mermaid', {})
             fallback_config = mermaid_config.get('fallback', {})
 
-            # 尝试matplotlib渲染
+            # 按配置组装备选方案：matplotlib -> Canvas -> 源码
+            fallbacks = []
             if fallback_config.get('use_matplotlib', True):
-                if self.render_with_matplotlib_fallback():
-                    self.log_message("🔧 DEBUG: Matplotlib fallback rendering succeeded")
-                    return True
-
-            # 尝试简化Canvas渲染
+                fallbacks.append(self.render_mermaid_with_matplotlib)
             if fallback_config.get('use_canvas', True):
-                if self.render_simplified_graph_in_canvas():
-                    self.log_message("🔧 DEBUG: Canvas fallback rendering succeeded")
+                fallbacks.append(self.render_canvas_flowchart)
+            if fallback_config.get('show_source_code', True):
+                fallbacks.append(self.show_mermaid_source_fallback)
+
+            # 上次成功的方案直接排到最前，避免每次都先付出matplotlib导入等开销
+            if self._preferred_fallback in fallbacks:
+                fallbacks.remove(self._preferred_fallback)
+                fallbacks.insert(0, self._preferred_fallback)
+
+            for fallback in fallbacks:
+                if fallback in exclude:
+                    continue
+                if fallback():
+                    self._preferred_fallback = fallback
+                    self.debug_log("Fallback rendering succeeded: %s", fallback.__name__)
                     return True
 
-            # 显示源码
-            if fallback_config.get('show_source_code', True):
-                self.display_mermaid_source_in_ui()
-                self.log_message("🔧 DEBUG: Showing Mermaid source code as fallback")
-                return True
+            # 全部失败，重新选举
+            self._preferred_fallback = None
 
             # 最终显示错误信息
             self.show_svg_render_failure()
@@ -3211,14 +4341,18 @@ class MCUAnalyzerGUI:
             self.show_svg_render_failure()
             return False
 
+    def show_mermaid_source_fallback(self):
+        """备选方案：显示Mermaid源码（总是成功）"""
+        self.display_mermaid_source_in_ui()
+        return True
+
     def display_mermaid_image_from_pil(self, pil_image):
         """从PIL图像显示Mermaid图表"""
         try:
-            self.log_message("🔧 DEBUG: Displaying Mermaid image from PIL")
+            self.debug_log("Displaying Mermaid image from PIL")
 
             # 清理现有内容
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            self._clear_preview_frame(keep_control=False)
 
             # 创建容器
             container = ttk.LabelFrame(
@@ -3232,22 +4366,7 @@ class MCUAnalyzerGUI:
             photo = ImageTk.PhotoImage(pil_image)
 
             # 创建可滚动的显示区域
-            canvas_frame = ttk.Frame(container)
-            canvas_frame.pack(fill=tk.BOTH, expand=True)
-
-            canvas = tk.Canvas(canvas_frame, bg='white', highlightthickness=0)
-            v_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=canvas.yview)
-            h_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=canvas.xview)
-
-            canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-
-            # 布局
-            canvas.grid(row=0, column=0, sticky="nsew")
-            v_scrollbar.grid(row=0, column=1, sticky="ns")
-            h_scrollbar.grid(row=1, column=0, sticky="ew")
-
-            canvas_frame.grid_rowconfigure(0, weight=1)
-            canvas_frame.grid_columnconfigure(0, weight=1)
+            canvas = self._make_scrollable_canvas(container)
 
             # 在Canvas中显示图像
             canvas.create_image(10, 10, anchor=tk.NW, image=photo)
@@ -3257,7 +4376,7 @@ class MCUAnalyzerGUI:
             canvas.update_idletasks()
             canvas.configure(scrollregion=canvas.bbox("all"))
 
-            self.log_message("🔧 DEBUG: Mermaid image displayed successfully")
+            self.debug_log("Mermaid image displayed successfully")
             return True
 
         except Exception as e:
@@ -3267,14 +4386,13 @@ class MCUAnalyzerGUI:
     def display_svg_content(self, svg_content):
         """在UI内显示SVG内容 - 智能备选方案"""
         try:
-            self.log_message("🔧 DEBUG: Displaying SVG content with smart fallback")
+            self.debug_log("Displaying SVG content with smart fallback")
 
             # 先保存SVG到文件
             self.save_svg_to_logs(svg_content)
 
             # 清理现有内容
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            self._clear_preview_frame(keep_control=False)
 
             # 创建主容器
             main_container = ttk.LabelFrame(
@@ -3284,58 +4402,22 @@ class MCUAnalyzerGUI:
             )
             main_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-            self.log_message(f"🔧 DEBUG: SVG content length: {len(svg_content)}")
+            self.debug_log("SVG content length: %s", len(svg_content))
 
             # 删除SVG转PNG转换，只保留在线渲染
-            self.log_message("🔧 DEBUG: SVG转PNG转换已删除，仅支持在线渲染")
+            self.debug_log("SVG转PNG转换已删除，仅支持在线渲染")
 
             # 创建HTML文件并提供查看选项
             try:
                 import os
 
-                # 创建HTML文件
-                html_content = f"""<!DOCTYPE html>
-<html>
-<head>
-    <title>Mermaid Flowchart</title>
-    <meta charset="UTF-8">
-    <style>
-        body {{
-            margin: 20px;
-            text-align: center;
-            font-family: "Microsoft YaHei", "SimHei", Arial, sans-serif;
-            background-color: #f8f9fa;
-        }}
-        .container {{
-            max-width: 1200px;
-            margin: 0 auto;
-            background: white;
-            padding: 20px;
-            border-radius: 8px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        svg {{
-            max-width: 100%;
-            height: auto;
-            border: 1px solid #ddd;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🧜‍♀️ Mermaid流程图</h1>
-        <p>在线渲染成功 ✅ (UI内显示遇到问题，请在浏览器中查看)</p>
-        {svg_content}
-    </div>
-</body>
-</html>"""
-
                 # 保存HTML文件到logs目录
                 logs_dir = os.path.dirname(os.path.abspath(__file__)) + "/logs"
                 html_file = os.path.join(logs_dir, "mermaid_preview.html")
 
-                with open(html_file, 'w', encoding='utf-8') as f:
-                    f.write(html_content)
+                # 分块写出，避免头尾与SVG内容拼接成一份完整副本
+                with open(html_file, 'w', encoding='utf-8', buffering=1 << 16) as f:
+                    f.writelines((_SVG_PREVIEW_HTML_HEAD, svg_content, _SVG_PREVIEW_HTML_TAIL))
 
                 # 显示问题说明和解决方案
                 warning_label = ttk.Label(
@@ -3408,7 +4490,7 @@ class MCUAnalyzerGUI:
                 text_widget.insert(tk.END, tech_info)
                 text_widget.config(state=tk.DISABLED)
 
-                self.log_message(f"🔧 DEBUG: HTML fallback created: {html_file}")
+                self.debug_log("HTML fallback created: %s", html_file)
                 return True
 
             except Exception as e:
@@ -3439,7 +4521,7 @@ class MCUAnalyzerGUI:
 
     def convert_svg_to_png_removed(self):
         """SVG转PNG转换方法已删除，仅支持在线渲染"""
-        self.log_message("🔧 DEBUG: 本地SVG转PNG功能已移除，请使用在线渲染")
+        self.debug_log("本地SVG转PNG功能已移除，请使用在线渲染")
         return False
 
     def display_converted_svg_image(self, parent, pil_image, conversion_method):
@@ -3454,24 +4536,8 @@ class MCUAnalyzerGUI:
             )
             title_label.pack(pady=(0, 10))
 
-            # 创建可滚动的图像显示区域
-            canvas_frame = ttk.Frame(parent)
-            canvas_frame.pack(fill=tk.BOTH, expand=True)
-
-            # 创建Canvas和滚动条
-            canvas = tk.Canvas(canvas_frame, bg='white', highlightthickness=0)
-            v_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=canvas.yview)
-            h_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=canvas.xview)
-
-            canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-
-            # 布局
-            canvas.grid(row=0, column=0, sticky="nsew")
-            v_scrollbar.grid(row=0, column=1, sticky="ns")
-            h_scrollbar.grid(row=1, column=0, sticky="ew")
-
-            canvas_frame.grid_rowconfigure(0, weight=1)
-            canvas_frame.grid_columnconfigure(0, weight=1)
+            # 创建可滚动的显示区域
+            canvas = self._make_scrollable_canvas(parent)
 
             # 转换PIL图像为Tkinter格式
             from PIL import ImageTk
@@ -3491,7 +4557,7 @@ class MCUAnalyzerGUI:
             canvas.update_idletasks()
             canvas.configure(scrollregion=canvas.bbox("all"))
 
-            self.log_message(f"🔧 DEBUG: Converted SVG image displayed successfully using {conversion_method}")
+            self.debug_log("Converted SVG image displayed successfully using %s", conversion_method)
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to display converted SVG image: {e}")
@@ -3520,8 +4586,7 @@ class MCUAnalyzerGUI:
                     title="保存Mermaid SVG文件"
                 )
                 if file_path:
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(svg_content)
+                    Path(file_path).write_bytes(svg_content.encode('utf-8'))
                     messagebox.showinfo("保存成功", f"SVG文件已保存到:\n{file_path}")
 
             def view_in_browser():
@@ -3583,7 +4648,7 @@ class MCUAnalyzerGUI:
             preview_text.insert(tk.END, preview_content)
             preview_text.config(state=tk.DISABLED)
 
-            self.log_message("🔧 DEBUG: SVG options displayed successfully")
+            self.debug_log("SVG options displayed successfully")
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to display SVG options: {e}")
@@ -3592,8 +4657,7 @@ class MCUAnalyzerGUI:
         """显示SVG在浏览器中打开的成功信息"""
         try:
             # 清理现有内容
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            self._clear_preview_frame(keep_control=False)
 
             # 创建成功信息容器
             success_frame = ttk.LabelFrame(
@@ -3645,7 +4709,7 @@ class MCUAnalyzerGUI:
             info_text.insert(tk.END, info_content)
             info_text.config(state=tk.DISABLED)
 
-            self.log_message("🔧 DEBUG: SVG success message displayed")
+            self.debug_log("SVG success message displayed")
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to show SVG success message: {e}")
@@ -3654,8 +4718,7 @@ class MCUAnalyzerGUI:
         """显示SVG源码"""
         try:
             # 清理现有内容
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            self._clear_preview_frame(keep_control=False)
 
             # 创建源码显示区域
             source_frame = ttk.LabelFrame(
@@ -3679,22 +4742,39 @@ class MCUAnalyzerGUI:
             scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
             text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-            # 插入SVG内容
+            # 插入SVG内容（分块插入，插入后只读）
             text_widget.insert(tk.END, "在线渲染成功！SVG源码如下：\n\n")
-            text_widget.insert(tk.END, svg_content)
-            text_widget.config(state=tk.DISABLED)
+            self.insert_text_chunked(text_widget, svg_content)
 
-            self.log_message("🔧 DEBUG: SVG source code displayed")
+            self.debug_log("SVG source code displayed")
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to display SVG source code: {e}")
 
+    def insert_text_chunked(self, text_widget, content, chunk_size=1 << 16, max_chars=None):
+        """分块插入大段文本并将Text设为只读（关闭undo，避免整段一次性排版）
+
+        Text可以已是只读状态，插入前临时切回可编辑。
+        指定max_chars时只显示前max_chars个字符，并在末尾追加截断提示
+        """
+        text_widget.configure(state=tk.NORMAL, undo=False, autoseparators=False)
+        truncated = max_chars is not None and len(content) > max_chars
+        if truncated:
+            content = content[:max_chars]
+        for start in range(0, len(content), chunk_size):
+            text_widget.insert(tk.END, content[start:start + chunk_size])
+            # 每插入约1MB让Tk处理一次空闲任务，保持界面响应
+            if start and start % (1 << 20) == 0:
+                text_widget.update_idletasks()
+        if truncated:
+            text_widget.insert(tk.END, f"\n\n…[内容过长，仅显示前 {max_chars} 个字符]…\n")
+        text_widget.config(state=tk.DISABLED)
+
     def show_rendering_failure(self, title, message):
         """显示渲染失败信息"""
         try:
             # 清理现有内容
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            self._clear_preview_frame(keep_control=False)
 
             # 创建错误信息容器
             error_frame = ttk.LabelFrame(
@@ -3747,15 +4827,14 @@ class MCUAnalyzerGUI:
     def render_mermaid_with_ui_webview(self):
         """使用UI内webview渲染Mermaid - 参考VSCode MPE实现"""
         try:
-            self.log_message("🔧 DEBUG: Starting UI webview Mermaid rendering (VSCode MPE style)")
+            self.debug_log("Starting UI webview Mermaid rendering (VSCode MPE style)")
 
-            if not hasattr(self, 'mermaid_code') or not self.mermaid_code:
+            if not self.mermaid_code:
                 self.log_message("🔧 DEBUG: No mermaid code available")
                 return False
 
             # 清理现有内容
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            self._clear_preview_frame(keep_control=False)
 
             # 创建主容器
             main_container = ttk.LabelFrame(
@@ -3771,19 +4850,19 @@ class MCUAnalyzerGUI:
             # 方案1: 尝试使用webview库
             if self.try_webview_library(main_container):
                 webview_success = True
-                self.log_message("🔧 DEBUG: webview library rendering succeeded")
+                self.debug_log("webview library rendering succeeded")
             # 方案2: 尝试使用tkinter.html
             elif self.try_tkinter_html_widget(main_container):
                 webview_success = True
-                self.log_message("🔧 DEBUG: tkinter.html rendering succeeded")
+                self.debug_log("tkinter.html rendering succeeded")
             # 方案3: 尝试使用CEF
             elif self.try_cef_embedded(main_container):
                 webview_success = True
-                self.log_message("🔧 DEBUG: CEF embedded rendering succeeded")
+                self.debug_log("CEF embedded rendering succeeded")
 
             if webview_success:
                 # 更新状态
-                if hasattr(self, 'graph_status_label'):
+                if self.graph_status_label is not None:
                     try:
                         self.graph_status_label.config(text="✅ Mermaid图形已在UI内部渲染")
                     except tk.TclError:
@@ -3802,12 +4881,12 @@ class MCUAnalyzerGUI:
     def try_webview_library(self, parent_container):
         """直接在UI内显示Mermaid内容（不使用webview避免卡死）"""
         try:
-            self.log_message("🔧 DEBUG: Using direct UI rendering (avoiding webview blocking)")
+            self.debug_log("Using direct UI rendering (avoiding webview blocking)")
 
-            # 创建HTML内容
-            html_content = self.create_vscode_style_mermaid_html()
+            # 创建HTML内容（分块保存，写文件时直接writelines）
+            html_chunks = self.create_vscode_style_mermaid_html_chunks()
 
-            self.log_message(f"🔧 DEBUG: HTML content created, length: {len(html_content)}")
+            self.debug_log("HTML content created, length: %s", sum(map(len, html_chunks)))
 
             # 创建显示容器
             display_frame = ttk.Frame(parent_container)
@@ -3824,7 +4903,7 @@ class MCUAnalyzerGUI:
 
             # 直接显示方案：显示HTML源码和保存功能
             try:
-                self.log_message("🔧 DEBUG: Creating direct UI display...")
+                self.debug_log("Creating direct UI display...")
 
                 # 创建说明标签
                 info_label = ttk.Label(
@@ -3847,15 +4926,15 @@ class MCUAnalyzerGUI:
                         title="保存Mermaid HTML文件"
                     )
                     if file_path:
-                        with open(file_path, 'w', encoding='utf-8') as f:
-                            f.write(html_content)
+                        with open(file_path, 'w', encoding='utf-8', buffering=1 << 16) as f:
+                            f.writelines(html_chunks)
                         messagebox.showinfo("保存成功", f"Mermaid HTML文件已保存到:\n{file_path}\n\n请用浏览器打开查看流程图")
 
                 def open_temp_html():
                     import tempfile
                     import webbrowser
-                    with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8') as f:
-                        f.write(html_content)
+                    with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8', buffering=1 << 16) as f:
+                        f.writelines(html_chunks)
                         temp_file = f.name
                     webbrowser.open(f'file://{temp_file}')
 
@@ -3897,11 +4976,11 @@ class MCUAnalyzerGUI:
                 scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
                 mermaid_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-                # 插入Mermaid代码
-                mermaid_text.insert(tk.END, f"生成的Mermaid流程图代码:\n\n{self.mermaid_code}")
-                mermaid_text.config(state=tk.DISABLED)
+                # 插入Mermaid代码（分块插入，插入后只读）
+                mermaid_text.insert(tk.END, "生成的Mermaid流程图代码:\n\n")
+                self.insert_text_chunked(mermaid_text, self.mermaid_code)
 
-                self.log_message("🔧 DEBUG: Direct UI display successful")
+                self.debug_log("Direct UI display successful")
                 return True
 
             except Exception as e:
@@ -3932,7 +5011,7 @@ class MCUAnalyzerGUI:
 
                 # 插入HTML内容
                 html_text.insert(tk.END, "生成的HTML内容（包含Mermaid渲染）:\n\n")
-                html_text.insert(tk.END, html_content)
+                html_text.insert(tk.END, ''.join(html_chunks))
                 html_text.config(state=tk.DISABLED)
 
                 # 添加说明按钮
@@ -3946,8 +5025,8 @@ class MCUAnalyzerGUI:
                         filetypes=[("HTML files", "*.html"), ("All files", "*.*")]
                     )
                     if file_path:
-                        with open(file_path, 'w', encoding='utf-8') as f:
-                            f.write(html_content)
+                        with open(file_path, 'w', encoding='utf-8', buffering=1 << 16) as f:
+                            f.writelines(html_chunks)
                         messagebox.showinfo("成功", f"HTML文件已保存到:\n{file_path}")
 
                 save_btn = ttk.Button(btn_frame, text="💾 保存HTML文件", command=save_html)
@@ -3984,7 +5063,7 @@ class MCUAnalyzerGUI:
         try:
             from tkinter import html
 
-            self.log_message("🔧 DEBUG: Trying tkinter HTML widget")
+            self.debug_log("Trying tkinter HTML widget")
 
             # 创建HTML内容
             html_content = self.create_vscode_style_mermaid_html()
@@ -3996,7 +5075,7 @@ class MCUAnalyzerGUI:
             )
             html_widget.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
-            self.log_message("🔧 DEBUG: tkinter HTML widget rendering successful")
+            self.debug_log("tkinter HTML widget rendering successful")
             return True
 
         except ImportError:
@@ -4008,11 +5087,13 @@ class MCUAnalyzerGUI:
 
     def try_cef_embedded(self, parent_container):
         """尝试使用CEF嵌入式渲染"""
+        if not self._backends['cef']:
+            return False
+
         try:
             from cefpython3 import cefpython as cef
-            import sys
 
-            self.log_message("🔧 DEBUG: Trying CEF embedded rendering")
+            self.debug_log("Trying CEF embedded rendering")
 
             # 创建CEF容器
             cef_frame = ttk.Frame(parent_container)
@@ -4026,30 +5107,14 @@ class MCUAnalyzerGUI:
             )
             status_label.pack(pady=20)
 
-            # 创建HTML内容
-            html_content = self.create_vscode_style_mermaid_html()
-
-            # CEF设置
-            settings = {
-                "multi_threaded_message_loop": False,
-                "auto_zooming": "system_dpi",
-                "log_severity": cef.LOGSEVERITY_INFO,
-                "log_file": "",
-            }
+            # 创建HTML内容（mermaid.js由请求拦截从内存提供，不内联进data URL）
+            html_content = self.create_vscode_style_mermaid_html(external_mermaid_js=True)
 
-            # 初始化CEF
-            sys.excepthook = cef.ExceptHook
-            cef.Initialize(settings)
+            # 初始化CEF（进程内只初始化一次）
+            self.ensure_cef_initialized(cef)
 
             # 创建浏览器窗口 - 嵌入到tkinter中
-            window_info = cef.WindowInfo()
-            window_info.SetAsChild(cef_frame.winfo_id(), [0, 0, 800, 600])
-
-            # 创建浏览器
-            browser = cef.CreateBrowserSync(
-                window_info,
-                url=cef.GetDataUrl(html_content)
-            )
+            browser = self.create_cef_mermaid_browser(cef, cef_frame, html_content)
 
             # 更新状态
             status_label.config(
@@ -4057,14 +5122,10 @@ class MCUAnalyzerGUI:
                 foreground="green"
             )
 
-            # 设置消息循环
-            def message_loop():
-                cef.MessageLoopWork()
-                self.root.after(10, message_loop)
-
-            message_loop()
+            # 设置消息循环（自适应间隔）
+            self.start_cef_message_pump(cef, browser, cef_frame)
 
-            self.log_message("🔧 DEBUG: CEF embedded rendering successful")
+            self.debug_log("CEF embedded rendering successful")
             return True
 
         except ImportError:
@@ -4074,286 +5135,321 @@ class MCUAnalyzerGUI:
             self.log_message(f"🔧 DEBUG: CEF embedded rendering failed: {e}")
             return False
 
-    def create_vscode_style_mermaid_html(self):
-        """创建VSCode风格的Mermaid HTML内容"""
-        # 获取本地mermaid.js文件
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        mermaid_js_path = os.path.join(script_dir, "assets", "mermaid.min.js")
+    def create_cef_mermaid_browser(self, cef, container, html_content):
+        """在container中创建嵌入式CEF浏览器并加载html_content
 
-        mermaid_js_content = ""
-        if os.path.exists(mermaid_js_path):
+        先以空白页创建浏览器，装好mermaid.js请求拦截后再导航，页面发出的所有请求都经过拦截
+        """
+        window_info = cef.WindowInfo()
+        window_info.SetAsChild(container.winfo_id(), [0, 0, 800, 600])
+
+        browser = cef.CreateBrowserSync(window_info, url="about:blank")
+        browser.SetClientHandler(_CefMermaidJsHandler())
+        browser.LoadUrl(cef.GetDataUrl(html_content))
+        return browser
+
+    def ensure_cef_initialized(self, cef):
+        """初始化CEF；进程内已初始化过则直接返回"""
+        if MCUAnalyzerGUI._cef_initialized:
+            return
+
+        # CEF设置
+        settings = {
+            "multi_threaded_message_loop": False,
+            "auto_zooming": "system_dpi",
+            "log_severity": cef.LOGSEVERITY_INFO,
+            "log_file": "",
+        }
+
+        sys.excepthook = cef.ExceptHook
+        cef.Initialize(settings, switches=_CEF_SWITCHES)
+        MCUAnalyzerGUI._cef_initialized = True
+
+    def start_cef_message_pump(self, cef, browser, container):
+        """登记嵌入在container中的CEF浏览器，并确保CEF消息循环在运行
+
+        消息循环在进程内只启动一次，随应用一直运行（CEF是进程级的，不随某个预览容器停止）；
+        容器销毁后只关闭其中的浏览器。有浏览器在加载时每10ms驱动一次，空闲后逐步退避到100ms
+        """
+        self._cef_browsers.append((browser, container))
+        if self._cef_pump_running:
+            return
+        self._cef_pump_running = True
+        state = {'interval': _CEF_PUMP_MIN_MS}
+
+        def pump():
+            alive = []
+            for entry in self._cef_browsers:
+                if entry[1].winfo_exists():
+                    alive.append(entry)
+                else:
+                    entry[0].CloseBrowser(True)
+            self._cef_browsers = alive
+
+            cef.MessageLoopWork()
+            if any(browser.IsLoading() for browser, _ in alive):
+                state['interval'] = _CEF_PUMP_MIN_MS
+            else:
+                state['interval'] = min(state['interval'] + _CEF_PUMP_MIN_MS, _CEF_PUMP_MAX_MS)
             try:
-                with open(mermaid_js_path, 'r', encoding='utf-8') as f:
-                    mermaid_js_content = f.read()
-            except Exception as e:
-                self.log_message(f"🔧 DEBUG: Failed to read local mermaid.js: {e}")
+                self.root.after(state['interval'], pump)
+            except tk.TclError:
+                self._cef_pump_running = False  # 主窗口已销毁
 
-        return f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <title>Mermaid Diagram - UI Internal Rendering</title>
-    <style>
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            margin: 0;
-            padding: 20px;
-            background: white;
-            overflow: auto;
-        }}
-        .container {{
-            background: white;
-            padding: 20px;
-            border-radius: 8px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-            max-width: 100%;
-            overflow: auto;
-        }}
-        .header {{
-            text-align: center;
-            color: #333;
-            margin-bottom: 20px;
-            padding: 10px;
-            background-color: #f8f9fa;
-            border-radius: 5px;
-            border-left: 4px solid #007acc;
-        }}
-        .mermaid {{
-            text-align: center;
-            background-color: white;
-            max-width: 100%;
-            overflow: auto;
-            min-height: 400px;
-        }}
-        .error {{
-            color: #d73a49;
-            text-align: center;
-            padding: 20px;
-            border: 2px solid #d73a49;
-            border-radius: 5px;
-            margin: 20px;
-            background-color: #ffeaea;
-        }}
-        .loading {{
-            color: #0366d6;
-            text-align: center;
-            padding: 20px;
-            font-size: 16px;
-        }}
-    </style>
-    <script>
-{mermaid_js_content}
-    </script>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h2>🧜‍♀️ MCU代码调用关系流程图</h2>
-            <p>UI内部渲染 - 参考VSCode Markdown Preview Enhanced实现</p>
-        </div>
+        pump()
+
+    def create_vscode_style_mermaid_html(self, external_mermaid_js=False):
+        """创建VSCode风格的Mermaid HTML内容"""
+        return ''.join(self.create_vscode_style_mermaid_html_chunks(external_mermaid_js))
+
+    def create_vscode_style_mermaid_html_chunks(self, external_mermaid_js=False):
+        """按块返回VSCode风格的Mermaid HTML内容，供writelines直接写出
+
+        external_mermaid_js为True时通过_CEF_MERMAID_JS_URL引用mermaid.js而不内联（CEF页面使用）
+        """
+        # 已有预渲染的SVG时直接内嵌，页面无需再加载和执行mermaid.js；
+        # 这里只查缓存不渲染（渲染可能阻塞数十秒），未命中时由页面中的mermaid.js渲染
+        svg_path = self.find_cached_mermaid_svg(self.mermaid_code)
+        if svg_path is not None:
+            try:
+                return (
+                    _PRERENDERED_MERMAID_HTML_HEAD,
+                    svg_path.read_text(encoding='utf-8'),
+                    _PRERENDERED_MERMAID_HTML_TAIL,
+                )
+            except Exception as e:
+                self.log_message(f"🔧 DEBUG: Failed to read cached SVG: {e}")
 
-        <div id="loading" class="loading">正在渲染Mermaid图形...</div>
-        <div id="mermaid-container" style="display:none;">
-            <div class="mermaid">
-{self.mermaid_code}
-            </div>
-        </div>
-    </div>
+        if external_mermaid_js and _MERMAID_JS_EXISTS:
+            return (
+                _VSCODE_MERMAID_HTML_HEAD,
+                self.mermaid_code,
+                _VSCODE_MERMAID_HTML_MIDDLE_EXTERNAL_JS,
+                "",
+                _VSCODE_MERMAID_HTML_TAIL,
+            )
 
-    <script>
-        console.log('Starting VSCode-style Mermaid initialization...');
+        # 获取本地mermaid.js文件
+        mermaid_js_path = _MERMAID_JS_PATH
 
-        try {{
-            mermaid.initialize({{
-                startOnLoad: false,
-                theme: 'default',
-                flowchart: {{
-                    useMaxWidth: true,
-                    htmlLabels: true,
-                    curve: 'basis'
-                }},
-                securityLevel: 'loose'
-            }});
+        mermaid_js_content = ""
+        if _MERMAID_JS_EXISTS:
+            try:
+                mermaid_js_content = _load_mermaid_js(mermaid_js_path)[0]
+            except Exception as e:
+                self.log_message(f"🔧 DEBUG: Failed to read local mermaid.js: {e}")
 
-            // 手动渲染 - 参考VSCode MPE
-            document.addEventListener('DOMContentLoaded', function() {{
-                console.log('DOM loaded, starting Mermaid rendering...');
+        return (
+            _VSCODE_MERMAID_HTML_HEAD,
+            self.mermaid_code,
+            _VSCODE_MERMAID_HTML_MIDDLE,
+            mermaid_js_content,
+            _VSCODE_MERMAID_HTML_TAIL,
+        )
 
-                mermaid.run().then(() => {{
-                    console.log('Mermaid rendering completed successfully');
-                    document.getElementById('loading').style.display = 'none';
-                    document.getElementById('mermaid-container').style.display = 'block';
-                }}).catch((error) => {{
-                    console.error('Mermaid rendering failed:', error);
-                    document.getElementById('loading').style.display = 'none';
-                    document.getElementById('mermaid-container').innerHTML =
-                        '<div class="error">Mermaid渲染失败: ' + error.message + '<br><br>请检查Mermaid语法是否正确</div>';
-                    document.getElementById('mermaid-container').style.display = 'block';
-                }});
-            }});
-        }} catch (error) {{
-            console.error('Mermaid initialization failed:', error);
-            document.getElementById('loading').style.display = 'none';
-            document.getElementById('mermaid-container').innerHTML =
-                '<div class="error">Mermaid初始化失败: ' + error.message + '</div>';
-            document.getElementById('mermaid-container').style.display = 'block';
-        }}
+    def mermaid_svg_cache_path(self, mermaid_code):
+        """Mermaid代码对应的SVG缓存文件路径（按代码+mermaid版本的sha256命名）"""
+        key = hashlib.sha256((mermaid_code + _MERMAID_JS_VERSION).encode('utf-8')).hexdigest()
+        return self._svg_cache_dir / f"{key}.svg"
+
+    def ensure_svg_cache_dir(self):
+        """创建SVG缓存目录（仅当前用户可访问）"""
+        self._svg_cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    def find_cached_mermaid_svg(self, mermaid_code):
+        """只查找已缓存的SVG，命中返回路径，否则返回None（不触发渲染，可在Tk主线程调用）"""
+        svg_path = self.mermaid_svg_cache_path(mermaid_code)
+        if svg_path.exists():
+            self.debug_log("Mermaid SVG cache hit: %s", svg_path)
+            return svg_path
+        return None
+
+    def get_cached_mermaid_svg(self, mermaid_code):
+        """返回Mermaid代码对应的缓存SVG路径，未命中时尝试渲染一次并写入缓存（可能耗时数十秒）"""
+        svg_path = self.find_cached_mermaid_svg(mermaid_code)
+        if svg_path is not None:
+            return svg_path
+        svg_path = self.mermaid_svg_cache_path(mermaid_code)
+
+        # 临时文件按线程区分并以.svg结尾（mmdc按输出文件扩展名选择格式）
+        tmp_svg = svg_path.with_name(f"{svg_path.stem}.{threading.get_ident()}.tmp.svg")
+
+        # 优先交给常驻的无头浏览器渲染，免去每次启动Chromium的开销
+        svg_content = self.render_svg_with_mermaid_worker(mermaid_code)
+        if svg_content:
+            try:
+                self.ensure_svg_cache_dir()
+                tmp_svg.write_bytes(svg_content.encode('utf-8'))
+                os.replace(tmp_svg, svg_path)
+                self.debug_log("Mermaid SVG cached: %s", svg_path)
+                return svg_path
+            except Exception as e:
+                self.log_message(f"🔧 DEBUG: Failed to write Mermaid SVG cache: {e}")
 
-        // 全局错误处理
-        window.addEventListener('error', function(e) {{
-            console.error('Global error:', e);
-            document.getElementById('loading').style.display = 'none';
-            document.getElementById('mermaid-container').innerHTML =
-                '<div class="error">页面加载出错: ' + e.message + '</div>';
-            document.getElementById('mermaid-container').style.display = 'block';
-        }});
-    </script>
-</body>
-</html>"""
+        # 常驻渲染器不可用时才退回一次性mmdc；未安装mermaid-cli时无法预渲染
+        if not shutil.which('mmdc'):
+            return None
+
+        try:
+            self.ensure_svg_cache_dir()
+
+            # Mermaid代码经stdin传给mmdc，不再落地临时.mmd文件；输出格式由.svg扩展名决定
+            command = ['mmdc', '-i', '-', '-o', str(tmp_svg)]
+            config_file = self.create_mermaid_config()
+            if config_file:
+                command += ['-c', config_file]
+            result = subprocess.run(command, input=mermaid_code, capture_output=True, text=True, timeout=30,
+                                    **_SUBPROC_KWARGS)
+            if result.returncode != 0 or not tmp_svg.exists():
+                self.log_message(f"🔧 DEBUG: mmdc SVG rendering failed: {result.stderr.strip()}")
+                return None
+
+            # 原子替换，避免并发渲染留下半截文件
+            os.replace(tmp_svg, svg_path)
+            self.debug_log("Mermaid SVG cached: %s", svg_path)
+            return svg_path
+
+        except Exception as e:
+            self.log_message(f"🔧 DEBUG: Failed to build Mermaid SVG cache: {e}")
+            return None
+        finally:
+            try:
+                if tmp_svg.exists():
+                    tmp_svg.unlink()
+            except OSError:
+                pass
+
+    def render_svg_with_mermaid_worker(self, mermaid_code):
+        """通过常驻Playwright浏览器渲染Mermaid为SVG，渲染器不可用时返回None（在后台线程中调用）"""
+        if self._mermaid_worker_failed:
+            return None
+
+        with self._mermaid_worker_lock:
+            try:
+                from utils.playwright_mermaid_renderer import get_mermaid_renderer
+            except ImportError as e:
+                self.log_message(f"🔧 DEBUG: Playwright renderer import failed: {e}")
+                self._mermaid_worker_failed = True
+                return None
+
+            renderer = get_mermaid_renderer()
+            svg_content = renderer.render_to_svg(mermaid_code)
+
+            # 浏览器启动失败（未安装等）后不再每次重试
+            if not renderer.is_ready():
+                self._mermaid_worker_failed = True
+            return svg_content
 
     def try_local_mermaid_rendering(self):
-        """使用本地mermaid.js文件渲染"""
+        """使用本地mermaid.js文件渲染（HTML生成和写文件在后台线程完成）"""
         try:
 
-            self.log_message("🔧 DEBUG: Trying local mermaid.js rendering")
+            self.debug_log("Trying local mermaid.js rendering")
 
-            if not hasattr(self, 'mermaid_code') or not self.mermaid_code:
+            if not self.mermaid_code:
                 self.log_message("🔧 DEBUG: No mermaid code available")
                 return False
 
             # 获取本地mermaid.js文件路径
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            mermaid_js_path = os.path.join(script_dir, "assets", "mermaid.min.js")
+            mermaid_js_path = _MERMAID_JS_PATH
 
-            if not os.path.exists(mermaid_js_path):
+            # 缓存中已有SVG时不需要mermaid.js
+            if not _MERMAID_JS_EXISTS and self.find_cached_mermaid_svg(self.mermaid_code) is None:
                 self.log_message(f"🔧 DEBUG: Local mermaid.js not found at {mermaid_js_path}")
                 return False
 
-            # 读取本地mermaid.js内容
-            with open(mermaid_js_path, 'r', encoding='utf-8') as f:
-                mermaid_js_content = f.read()
+            # SVG预渲染（Playwright/mmdc）和数MB的HTML生成都放到后台线程，完成后回到Tk主线程构建界面
+            # 记下提交时的预览区版本和代码版本，结果回来时预览区已换成别的内容就丢弃
+            future = self._render_pool.submit(self.prepare_local_mermaid_render, self.mermaid_code, mermaid_js_path)
+            request = (self._preview_generation, self._mermaid_code_version)
+            self.root.after(50, lambda: self.check_offline_mermaid_render(future, mermaid_js_path, request))
+            return True
 
-            # 创建完全离线的HTML内容
-            html_content = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <title>Mermaid Diagram - 离线渲染</title>
-    <style>
-        body {{
-            margin: 0;
-            padding: 20px;
-            font-family: Arial, sans-serif;
-            background-color: white;
-            overflow: auto;
-        }}
-        .mermaid {{
-            text-align: center;
-            background-color: white;
-            max-width: 100%;
-            overflow: auto;
-        }}
-        .error {{
-            color: red;
-            text-align: center;
-            padding: 20px;
-            border: 2px solid red;
-            border-radius: 5px;
-            margin: 20px;
-        }}
-        .loading {{
-            color: blue;
-            text-align: center;
-            padding: 20px;
-        }}
-        .header {{
-            text-align: center;
-            color: #333;
-            margin-bottom: 20px;
-            padding: 10px;
-            background-color: #f0f0f0;
-            border-radius: 5px;
-        }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h2>🧜‍♀️ MCU代码调用关系流程图 (离线渲染)</h2>
-        <p>使用本地mermaid.js v10.6.1 - 完全离线无网络依赖</p>
-    </div>
+        except Exception as e:
+            self.log_message(f"🔧 DEBUG: Local mermaid.js rendering failed: {e}")
+            if self._debug:
+                traceback.print_exc()
+            return False
 
-    <div id="loading" class="loading">正在渲染Mermaid图形...</div>
-    <div id="mermaid-container" style="display:none;">
-        <div class="mermaid">
-{self.mermaid_code}
-        </div>
-    </div>
+    def prepare_local_mermaid_render(self, mermaid_code, mermaid_js_path):
+        """后台线程：优先取得预渲染SVG（缓存未命中时渲染一次），返回('svg', 路径)；
+        无法预渲染时生成离线HTML，返回('html', HTML内容, mermaid.js大小MB)
+        """
+        svg_path = self.get_cached_mermaid_svg(mermaid_code)
+        if svg_path is not None:
+            return ('svg', svg_path)
+        if not _MERMAID_JS_EXISTS:
+            raise FileNotFoundError(f"Local mermaid.js not found at {mermaid_js_path}")
+        return ('html',) + self.build_offline_mermaid_html(mermaid_code, mermaid_js_path)
+
+    def build_offline_mermaid_html(self, mermaid_code, mermaid_js_path):
+        """后台线程：在内存中生成离线Mermaid HTML，返回(HTML内容, mermaid.js大小MB)"""
+        # 读取本地mermaid.js内容
+        mermaid_js_content, mermaid_js_size_mb = _load_mermaid_js(mermaid_js_path)
+
+        # 创建完全离线的HTML内容（预编译模板，只替换代码和mermaid.js）
+        html_content = _OFFLINE_MERMAID_HTML_TEMPLATE.substitute(
+            mermaid_js=mermaid_js_content,
+            mermaid_code=mermaid_code,
+        )
 
-    <script>
-{mermaid_js_content}
-    </script>
+        return html_content, mermaid_js_size_mb
 
-    <script>
-        console.log('Starting local Mermaid initialization...');
+    def check_offline_mermaid_render(self, future, mermaid_js_path, request):
+        """轮询后台渲染结果，完成后在Tk主线程中显示
 
-        try {{
-            mermaid.initialize({{
-                startOnLoad: false,
-                theme: 'default',
-                flowchart: {{
-                    useMaxWidth: true,
-                    htmlLabels: true,
-                    curve: 'basis'
-                }},
-                securityLevel: 'loose'
-            }});
+        request为提交时的(预览区版本, Mermaid代码版本)，任一已变化说明结果已过期，直接丢弃。
+        后台渲染失败时降级到备选方案（见run_mermaid_fallback_chain）
+        """
+        if not future.done():
+            self.root.after(50, lambda: self.check_offline_mermaid_render(future, mermaid_js_path, request))
+            return
 
-            // 手动渲染
-            document.addEventListener('DOMContentLoaded', function() {{
-                console.log('DOM loaded, starting Mermaid rendering...');
+        if request != (self._preview_generation, self._mermaid_code_version):
+            self.debug_log("Discarding stale local Mermaid render result")
+            return
 
-                mermaid.run().then(() => {{
-                    console.log('Mermaid rendering completed successfully');
-                    document.getElementById('loading').style.display = 'none';
-                    document.getElementById('mermaid-container').style.display = 'block';
-                }}).catch((error) => {{
-                    console.error('Mermaid rendering failed:', error);
-                    document.getElementById('loading').style.display = 'none';
-                    document.getElementById('mermaid-container').innerHTML =
-                        '<div class="error">Mermaid渲染失败: ' + error.message + '<br><br>请检查Mermaid语法是否正确</div>';
-                    document.getElementById('mermaid-container').style.display = 'block';
-                }});
-            }});
-        }} catch (error) {{
-            console.error('Mermaid initialization failed:', error);
-            document.getElementById('loading').style.display = 'none';
-            document.getElementById('mermaid-container').innerHTML =
-                '<div class="error">Mermaid初始化失败: ' + error.message + '</div>';
-            document.getElementById('mermaid-container').style.display = 'block';
-        }}
+        try:
+            result = future.result()
+        except Exception as e:
+            self.log_message(f"🔧 DEBUG: Local mermaid.js rendering failed: {e}")
+            self.run_mermaid_fallback_chain()
+            return
 
-        // 全局错误处理
-        window.addEventListener('error', function(e) {{
-            console.error('Global error:', e);
-            document.getElementById('loading').style.display = 'none';
-            document.getElementById('mermaid-container').innerHTML =
-                '<div class="error">页面加载出错: ' + e.message + '</div>';
-            document.getElementById('mermaid-container').style.display = 'block';
-        }});
-    </script>
-</body>
-</html>"""
+        if result[0] == 'svg':
+            if not self.display_mermaid_svg(str(result[1])):
+                self.run_mermaid_fallback_chain()
+            return
 
-            # 创建临时HTML文件
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8') as f:
+        _, html_content, mermaid_js_size_mb = result
+        self.debug_log("Built offline HTML in memory (%s chars)", len(html_content))
+        self.show_offline_mermaid_result(html_content, mermaid_js_path, mermaid_js_size_mb)
+
+    def run_mermaid_fallback_chain(self):
+        """本地渲染失败后的降级：依次尝试本地备选渲染方案（本地模式不把代码发到在线服务）"""
+        self.try_fallback_rendering()
+
+    def export_offline_mermaid_html(self, html_content, info_text):
+        """按需把离线HTML写入临时文件，并在说明文本中补充文件位置"""
+        try:
+            with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8',
+                                             buffering=1 << 16) as f:
                 f.write(html_content)
                 html_file = f.name
 
-            self.log_message(f"🔧 DEBUG: Created temporary HTML file: {html_file}")
+            self.debug_log("Created temporary HTML file: %s", html_file)
+            info_text.config(state=tk.NORMAL)
+            info_text.insert("1.0", f"📁 HTML文件位置: {html_file}\n\n")
+            info_text.config(state=tk.DISABLED)
+
+        except Exception as e:
+            self.log_message(f"🔧 DEBUG: Failed to export offline HTML: {e}")
 
+    def show_offline_mermaid_result(self, html_content, mermaid_js_path, mermaid_js_size_mb):
+        """显示离线Mermaid HTML的生成结果"""
+        try:
             # 清理现有内容
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            self._clear_preview_frame(keep_control=False)
 
             # 创建显示容器
             display_container = ttk.LabelFrame(
@@ -4369,7 +5465,7 @@ class MCUAnalyzerGUI:
 
             status_label = ttk.Label(
                 control_frame,
-                text="✅ 已生成离线Mermaid HTML文件",
+                text="✅ 已生成离线Mermaid HTML",
                 font=("Microsoft YaHei", 10),
                 foreground="green"
             )
@@ -4384,7 +5480,15 @@ class MCUAnalyzerGUI:
             )
             ui_info_label.pack(side=tk.RIGHT, padx=(10, 0))
 
-            # 显示文件路径和说明
+            # HTML只保存在内存中，需要文件时才写临时文件
+            export_button = ttk.Button(
+                control_frame,
+                text="💾 导出HTML文件",
+                command=lambda: self.export_offline_mermaid_html(html_content, info_text)
+            )
+            export_button.pack(side=tk.RIGHT, padx=(10, 0))
+
+            # 显示说明
             info_frame = ttk.Frame(display_container)
             info_frame.pack(fill=tk.BOTH, expand=True)
 
@@ -4400,49 +5504,23 @@ class MCUAnalyzerGUI:
             )
             info_text.pack(fill=tk.BOTH, expand=True)
 
-            info_content = f"""🎉 离线Mermaid渲染成功！
-
-📁 HTML文件位置: {html_file}
-
-✨ 特性:
-• 使用本地mermaid.js v10.6.1
-• 完全离线，无需网络连接
-• 高质量SVG渲染
-• 支持完整Mermaid语法
-
-🔧 技术说明:
-• 本地mermaid.js文件: {mermaid_js_path}
-• 文件大小: {os.path.getsize(mermaid_js_path) / 1024 / 1024:.1f} MB
-• 渲染引擎: 原生JavaScript + SVG
-
-📖 使用方法:
-1. 点击"在浏览器中查看"按钮
-2. 或直接打开上述HTML文件
-3. 图形将自动渲染显示
-
-💡 提示: 此HTML文件包含完整的mermaid.js库，可以离线使用！
-"""
-
-            info_text.insert(tk.END, info_content)
+            info_text.insert(tk.END, _OFFLINE_MERMAID_INFO_TEMPLATE.substitute(
+                mermaid_js_path=mermaid_js_path,
+                size_mb=f"{mermaid_js_size_mb:.1f}",
+            ))
             info_text.config(state=tk.DISABLED)
 
             # 不再自动打开浏览器 - 只使用UI内渲染
-            self.log_message("🔧 DEBUG: UI内渲染完成，不打开外部浏览器")
-
-            return True
+            self.debug_log("UI内渲染完成，不打开外部浏览器")
 
         except Exception as e:
-            self.log_message(f"🔧 DEBUG: Local mermaid.js rendering failed: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+            self.log_message(f"🔧 DEBUG: Failed to show offline Mermaid result: {e}")
 
     def show_simple_failure_message(self):
         """显示简单的失败信息"""
         try:
             # 清理现有内容
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            self._clear_preview_frame(keep_control=False)
 
             # 创建错误显示容器
             error_container = ttk.LabelFrame(
@@ -4489,92 +5567,99 @@ class MCUAnalyzerGUI:
     def display_mermaid_source_in_ui(self):
         """在UI中显示Mermaid源码和在线渲染链接"""
         try:
-            # 清理现有内容
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
-
-            # 创建主容器
-            main_container = ttk.Frame(self.graph_preview_frame)
-            main_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+            def build_source_view():
+                # 创建主容器
+                main_container = ttk.Frame(self.graph_preview_frame)
 
-            # 标题
-            title_label = ttk.Label(
-                main_container,
-                text="🧜‍♀️ Mermaid 流程图源码",
-                font=("Microsoft YaHei", 14, "bold"),
-                foreground="#2563eb"
-            )
-            title_label.pack(pady=(0, 10))
+                # 标题
+                title_label = ttk.Label(
+                    main_container,
+                    text="🧜‍♀️ Mermaid 流程图源码",
+                    font=("Microsoft YaHei", 14, "bold"),
+                    foreground="#2563eb"
+                )
+                title_label.pack(pady=(0, 10))
 
-            # 说明文字
-            info_label = ttk.Label(
-                main_container,
-                text="复制下面的Mermaid代码，或点击'本地渲染'按钮在浏览器中查看图形",
-                font=("Microsoft YaHei", 10),
-                foreground="gray"
-            )
-            info_label.pack(pady=(0, 10))
+                # 说明文字
+                info_label = ttk.Label(
+                    main_container,
+                    text="复制下面的Mermaid代码，或点击'本地渲染'按钮在浏览器中查看图形",
+                    font=("Microsoft YaHei", 10),
+                    foreground="gray"
+                )
+                info_label.pack(pady=(0, 10))
 
-            # 按钮框架
-            button_frame = ttk.Frame(main_container)
-            button_frame.pack(fill=tk.X, pady=(0, 10))
+                # 按钮框架
+                button_frame = ttk.Frame(main_container)
+                button_frame.pack(fill=tk.X, pady=(0, 10))
+
+                # 复制按钮
+                def copy_mermaid_code():
+                    if self.mermaid_code:
+                        self.copy_mermaid_code_to_clipboard()
+                        copy_btn.config(text="✅ 已复制")
+                        self.root.after(2000, lambda: copy_btn.config(text="📋 复制代码"))
+
+                copy_btn = ttk.Button(
+                    button_frame,
+                    text="📋 复制代码",
+                    command=copy_mermaid_code
+                )
+                copy_btn.pack(side=tk.LEFT, padx=(0, 10))
 
-            # 复制按钮
-            def copy_mermaid_code():
-                if hasattr(self, 'mermaid_code') and self.mermaid_code:
-                    self.root.clipboard_clear()
-                    self.root.clipboard_append(self.mermaid_code)
-                    copy_btn.config(text="✅ 已复制")
-                    self.root.after(2000, lambda: copy_btn.config(text="📋 复制代码"))
+                # 本地渲染按钮
+                def open_local_render():
+                    # 使用本地渲染方法
+                    self.render_mermaid_in_browser()
 
-            copy_btn = ttk.Button(
-                button_frame,
-                text="📋 复制代码",
-                command=copy_mermaid_code
-            )
-            copy_btn.pack(side=tk.LEFT, padx=(0, 10))
+                local_btn = ttk.Button(
+                    button_frame,
+                    text="🌐 本地渲染",
+                    command=open_local_render
+                )
+                local_btn.pack(side=tk.LEFT)
 
-            # 本地渲染按钮
-            def open_local_render():
-                # 使用本地渲染方法
-                self.render_mermaid_in_browser()
+                # Mermaid代码显示区域
+                code_frame = ttk.LabelFrame(main_container, text="Mermaid 源码", padding=5)
+                code_frame.pack(fill=tk.BOTH, expand=True)
 
-            local_btn = ttk.Button(
-                button_frame,
-                text="🌐 本地渲染",
-                command=open_local_render
-            )
-            local_btn.pack(side=tk.LEFT)
+                # 创建文本框和滚动条
+                text_frame = ttk.Frame(code_frame)
+                text_frame.pack(fill=tk.BOTH, expand=True)
 
-            # Mermaid代码显示区域
-            code_frame = ttk.LabelFrame(main_container, text="Mermaid 源码", padding=5)
-            code_frame.pack(fill=tk.BOTH, expand=True)
+                code_text = tk.Text(
+                    text_frame,
+                    font=("Consolas", 10),
+                    wrap=tk.WORD,
+                    bg='#f8f9fa',
+                    fg='#212529',
+                    selectbackground='#007bff',
+                    selectforeground='white',
+                    insertbackground='#007bff'
+                )
 
-            # 创建文本框和滚动条
-            text_frame = ttk.Frame(code_frame)
-            text_frame.pack(fill=tk.BOTH, expand=True)
+                # 滚动条
+                scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL, command=code_text.yview)
+                code_text.configure(yscrollcommand=scrollbar.set)
 
-            code_text = tk.Text(
-                text_frame,
-                font=("Consolas", 10),
-                wrap=tk.WORD,
-                bg='#f8f9fa',
-                fg='#212529',
-                selectbackground='#007bff',
-                selectforeground='white',
-                insertbackground='#007bff'
-            )
+                # 布局
+                scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+                code_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-            # 滚动条
-            scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL, command=code_text.yview)
-            code_text.configure(yscrollcommand=scrollbar.set)
+                return {
+                    'frame': main_container,
+                    'pack': {'fill': tk.BOTH, 'expand': True, 'padx': 10, 'pady': 10},
+                    'code_text': code_text,
+                }
 
-            # 布局
-            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-            code_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            # 复用已有的源码视图，只替换文本内容
+            view = self._show_preview_view('mermaid_source', build_source_view)
+            code_text = view['code_text']
+            code_text.config(state=tk.NORMAL)
+            code_text.delete('1.0', tk.END)
 
             # 插入Mermaid代码
-            if hasattr(self, 'mermaid_code') and self.mermaid_code:
+            if self.mermaid_code:
                 code_text.insert(tk.END, self.mermaid_code)
             else:
                 code_text.insert(tk.END, "暂无Mermaid代码，请先进行分析")
@@ -4582,7 +5667,7 @@ class MCUAnalyzerGUI:
             # 设置为只读
             code_text.config(state=tk.DISABLED)
 
-            self.log_message("🔧 DEBUG: Mermaid source displayed in UI")
+            self.debug_log("Mermaid source displayed in UI")
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to display Mermaid source: {e}")
@@ -4598,28 +5683,24 @@ class MCUAnalyzerGUI:
     def try_local_html_mermaid_rendering(self, quality="high"):
         """使用本地HTML + mermaid.js离线渲染"""
         try:
-            import tempfile
-            import os
             import subprocess
             from PIL import Image, ImageTk
 
-            self.log_message("🔧 DEBUG: Trying local HTML Mermaid rendering")
+            self.debug_log("Trying local HTML Mermaid rendering")
 
-            if not hasattr(self, 'mermaid_code') or not self.mermaid_code:
+            if not self.mermaid_code:
                 self.log_message("🔧 DEBUG: No mermaid code available")
                 return False
 
             # 获取本地mermaid.js文件
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            mermaid_js_path = os.path.join(script_dir, "assets", "mermaid.min.js")
+            mermaid_js_path = _MERMAID_JS_PATH
 
-            if not os.path.exists(mermaid_js_path):
+            if not _MERMAID_JS_EXISTS:
                 self.log_message(f"🔧 DEBUG: Local mermaid.js not found at {mermaid_js_path}")
                 return False
 
             # 读取本地mermaid.js内容
-            with open(mermaid_js_path, 'r', encoding='utf-8') as f:
-                mermaid_js_content = f.read()
+            mermaid_js_content = _load_mermaid_js(mermaid_js_path)[0]
 
             # 创建完全离线的HTML文件
             html_content = f"""
@@ -4642,24 +5723,13 @@ class MCUAnalyzerGUI:
         mermaid.initialize({{ startOnLoad: true, theme: 'default' }});
     </script>
 </body>
-</html>
-"""
-
-            # 保存HTML文件
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8') as f:
-                f.write(html_content)
-                html_file = f.name
-
-            self.log_message(f"🔧 DEBUG: HTML file created: {html_file}")
+</html>
+"""
 
-            # Chrome headless渲染已删除，仅支持在线渲染
-            self.log_message("🔧 DEBUG: Chrome headless渲染已删除，仅支持在线渲染")
+            self.debug_log("HTML content built in memory (%s chars)", len(html_content))
 
-            # 清理HTML文件
-            try:
-                os.unlink(html_file)
-            except:
-                pass
+            # Chrome headless渲染已删除，仅支持在线渲染；没有消费者，不再写临时文件
+            self.debug_log("Chrome headless渲染已删除，仅支持在线渲染")
 
             return False
 
@@ -4675,12 +5745,12 @@ class MCUAnalyzerGUI:
             import os
             from PIL import Image, ImageTk
 
-            self.log_message("🔧 DEBUG: Trying Python PlantUML rendering")
+            self.debug_log("Trying Python PlantUML rendering")
 
             # 检查是否安装了plantuml Python包
             try:
                 import plantuml
-                self.log_message("🔧 DEBUG: plantuml package available")
+                self.debug_log("plantuml package available")
             except ImportError:
                 self.log_message("🔧 DEBUG: plantuml package not available")
                 return False
@@ -4691,7 +5761,7 @@ class MCUAnalyzerGUI:
                 return False
 
             # PlantUML在线服务已移除，仅支持本地jar文件渲染
-            self.log_message("🔧 DEBUG: PlantUML在线服务已禁用，请使用本地PlantUML jar文件")
+            self.debug_log("PlantUML在线服务已禁用，请使用本地PlantUML jar文件")
             return False
 
         except ImportError:
@@ -4708,7 +5778,7 @@ class MCUAnalyzerGUI:
     def convert_mermaid_to_plantuml(self):
         """将Mermaid代码转换为PlantUML格式"""
         try:
-            if not hasattr(self, 'mermaid_code') or not self.mermaid_code:
+            if not self.mermaid_code:
                 return None
 
             # 简单的Mermaid到PlantUML转换
@@ -4718,38 +5788,26 @@ class MCUAnalyzerGUI:
             plantuml_lines.append("skinparam defaultFontName Microsoft YaHei")
             plantuml_lines.append("")
 
-            # 解析Mermaid代码
-            lines = self.mermaid_code.strip().split('\n')
+            # 解析Mermaid代码：一次finditer扫描所有箭头连接，样式定义由PlantUML自动处理
+            for match in _MERMAID_ARROW_RE.finditer(self.mermaid_code):
+                from_part, to_part = match.group(1).strip(), match.group(2).strip()
 
-            for line in lines:
-                line = line.strip()
-                if not line or line.startswith('graph') or line.startswith('flowchart'):
+                # 与逐行解析一致：跳过图声明行和一行多箭头的链式写法
+                if from_part.startswith(('graph', 'flowchart')) or '-->' in to_part:
                     continue
 
-                # 转换箭头连接: A --> B 转换为 A --> B
-                if '-->' in line:
-                    # 解析节点和标签
-                    parts = line.split('-->')
-                    if len(parts) == 2:
-                        from_part = parts[0].strip()
-                        to_part = parts[1].strip()
-
-                        # 提取节点名和标签
-                        from_node, from_label = self.extract_node_info(from_part)
-                        to_node, to_label = self.extract_node_info(to_part)
+                # 提取节点名和标签
+                from_node, from_label = self.extract_node_info(from_part)
+                to_node, to_label = self.extract_node_info(to_part)
 
-                        # 生成PlantUML语法
-                        plantuml_lines.append(f"({from_label}) --> ({to_label})")
-
-                # 跳过样式定义，PlantUML会自动处理
-                elif line.startswith('style'):
-                    continue
+                # 生成PlantUML语法
+                plantuml_lines.append(f"({from_label}) --> ({to_label})")
 
             plantuml_lines.append("")
             plantuml_lines.append("@enduml")
 
             plantuml_code = '\n'.join(plantuml_lines)
-            self.log_message(f"🔧 DEBUG: Generated PlantUML code:\n{plantuml_code}")
+            self.debug_log("Generated PlantUML code:\n%s", plantuml_code)
 
             return plantuml_code
 
@@ -4759,21 +5817,20 @@ class MCUAnalyzerGUI:
 
     def extract_node_info(self, node_part):
         """从节点部分提取节点名和标签"""
-        import re
+        node_part = node_part.strip()
 
         # 匹配 NODE["label"] 格式
-        match = re.match(r'(\w+)\[\"([^\"]+)\"\]', node_part.strip())
+        match = _MERMAID_NODE_QUOTED_RE.match(node_part)
         if match:
             return match.group(1), match.group(2)
 
         # 匹配 NODE[label] 格式
-        match = re.match(r'(\w+)\[([^\]]+)\]', node_part.strip())
+        match = _MERMAID_NODE_BRACKET_RE.match(node_part)
         if match:
             return match.group(1), match.group(2)
 
         # 只有节点名
-        node_name = node_part.strip()
-        return node_name, node_name
+        return node_part, node_part
 
     def try_local_plantuml(self):
         """使用本地PlantUML jar文件生成图片"""
@@ -4783,16 +5840,18 @@ class MCUAnalyzerGUI:
             import os
             from PIL import Image, ImageTk
 
-            self.log_message("🔧 DEBUG: Trying local PlantUML rendering")
+            self.debug_log("Trying local PlantUML rendering")
 
-            # 检查Java环境
-            try:
-                result = subprocess.run(['java', '-version'], capture_output=True, text=True, timeout=5)
-                if result.returncode != 0:
-                    self.log_message("🔧 DEBUG: Java not available")
-                    return False
-            except:
-                self.log_message("🔧 DEBUG: Java not found")
+            # 检查Java环境（只扫描PATH，结果按进程缓存）
+            java_path = _find_java()
+            if not java_path:
+                self.log_message("🔧 DEBUG: Java not available")
+                return False
+
+            # 查找本地plantuml.jar（查找结果按进程缓存）
+            jar_path = _find_plantuml_jar()
+            if not jar_path:
+                self.log_message("🔧 DEBUG: No PlantUML jar found")
                 return False
 
             # 转换为PlantUML代码
@@ -4807,35 +5866,25 @@ class MCUAnalyzerGUI:
 
             png_file = puml_file.replace('.puml', '.png')
 
-            # 尝试使用本地plantuml.jar
-            plantuml_jar_paths = [
-                'plantuml.jar',
-                'lib/plantuml.jar',
-                os.path.expanduser('~/plantuml.jar'),
-                'C:/plantuml/plantuml.jar'
-            ]
+            # 使用本地plantuml.jar生成图片
+            try:
+                cmd = [java_path, '-jar', jar_path, '-tpng', puml_file]
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30, **_SUBPROC_KWARGS)
 
-            for jar_path in plantuml_jar_paths:
-                if os.path.exists(jar_path):
+                if result.returncode == 0 and os.path.exists(png_file):
+                    # 在UI中显示图片
+                    self.display_mermaid_image(png_file)
+                    return True
+            except Exception as e:
+                self.log_message(f"🔧 DEBUG: PlantUML jar {jar_path} failed: {e}")
+            finally:
+                # 清理临时文件
+                for tmp_file in (puml_file, png_file):
                     try:
-                        cmd = ['java', '-jar', jar_path, '-tpng', puml_file]
-                        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-
-                        if result.returncode == 0 and os.path.exists(png_file):
-                            # 在UI中显示图片
-                            self.display_mermaid_image(png_file)
-
-                            # 清理临时文件
-                            try:
-                                os.unlink(puml_file)
-                                os.unlink(png_file)
-                            except:
-                                pass
-
-                            return True
-                    except Exception as e:
-                        self.log_message(f"🔧 DEBUG: PlantUML jar {jar_path} failed: {e}")
-                        continue
+                        if os.path.exists(tmp_file):
+                            os.unlink(tmp_file)
+                    except OSError:
+                        pass
 
             self.log_message("🔧 DEBUG: No working PlantUML jar found")
             return False
@@ -4851,102 +5900,296 @@ class MCUAnalyzerGUI:
 
     # Selenium截图渲染方法已删除，仅支持在线渲染
 
-    def display_mermaid_image(self, image_path):
-        """在UI内部自适应显示Mermaid图片 - 固定框架，无滚动条"""
-        try:
-            from PIL import Image, ImageTk
-
-            # 清理现有内容（保留控制面板）
-            for widget in self.graph_preview_frame.winfo_children():
-                if not hasattr(widget, '_is_control_frame'):
-                    widget.destroy()
+    def _clear_preview_frame(self, keep_control=True):
+        """清空图形预览区，keep_control为True时保留控制面板
 
-            # 创建固定显示容器（类似JSON显示框）
-            display_container = ttk.Frame(self.graph_preview_frame)
-            display_container.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        销毁期间暂停pack的尺寸传播，所有子控件销毁后只做一次几何重算
+        """
+        self._preview_generation += 1
+        frame = self.graph_preview_frame
+        frame.pack_propagate(False)
+        try:
+            children = list(frame.winfo_children())
+            for widget in children:
+                if keep_control and hasattr(widget, '_is_control_frame'):
+                    continue
+                widget.destroy()
+            frame.update_idletasks()
+        finally:
+            frame.pack_propagate(True)
+
+    def _preview_host(self):
+        """返回预览区中常驻的宿主Frame并清空其内容
+
+        宿主Frame作为可复用视图只创建一次，之后只替换其子控件，不再销毁重建预览区顶层控件
+        """
+        view = self._show_preview_view('render_host', lambda: {
+            'frame': ttk.Frame(self.graph_preview_frame),
+            'pack': {'fill': tk.BOTH, 'expand': True},
+        })
+        host = view['frame']
+        for widget in list(host.winfo_children()):
+            widget.destroy()
+        return host
+
+    def _show_preview_view(self, name, build):
+        """在预览区显示可复用视图：首次调用build()创建，之后只切换显示，不重建控件
+
+        build()返回的字典至少包含'frame'（视图根控件）和'pack'（pack参数）。
+        其它显示路径销毁预览区内容后，视图会在下次使用时自动重建。
+        """
+        self._preview_generation += 1
+        view = self._preview_views.get(name)
+        if view is None or not view['frame'].winfo_exists():
+            view = build()
+            self._preview_views[name] = view
+
+        # 隐藏其它可复用视图，销毁临时控件（保留控制面板）
+        cached_frames = [v['frame'] for v in self._preview_views.values()]
+        for widget in self.graph_preview_frame.winfo_children():
+            if widget is view['frame'] or hasattr(widget, '_is_control_frame'):
+                continue
+            if any(widget is frame for frame in cached_frames):
+                widget.pack_forget()
+            else:
+                widget.destroy()
 
+        if not view['frame'].winfo_manager():
+            view['frame'].pack(**view['pack'])
+        return view
 
+    def open_image_for_display(self, source):
+        """打开待缩放显示的图片，解码前按最佳PNG尺寸的2倍设置draft
 
-            # 创建固定Canvas（无滚动条，填满容器）
-            canvas = tk.Canvas(display_container, bg='white', highlightthickness=1, relief='solid')
-            canvas.pack(fill=tk.BOTH, expand=True)
+        JPEG可由libjpeg直接按1/2~1/8比例解码；PNG等格式draft不生效，不影响结果
+        """
+        from PIL import Image
 
-            # 保存原始图片路径，用于重绘
-            canvas.original_image_path = image_path
+        image = Image.open(source)
+        try:
+            target_width, target_height, _ = self.calculate_optimal_png_size()
+            image.draft("RGB", (target_width * 2, target_height * 2))
+        except AttributeError:
+            pass
+        return image
 
-            def redraw_image():
-                """重绘图片以适应当前Canvas大小"""
-                try:
-                    # 清除Canvas内容
-                    canvas.delete("all")
+    def subsample_image_file(self, image_path, original_size, target_size, photo_cache=None):
+        """原图恰为目标尺寸的2/3/4倍时，用Tk原生PhotoImage.subsample缩小
 
-                    # 加载原始图片
-                    original_image = Image.open(canvas.original_image_path)
+        photo_cache（路径 -> 原尺寸PhotoImage）用于避免同一文件被Tk重复解码。
+        不满足条件或Tk无法读取该文件时返回None，由调用方走PIL缩放
+        """
+        original_width, original_height = original_size
+        target_width, target_height = target_size
+        if target_width <= 0 or target_height <= 0:
+            return None
+        if original_width % target_width or original_height % target_height:
+            return None
 
-                    # 获取Canvas当前大小
-                    canvas_width = canvas.winfo_width()
-                    canvas_height = canvas.winfo_height()
+        factor = original_width // target_width
+        if factor not in (2, 3, 4) or original_height // target_height != factor:
+            return None
 
-                    # 如果Canvas还没有实际大小，跳过
-                    if canvas_width <= 1 or canvas_height <= 1:
-                        return
+        photo = photo_cache.get(image_path) if photo_cache is not None else None
+        if photo is None:
+            try:
+                photo = tk.PhotoImage(file=image_path)
+            except tk.TclError:
+                return None
+            if photo_cache is not None:
+                photo_cache[image_path] = photo
+        # draft可能已按比例解码，此时PIL图与文件尺寸不一致，放弃快速路径
+        if (photo.width(), photo.height()) != (original_width, original_height):
+            return None
+        return photo.subsample(factor)
+
+    def decode_mermaid_png(self, image_path):
+        """解码流程图图片为RGBA，同一图片在Mermaid代码未变化时只解码一次"""
+        key = (image_path, self._mermaid_code_version)
+        if self._decoded_mermaid_png is None or self._decoded_mermaid_key != key:
+            image = self.open_image_for_display(image_path)
+            image.load()
+            self._decoded_mermaid_png = image.convert("RGBA")
+            self._decoded_mermaid_key = key
+        return self._decoded_mermaid_png
 
-                    self.log_message(f"🔧 DEBUG: Redrawing - Canvas size: {canvas_width}x{canvas_height}")
-                    self.log_message(f"🔧 DEBUG: Original image size: {original_image.width}x{original_image.height}")
+    def display_mermaid_image(self, image_path):
+        """在UI内部自适应显示Mermaid图片 - 固定框架，无滚动条"""
+        try:
+            from PIL import Image, ImageTk
 
-                    # 计算适应Canvas的图片大小（留边距）
-                    target_width = canvas_width - 20
-                    target_height = canvas_height - 20
+            def build_image_view():
+                # 创建固定显示容器（类似JSON显示框）
+                display_container = ttk.Frame(self.graph_preview_frame)
 
-                    self.log_message(f"🔧 DEBUG: Target size: {target_width}x{target_height}")
+                # 创建固定Canvas（无滚动条，填满容器）
+                canvas = tk.Canvas(display_container, bg='white', highlightthickness=1, relief='solid')
+                canvas.pack(fill=tk.BOTH, expand=True)
+                self._active_flowchart_canvas = canvas
 
-                    # 保持宽高比缩放，避免图片变形
-                    image_ratio = original_image.width / original_image.height
-                    target_ratio = target_width / target_height
+                def on_canvas_destroy(event=None):
+                    if self._active_flowchart_canvas is canvas:
+                        self._active_flowchart_canvas = None
 
-                    if image_ratio > target_ratio:
-                        # 图片更宽，以宽度为准
-                        new_width = target_width
-                        new_height = int(target_width / image_ratio)
-                    else:
-                        # 图片更高，以高度为准
-                        new_height = target_height
-                        new_width = int(target_height * image_ratio)
+                canvas.bind('<Destroy>', on_canvas_destroy)
+                canvas._base_image = None
+                canvas._base_photos = {}
+                canvas._redraw_after_id = None
+                canvas._last_draw_size = None
+                canvas._resize_future = None
 
-                    self.log_message(f"🔧 DEBUG: Calculated size: {new_width}x{new_height}")
-                    self.log_message(f"🔧 DEBUG: Image ratio: {image_ratio:.2f}, Target ratio: {target_ratio:.2f}")
+                def show_photo(photo):
+                    """在Canvas中心显示图片（只能在Tk主线程调用）"""
+                    canvas.delete("all")
+                    canvas.create_image(canvas.winfo_width()//2, canvas.winfo_height()//2,
+                                        image=photo, anchor=tk.CENTER)
+                    canvas.image = photo  # 保持引用
 
-                    self.log_message(f"🔧 DEBUG: Redraw image size: {new_width}x{new_height}")
+                def finish_redraw(future, cache_key):
+                    """后台缩放完成后，在主线程转换为PhotoImage并显示"""
+                    # 已有更新的重绘请求或Canvas已销毁时丢弃结果
+                    if future is not canvas._resize_future or not canvas.winfo_exists():
+                        return
+                    canvas._resize_future = None
+                    try:
+                        photo = ImageTk.PhotoImage(future.result())
+                    except Exception as e:
+                        self.log_message(f"🔧 DEBUG: Redraw failed: {e}")
+                        return
 
-                    # 缩放图片
-                    resized_image = original_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    photo = ImageTk.PhotoImage(resized_image)
+                    self._resize_cache[cache_key] = photo
+                    if len(self._resize_cache) > 8:
+                        self._resize_cache.popitem(last=False)
+                    show_photo(photo)
 
-                    # 在Canvas中心显示图片
-                    canvas.create_image(canvas_width//2, canvas_height//2, image=photo, anchor=tk.CENTER)
-                    canvas.image = photo  # 保持引用
+                def redraw_image():
+                    """重绘图片以适应当前Canvas大小"""
+                    canvas._redraw_after_id = None
+                    try:
+                        # 获取Canvas当前大小
+                        canvas_width = canvas.winfo_width()
+                        canvas_height = canvas.winfo_height()
+
+                        # 如果Canvas还没有实际大小，或大小未变化，跳过
+                        if canvas_width <= 1 or canvas_height <= 1:
+                            return
+                        if canvas._last_draw_size == (canvas_width, canvas_height):
+                            return
+                        canvas._last_draw_size = (canvas_width, canvas_height)
+
+                        original_image = canvas._base_image
+
+                        # 计算适应Canvas的图片大小（留边距，按16px取整以提高缩放缓存命中率）
+                        target_width = max(16, (canvas_width - 20) // 16 * 16)
+                        target_height = max(16, (canvas_height - 20) // 16 * 16)
+
+                        # 保持宽高比缩放，避免图片变形
+                        image_ratio = original_image.width / original_image.height
+                        target_ratio = target_width / target_height
+
+                        if image_ratio > target_ratio:
+                            # 图片更宽，以宽度为准
+                            new_width = target_width
+                            new_height = int(target_width / image_ratio)
+                        else:
+                            # 图片更高，以高度为准
+                            new_height = target_height
+                            new_width = int(target_height * image_ratio)
+
+                        self.debug_log("Redraw image size: %sx%s (canvas %sx%s, original %sx%s)",
+                                       new_width, new_height, canvas_width, canvas_height,
+                                       original_image.width, original_image.height)
+
+                        # 取消尚未完成的后台缩放（正在执行的任务结果会在finish_redraw中被丢弃）
+                        if canvas._resize_future is not None:
+                            canvas._resize_future.cancel()
+                            canvas._resize_future = None
+
+                        # 最大化/还原等来回切换的尺寸直接复用缓存的PhotoImage
+                        cache_key = (canvas.original_image_path, new_width, new_height)
+                        photo = self._resize_cache.get(cache_key)
+                        if photo is not None:
+                            self._resize_cache.move_to_end(cache_key)
+                            show_photo(photo)
+                            return
+
+                        # 母版恰为目标尺寸的整数倍时由Tk原生subsample缩小，不经过PIL；
+                        # 原尺寸PhotoImage只从文件加载一次，保存在canvas上复用
+                        photo = self.subsample_image_file(canvas.original_image_path, original_image.size,
+                                                          (new_width, new_height), canvas._base_photos)
+                        if photo is not None:
+                            self._resize_cache[cache_key] = photo
+                            if len(self._resize_cache) > 8:
+                                self._resize_cache.popitem(last=False)
+                            show_photo(photo)
+                            return
+
+                        def resize_in_background():
+                            # 缩小时用thumbnail（先粗降采样再LANCZOS），放大时才完整resize
+                            if new_width <= original_image.width and new_height <= original_image.height:
+                                resized_image = original_image.copy()
+                                resized_image.thumbnail((new_width, new_height), Image.Resampling.LANCZOS)
+                                return resized_image
+                            return original_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+                        def schedule_finish(future):
+                            try:
+                                self.root.after(0, finish_redraw, future, cache_key)
+                            except (RuntimeError, tk.TclError):
+                                pass  # 窗口已关闭
 
-                except Exception as e:
-                    self.log_message(f"🔧 DEBUG: Redraw failed: {e}")
+                        future = self._resize_pool.submit(resize_in_background)
+                        canvas._resize_future = future
+                        future.add_done_callback(schedule_finish)
 
-            # 绑定Canvas大小变化事件
-            def on_canvas_configure(event):
-                # 延迟重绘，避免频繁调用
-                canvas.after(100, redraw_image)
+                    except Exception as e:
+                        self.log_message(f"🔧 DEBUG: Redraw failed: {e}")
+
+                # 绑定Canvas大小变化事件
+                def on_canvas_configure(event=None):
+                    # 预览区尺寸已变化，缓存的UI尺寸作废
+                    self._ui_size_cache = (0.0, None)
+
+                    # 与上次绘制尺寸相差不足8px的抖动不重绘
+                    if event is not None and canvas._last_draw_size is not None:
+                        last_width, last_height = canvas._last_draw_size
+                        if abs(event.width - last_width) < 8 and abs(event.height - last_height) < 8:
+                            return
+
+                    # 防抖：取消尚未执行的重绘，只在大小稳定150ms后重绘一次
+                    if canvas._redraw_after_id is not None:
+                        canvas.after_cancel(canvas._redraw_after_id)
+                    canvas._redraw_after_id = canvas.after(150, redraw_image)
+
+                canvas.bind('<Configure>', on_canvas_configure)
+
+                return {
+                    'frame': display_container,
+                    'pack': {'fill': tk.BOTH, 'expand': True, 'padx': 5, 'pady': 5},
+                    'canvas': canvas,
+                    'schedule_redraw': on_canvas_configure,
+                }
 
-            canvas.bind('<Configure>', on_canvas_configure)
+            # 复用已有的图片视图，只替换图片并触发一次重绘
+            view = self._show_preview_view('mermaid_image', build_image_view)
+            canvas = view['canvas']
 
-            # 初始绘制
-            canvas.after(100, redraw_image)
+            # 保存原始图片路径，并只解码一次，重绘时复用
+            canvas.original_image_path = image_path
+            canvas._base_image = self.decode_mermaid_png(image_path)
+            canvas._base_photos = {}
+            canvas._last_draw_size = None
+            canvas._resize_future = None  # 旧图片的后台缩放结果不再显示
+            view['schedule_redraw']()
 
             # 更新全局状态
-            if hasattr(self, 'graph_status_label'):
+            if self.graph_status_label is not None:
                 try:
                     self.graph_status_label.config(text="✅ 图形已自适应渲染")
                 except tk.TclError:
                     pass
 
-            self.log_message("🔧 DEBUG: Mermaid image displayed successfully with adaptive sizing")
+            self.debug_log("Mermaid image displayed successfully with adaptive sizing")
             return True
 
         except Exception as e:
@@ -4960,21 +6203,28 @@ class MCUAnalyzerGUI:
         try:
             import tkinter.font as tkFont
 
-            self.log_message(f"🔧 DEBUG: Displaying SVG: {svg_path}")
+            self.debug_log("Displaying SVG: %s", svg_path)
 
             # 清理现有内容（保留控制面板）
-            for widget in self.graph_preview_frame.winfo_children():
-                if not hasattr(widget, '_is_control_frame'):
-                    widget.destroy()
+            self._clear_preview_frame()
 
             # 读取SVG内容
             with open(svg_path, 'r', encoding='utf-8') as f:
                 svg_content = f.read()
 
-            self.log_message(f"🔧 DEBUG: SVG content length: {len(svg_content)}")
+            self.debug_log("SVG content length: %s", len(svg_content))
+
+            # 安装了cairosvg时直接栅格化显示，不经过浏览器
+            try:
+                import cairosvg
 
-            # SVG转PNG转换已删除，仅支持在线渲染
-            self.log_message("🔧 DEBUG: SVG转PNG转换已删除，仅支持在线渲染")
+                png_bytes = cairosvg.svg2png(bytestring=svg_content.encode('utf-8'))
+                if self.display_mermaid_image_from_pil(self.open_image_for_display(io.BytesIO(png_bytes))):
+                    return True
+            except ImportError:
+                self.log_message("🔧 DEBUG: cairosvg not available, showing SVG code")
+            except Exception as e:
+                self.log_message(f"🔧 DEBUG: cairosvg conversion failed: {e}")
 
             # 备选方案：显示SVG代码
             self.show_svg_code_display(svg_content)
@@ -4992,19 +6242,15 @@ class MCUAnalyzerGUI:
             from PIL import Image, ImageTk
             import tkinter as tk
 
-            self.log_message(f"🔧 DEBUG: Displaying PIL image, size: {pil_image.size}")
+            self.debug_log("Displaying PIL image, size: %s", pil_image.size)
 
             # 清理现有内容（保留控制面板）
-            for widget in self.graph_preview_frame.winfo_children():
-                if not hasattr(widget, '_is_control_frame'):
-                    widget.destroy()
+            self._clear_preview_frame()
 
             # 创建滚动容器
             canvas_container = ttk.Frame(self.graph_preview_frame)
             canvas_container.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
-
-
             # 创建Canvas和滚动条
             canvas = tk.Canvas(canvas_container, bg='white', highlightthickness=0, width=800, height=600)
             v_scrollbar = ttk.Scrollbar(canvas_container, orient=tk.VERTICAL, command=canvas.yview)
@@ -5012,20 +6258,21 @@ class MCUAnalyzerGUI:
 
             canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
 
-            # 布局滚动条和Canvas
-            v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-            h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
-            canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            # 布局滚动条和Canvas（grid权重先配置好，布局只计算一次）
+            canvas_container.grid_rowconfigure(0, weight=1)
+            canvas_container.grid_columnconfigure(0, weight=1)
+            canvas.grid(row=0, column=0, sticky="nsew")
+            v_scrollbar.grid(row=0, column=1, sticky="ns")
+            h_scrollbar.grid(row=1, column=0, sticky="ew")
 
-            # 强制更新布局
-            canvas_container.update_idletasks()
+            # 强制更新布局（update_idletasks作用于整个应用，调用一次即可）
             canvas.update_idletasks()
 
             # 获取Canvas实际大小
             canvas_width = canvas.winfo_width()
             canvas_height = canvas.winfo_height()
 
-            self.log_message(f"🔧 DEBUG: Canvas size: {canvas_width}x{canvas_height}")
+            self.debug_log("Canvas size: %sx%s", canvas_width, canvas_height)
 
             # 如果Canvas还没有实际大小，使用默认值
             if canvas_width <= 1:
@@ -5057,10 +6304,10 @@ class MCUAnalyzerGUI:
                 new_height = min_size
                 new_width = int(min_size * image_ratio)
 
-            self.log_message(f"🔧 DEBUG: Resizing image to: {new_width}x{new_height}")
+            self.debug_log("Resizing image to: %sx%s", new_width, new_height)
 
-            # 缩放图片
-            resized_image = pil_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            # 缩放图片（reducing_gap：先整数倍box降采样，再对小图做LANCZOS）
+            resized_image = pil_image.resize((new_width, new_height), Image.Resampling.LANCZOS, reducing_gap=2.0)
             photo = ImageTk.PhotoImage(resized_image)
 
             # 在Canvas中显示图片
@@ -5080,7 +6327,7 @@ class MCUAnalyzerGUI:
             canvas.bind("<MouseWheel>", on_mousewheel)
             canvas.bind("<Shift-MouseWheel>", on_shift_mousewheel)
 
-            self.log_message("🔧 DEBUG: PIL image displayed successfully")
+            self.debug_log("PIL image displayed successfully")
             return True
 
         except Exception as e:
@@ -5092,57 +6339,41 @@ class MCUAnalyzerGUI:
     def auto_trigger_flowchart_redraw(self):
         f"""{loc.get_text('auto_trigger_flowchart_redraw')}"""
         try:
-            self.log_message(f"🔧 DEBUG: {loc.get_text('auto_trigger_flowchart_redraw')}")
+            self.debug_log(loc.get_text('auto_trigger_flowchart_redraw'))
 
             # 延迟执行，确保UI已经完全更新
             def delayed_redraw():
+                self._auto_redraw_after_id = None
                 try:
                     # 检查是否在Call Flowchart标签页
                     current_tab = self.notebook.tab(self.notebook.select(), "text")
                     if "Call Flowchart" in current_tab:
-                        self.log_message("🔧 DEBUG: Currently on Call Flowchart tab, triggering redraw")
+                        self.debug_log("Currently on Call Flowchart tab, triggering redraw")
                         self.trigger_flowchart_redraw()
                     else:
-                        self.log_message(f"🔧 DEBUG: Not on Call Flowchart tab (current: {current_tab}), skipping auto redraw")
+                        self.debug_log("Not on Call Flowchart tab (current: %s), skipping auto redraw", current_tab)
                 except Exception as e:
                     self.log_message(f"🔧 DEBUG: Auto redraw failed: {e}")
 
-            # 延迟2秒执行，确保分析结果已完全显示
-            self.root.after(2000, delayed_redraw)
+            # 延迟2秒执行，确保分析结果已完全显示；连续触发时只保留最后一次
+            if self._auto_redraw_after_id is not None:
+                self.root.after_cancel(self._auto_redraw_after_id)
+            self._auto_redraw_after_id = self.root.after(2000, delayed_redraw)
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to auto-trigger flowchart redraw: {e}")
 
     def trigger_flowchart_redraw(self):
-        """手动触发流程图重绘（包括重新生成Mermaid代码）"""
+        """手动触发流程图重绘（只按当前大小重新缩放已有图片，母版图不重新渲染）"""
         try:
-            # 检查是否需要重新生成Mermaid代码
-            current_width, current_height = self.get_ui_actual_size()
-
-            # 如果UI宽度变化超过100px，重新生成Mermaid代码
-            if hasattr(self, 'last_ui_width') and abs(current_width - self.last_ui_width) > 100:
-                self.log_message(f"🔧 DEBUG: UI width changed from {self.last_ui_width} to {current_width}, regenerating Mermaid")
-
-                # 重新生成Mermaid代码
-                if hasattr(self, 'call_analysis_data') and self.call_analysis_data:
-                    self.generate_mermaid_flowchart(self.call_analysis_data)
-
-                    # 重新渲染
-                    if hasattr(self, 'mermaid_code') and self.mermaid_code:
-                        self.render_call_flowchart_directly()
-                        return True
-
-            # 否则只是重绘现有图片
-            for widget in self.graph_preview_frame.winfo_children():
-                if isinstance(widget, ttk.Frame):
-                    for child in widget.winfo_children():
-                        if isinstance(child, tk.Canvas) and hasattr(child, 'original_image_path'):
-                            self.log_message("🔧 DEBUG: Found Canvas with image, triggering redraw")
-                            # 触发Configure事件来重绘
-                            child.event_generate('<Configure>')
-                            return True
+            canvas = self._active_flowchart_canvas
+            if canvas is not None:
+                self.debug_log("Found Canvas with image, triggering redraw")
+                # 触发Configure事件来重绘
+                canvas.event_generate('<Configure>')
+                return True
 
-            self.log_message("🔧 DEBUG: No Canvas with image found for redraw")
+            self.debug_log("No Canvas with image found for redraw")
             return False
 
         except Exception as e:
@@ -5150,14 +6381,15 @@ class MCUAnalyzerGUI:
             return False
 
     def get_ui_actual_size(self):
-        """获取UI图形预览区域的实际大小"""
+        """获取UI图形预览区域的实际大小（50ms内的重复调用直接返回缓存结果）"""
         try:
-            # 强制更新布局
-            self.root.update_idletasks()
+            cached_at, cached_size = self._ui_size_cache
+            if cached_size is not None and time.monotonic() - cached_at < _UI_SIZE_CACHE_TTL:
+                return cached_size
 
             # 获取图形预览框架的实际大小
             if hasattr(self, 'graph_preview_frame'):
-                # 强制更新几何信息
+                # 强制更新几何信息（update_idletasks处理的是整个应用的空闲任务，调用一次即可）
                 self.graph_preview_frame.update_idletasks()
 
                 frame_width = self.graph_preview_frame.winfo_width()
@@ -5165,7 +6397,7 @@ class MCUAnalyzerGUI:
 
                 # 如果框架还没有实际大小，使用窗口尺寸作为参考
                 if frame_width <= 1 or frame_height <= 1:
-                    if hasattr(self, 'last_window_size') and self.last_window_size:
+                    if self.last_window_size:
                         window_width, window_height = self.last_window_size
                         frame_width = max(800, window_width - 200)  # 减去侧边栏等
                         frame_height = max(600, window_height - 200)  # 减去菜单栏等
@@ -5177,7 +6409,9 @@ class MCUAnalyzerGUI:
                 actual_width = max(400, frame_width - 50)  # 最小400px
                 actual_height = max(300, frame_height - 100)  # 最小300px
 
-                self.log_message(f"🔧 DEBUG: Frame size: {frame_width}x{frame_height}, Actual: {actual_width}x{actual_height}")
+                self.debug_log("Frame size: %sx%s, Actual: %sx%s",
+                               frame_width, frame_height, actual_width, actual_height)
+                self._ui_size_cache = (time.monotonic(), (actual_width, actual_height))
                 return actual_width, actual_height
             else:
                 self.log_message("🔧 DEBUG: graph_preview_frame not found, using default size")
@@ -5188,88 +6422,31 @@ class MCUAnalyzerGUI:
             return 800, 600
 
     def calculate_optimal_png_size(self):
-        """计算最佳PNG生成尺寸，基于UI实际尺寸和显示质量要求"""
-        try:
-            # 获取UI实际尺寸
-            ui_width, ui_height = self.get_ui_actual_size()
-
-            # 计算内容复杂度因子（基于Mermaid代码长度和节点数量）
-            complexity_factor = 1.0
-            if hasattr(self, 'mermaid_code') and self.mermaid_code:
-                # 基于代码长度估算复杂度
-                code_length = len(self.mermaid_code)
-                node_count = self.mermaid_code.count('-->') + self.mermaid_code.count('---')
-
-                if code_length > 2000 or node_count > 20:
-                    complexity_factor = 1.5  # 复杂图表需要更高分辨率
-                elif code_length > 1000 or node_count > 10:
-                    complexity_factor = 1.2
-
-            # 计算基础PNG尺寸（基于UI尺寸，但考虑显示质量）
-            base_width = int(ui_width * complexity_factor)
-            base_height = int(ui_height * complexity_factor)
-
-            # 确保最小和最大尺寸限制
-            min_width, max_width = 600, 2400
-            min_height, max_height = 400, 1800
-
-            optimal_width = max(min_width, min(max_width, base_width))
-            optimal_height = max(min_height, min(max_height, base_height))
-
-            # 根据尺寸计算合适的DPI
-            if optimal_width > 1600 or optimal_height > 1200:
-                optimal_dpi = 200  # 大尺寸用高DPI
-            elif optimal_width > 1000 or optimal_height > 800:
-                optimal_dpi = 150  # 中等尺寸用中等DPI
-            else:
-                optimal_dpi = 120  # 小尺寸用标准DPI
-
-            self.log_message(f"🔧 DEBUG: Calculated optimal PNG size: {optimal_width}x{optimal_height} @ {optimal_dpi}DPI")
-            self.log_message(f"🔧 DEBUG: UI size: {ui_width}x{ui_height}, Complexity factor: {complexity_factor}")
+        """返回Mermaid位图的生成尺寸和DPI
 
-            return optimal_width, optimal_height, optimal_dpi
-
-        except Exception as e:
-            self.log_message(f"🔧 DEBUG: Failed to calculate optimal PNG size: {e}")
-            # 返回合理的默认值
-            return 1200, 800, 150
+        固定按母版分辨率渲染，与UI尺寸无关：窗口缩放时只对同一张母版图做Pillow缩小，
+        不再重新调用渲染器
+        """
+        optimal_width, optimal_height = _MASTER_PNG_SIZE
+        return optimal_width, optimal_height, _MASTER_PNG_DPI
 
     def create_mermaid_config(self):
-        """创建Mermaid配置文件，确保字体正确渲染"""
+        """创建Mermaid配置文件，确保字体正确渲染（内容固定，同一进程内复用同一个文件；可在后台线程调用）"""
         try:
             import tempfile
-            import json
-
-            config = {
-                "theme": "default",
-                "themeVariables": {
-                    "primaryColor": "#ff6b6b",
-                    "primaryTextColor": "#000000",
-                    "primaryBorderColor": "#333333",
-                    "lineColor": "#333333",
-                    "secondaryColor": "#51cf66",
-                    "tertiaryColor": "#74c0fc",
-                    "background": "#ffffff",
-                    "mainBkg": "#ffffff",
-                    "secondBkg": "#f8f9fa",
-                    "tertiaryBkg": "#e9ecef"
-                },
-                "flowchart": {
-                    "useMaxWidth": True,
-                    "htmlLabels": True,
-                    "curve": "basis"
-                },
-                "fontFamily": "Microsoft YaHei, Arial, sans-serif",
-                "fontSize": "14px",
-                "fontWeight": "bold"
-            }
 
-            # 创建临时配置文件
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False, encoding='utf-8') as f:
-                json.dump(config, f, indent=2)
-                config_file = f.name
+            with self._mermaid_config_lock:
+                config_file = self._mermaid_config_path
+                if config_file and os.path.exists(config_file):
+                    return config_file
+
+                # 创建临时配置文件
+                with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False, encoding='utf-8') as f:
+                    f.write(_MERMAID_CLI_CONFIG_JSON)
+                    config_file = f.name
 
-            self.log_message(f"🔧 DEBUG: Created Mermaid config file: {config_file}")
+                self._mermaid_config_path = config_file
+            self.debug_log("Created Mermaid config file: %s", config_file)
             return config_file
 
         except Exception as e:
@@ -5277,8 +6454,10 @@ class MCUAnalyzerGUI:
             return None
 
     def show_svg_code_display(self, svg_content):
-        """显示SVG代码和预览信息"""
+        """显示SVG生成结果；SVG源码Text控件在点击"显示SVG源码"后才创建"""
         try:
+            self._svg_content = svg_content
+
             # 创建显示容器
             svg_container = ttk.LabelFrame(
                 self.graph_preview_frame,
@@ -5290,40 +6469,19 @@ class MCUAnalyzerGUI:
             # 信息标签
             info_label = ttk.Label(
                 svg_container,
-                text="✅ SVG已生成！复制下方代码到支持SVG的编辑器中查看",
+                text="✅ SVG已生成！可直接复制或保存，复制到支持SVG的编辑器中查看",
                 font=("Microsoft YaHei", 10, "bold"),
                 foreground="green"
             )
             info_label.pack(pady=(0, 10))
 
-            # SVG代码显示
-            code_text = tk.Text(
-                svg_container,
-                font=("Consolas", 9),
-                wrap=tk.WORD,
-                bg='#f8f9fa',
-                relief=tk.SOLID,
-                borderwidth=1
-            )
-            code_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-
-            # 插入SVG代码
-            code_text.insert(tk.END, svg_content)
-            code_text.config(state=tk.DISABLED)
-
-            # 添加滚动条
-            scrollbar = ttk.Scrollbar(code_text)
-            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-            code_text.config(yscrollcommand=scrollbar.set)
-            scrollbar.config(command=code_text.yview)
-
             # 操作按钮
             button_frame = ttk.Frame(svg_container)
             button_frame.pack(fill=tk.X, pady=(10, 0))
 
             def copy_svg():
                 self.root.clipboard_clear()
-                self.root.clipboard_append(svg_content)
+                self.root.clipboard_append(self._svg_content)
                 messagebox.showinfo("复制成功", "SVG代码已复制到剪贴板")
 
             def save_svg():
@@ -5333,26 +6491,61 @@ class MCUAnalyzerGUI:
                     filetypes=[("SVG files", "*.svg"), ("All files", "*.*")]
                 )
                 if file_path:
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(svg_content)
+                    Path(file_path).write_bytes(self._svg_content.encode('utf-8'))
                     messagebox.showinfo("保存成功", f"SVG文件已保存到: {file_path}")
 
+            def show_source():
+                show_button.config(state=tk.DISABLED)
+                self._build_svg_code_widget(svg_container, before=button_frame)
+
+            show_button = ttk.Button(button_frame, text="📄 显示SVG源码", command=show_source)
+            show_button.pack(side=tk.LEFT, padx=(0, 10))
             ttk.Button(button_frame, text="📋 复制SVG", command=copy_svg).pack(side=tk.LEFT, padx=(0, 10))
             ttk.Button(button_frame, text="💾 保存SVG", command=save_svg).pack(side=tk.LEFT)
 
-            self.log_message("🔧 DEBUG: SVG code display created successfully")
+            self.debug_log("SVG code display created successfully")
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to show SVG code display: {e}")
 
+    def _build_svg_code_widget(self, parent, before=None):
+        """在parent中创建只读的SVG源码Text控件并填入self._svg_content"""
+        try:
+            # SVG代码显示
+            code_text = tk.Text(
+                parent,
+                font=("Consolas", 9),
+                wrap=tk.WORD,
+                bg='#f8f9fa',
+                relief=tk.SOLID,
+                borderwidth=1,
+                undo=False,
+                autoseparators=False
+            )
+            code_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5, before=before)
+
+            # 插入SVG代码（分块插入，超长时截断显示；复制/保存使用完整的SVG内容）
+            self.insert_text_chunked(code_text, self._svg_content, max_chars=_TEXT_DISPLAY_MAX_CHARS)
+
+            # 添加滚动条
+            scrollbar = ttk.Scrollbar(code_text)
+            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            code_text.config(yscrollcommand=scrollbar.set)
+            scrollbar.config(command=code_text.yview)
+
+            return code_text
+
+        except Exception as e:
+            self.log_message(f"🔧 DEBUG: Failed to build SVG code widget: {e}")
+            return None
+
     def force_canvas_mermaid_rendering(self):
         """强制使用Canvas渲染Mermaid样式的流程图 - 必须成功"""
         try:
-            self.log_message("🔧 DEBUG: Force Canvas Mermaid rendering - MUST SUCCEED")
+            self.debug_log("Force Canvas Mermaid rendering - MUST SUCCEED")
 
             # 清理现有内容
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            self._clear_preview_frame(keep_control=False)
 
             # 创建Canvas容器
             canvas_container = ttk.Frame(self.graph_preview_frame)
@@ -5414,13 +6607,13 @@ class MCUAnalyzerGUI:
             status_label.pack(pady=10)
 
             # 更新全局状态
-            if hasattr(self, 'graph_status_label'):
+            if self.graph_status_label is not None:
                 try:
                     self.graph_status_label.config(text="✅ Mermaid图形已在UI内部渲染")
                 except tk.TclError:
                     pass
 
-            self.log_message("🔧 DEBUG: Force Canvas Mermaid rendering completed successfully")
+            self.debug_log("Force Canvas Mermaid rendering completed successfully")
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Force Canvas Mermaid rendering failed: {e}")
@@ -5431,7 +6624,7 @@ class MCUAnalyzerGUI:
         """绘制Mermaid样式的流程图"""
         try:
             # 如果没有调用图数据，显示提示
-            if not hasattr(self, 'call_graph') or not self.call_graph:
+            if not self.call_graph:
                 self.draw_no_data_canvas(canvas, width, height)
                 return
 
@@ -5440,17 +6633,8 @@ class MCUAnalyzerGUI:
                 self.draw_no_data_canvas(canvas, width, height)
                 return
 
-            # Mermaid样式配置
-            style = {
-                'main_node': {'fill': '#ff6b6b', 'stroke': '#e55656', 'text': 'white'},
-                'interface_node': {'fill': '#51cf66', 'stroke': '#40c057', 'text': 'white'},
-                'user_node': {'fill': '#339af0', 'stroke': '#228be6', 'text': 'white'},
-                'deep_node': {'fill': '#ffd43b', 'stroke': '#fab005', 'text': 'black'},
-                'connection': {'stroke': '#495057', 'width': 2}
-            }
-
-            # 简化版本：直接绘制基本流程图
-            self.draw_simple_mermaid_flowchart(canvas, width, height, style)
+            # 简化版本：直接绘制基本流程图（样式为模块级常量元组）
+            self.draw_simple_mermaid_flowchart(canvas, width, height, _MERMAID_FLOWCHART_STYLE)
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to draw mermaid style flowchart: {e}")
@@ -5471,16 +6655,18 @@ class MCUAnalyzerGUI:
         self.draw_mermaid_node(canvas, main_x, main_y, "main()", style['main_node'])
 
         # 绘制示例节点
+        interface_style = style['interface_node']
         nodes = [
-            (main_x - 200, main_y + 100, "HAL_Init()", style['interface_node']),
-            (main_x, main_y + 100, "GPIO_Init()", style['interface_node']),
-            (main_x + 200, main_y + 100, "UART_Init()", style['interface_node']),
+            (main_x - 200, main_y + 100, "HAL_Init()", interface_style),
+            (main_x, main_y + 100, "GPIO_Init()", interface_style),
+            (main_x + 200, main_y + 100, "UART_Init()", interface_style),
             (main_x, main_y + 200, "User_Function()", style['user_node'])
         ]
 
         # 绘制连接线
+        connection_style = style['connection']
         for node_x, node_y, _, _ in nodes:
-            self.draw_mermaid_arrow(canvas, main_x, main_y + 30, node_x, node_y - 30, style['connection'])
+            self.draw_mermaid_arrow(canvas, main_x, main_y + 30, node_x, node_y - 30, connection_style)
 
         # 绘制节点
         for node_x, node_y, label, node_style in nodes:
@@ -5490,17 +6676,19 @@ class MCUAnalyzerGUI:
         self.draw_mermaid_legend_simple(canvas, width, height, style)
 
     def draw_mermaid_node(self, canvas, x, y, text, style):
-        """绘制Mermaid样式的节点"""
+        """绘制Mermaid样式的节点，style为(填充色, 边框色, 文字色)"""
+        fill, stroke, text_color = style
+
         # 计算文本大小
-        text_width = len(text) * 8 + 20
-        text_height = 40
+        half_width = (len(text) * 8 + 20) // 2
+        half_height = 20
 
         # 绘制节点背景
         canvas.create_rectangle(
-            x - text_width//2, y - text_height//2,
-            x + text_width//2, y + text_height//2,
-            fill=style['fill'],
-            outline=style['stroke'],
+            x - half_width, y - half_height,
+            x + half_width, y + half_height,
+            fill=fill,
+            outline=stroke,
             width=2
         )
 
@@ -5509,15 +6697,16 @@ class MCUAnalyzerGUI:
             x, y,
             text=text,
             font=("Microsoft YaHei", 10, "bold"),
-            fill=style['text']
+            fill=text_color
         )
 
     def draw_mermaid_arrow(self, canvas, x1, y1, x2, y2, style):
-        """绘制Mermaid样式的箭头"""
+        """绘制Mermaid样式的箭头，style为(颜色, 线宽)"""
+        stroke, line_width = style
         canvas.create_line(
             x1, y1, x2, y2,
-            fill=style['stroke'],
-            width=style['width'],
+            fill=stroke,
+            width=line_width,
             arrow=tk.LAST,
             arrowshape=(10, 12, 3)
         )
@@ -5535,10 +6724,10 @@ class MCUAnalyzerGUI:
         )
 
         legends = [
-            ("🔴 main函数", style['main_node']['fill']),
-            ("🟢 HAL/GPIO函数", style['interface_node']['fill']),
-            ("🔵 用户函数", style['user_node']['fill']),
-            ("🟡 深层函数", style['deep_node']['fill'])
+            ("🔴 main函数", style['main_node'][0]),
+            ("🟢 HAL/GPIO函数", style['interface_node'][0]),
+            ("🔵 用户函数", style['user_node'][0]),
+            ("🟡 深层函数", style['deep_node'][0])
         ]
 
         for i, (text, color) in enumerate(legends):
@@ -5581,8 +6770,7 @@ class MCUAnalyzerGUI:
         """显示文本版本的Mermaid代码作为最后的备选方案"""
         try:
             # 清理现有内容
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            self._clear_preview_frame(keep_control=False)
 
             # 创建文本显示容器
             text_frame = ttk.Frame(self.graph_preview_frame)
@@ -5605,17 +6793,18 @@ class MCUAnalyzerGUI:
                 relief=tk.SOLID,
                 borderwidth=1,
                 padx=15,
-                pady=15
+                pady=15,
+                undo=False,
+                autoseparators=False
             )
             code_text.pack(fill=tk.BOTH, expand=True)
 
-            # 插入Mermaid代码
-            if hasattr(self, 'mermaid_code') and self.mermaid_code:
-                code_text.insert(tk.END, self.mermaid_code)
+            # 插入Mermaid代码（分块插入，超长时截断显示）
+            if self.mermaid_code:
+                self.insert_text_chunked(code_text, self.mermaid_code, max_chars=_TEXT_DISPLAY_MAX_CHARS)
             else:
                 code_text.insert(tk.END, "暂无Mermaid代码，请先进行分析")
-
-            code_text.config(state=tk.DISABLED)
+                code_text.config(state=tk.DISABLED)
 
             # 状态标签
             status_label = ttk.Label(
@@ -5626,7 +6815,7 @@ class MCUAnalyzerGUI:
             )
             status_label.pack(pady=10)
 
-            self.log_message("🔧 DEBUG: Text Mermaid fallback displayed successfully")
+            self.debug_log("Text Mermaid fallback displayed successfully")
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Text Mermaid fallback failed: {e}")
@@ -5637,8 +6826,7 @@ class MCUAnalyzerGUI:
             self.log_message("🔧 DEBUG: Showing rendering failure help")
 
             # 清理现有内容
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            self._clear_preview_frame(keep_control=False)
 
             # 创建帮助界面
             help_frame = ttk.Frame(self.graph_preview_frame)
@@ -5685,7 +6873,7 @@ class MCUAnalyzerGUI:
             help_text.insert(tk.END, help_content)
 
             # 插入Mermaid代码
-            if hasattr(self, 'mermaid_code') and self.mermaid_code:
+            if self.mermaid_code:
                 try:
                     help_text.insert(tk.END, "\n" + str(self.mermaid_code))
                 except Exception as e:
@@ -5724,7 +6912,7 @@ class MCUAnalyzerGUI:
 
             # 在线预览按钮
             def open_online():
-                if hasattr(self, 'mermaid_code') and self.mermaid_code:
+                if self.mermaid_code:
                     import urllib.parse
                     import webbrowser
                     encoded_code = urllib.parse.quote(self.mermaid_code)
@@ -5739,7 +6927,7 @@ class MCUAnalyzerGUI:
             online_btn.pack(side=tk.LEFT)
 
             # 更新状态
-            if hasattr(self, 'graph_status_label'):
+            if self.graph_status_label is not None:
                 try:
                     self.graph_status_label.config(text="❌ 需要安装渲染引擎")
                 except tk.TclError:
@@ -5749,131 +6937,71 @@ class MCUAnalyzerGUI:
             self.log_message(f"🔧 DEBUG: Failed to show rendering failure help: {e}")
 
     def render_mermaid_with_matplotlib(self):
-        """使用matplotlib在UI内部渲染真正的流程图"""
-        try:
-            import matplotlib.pyplot as plt
-            import matplotlib.patches as patches
-            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-            import networkx as nx
-            import re
-
-            self.log_message("🔧 DEBUG: Trying matplotlib rendering")
-
-            # 解析Mermaid代码生成图形数据
-            graph_data = self.parse_mermaid_to_graph()
-            if not graph_data:
-                self.log_message("🔧 DEBUG: Failed to parse Mermaid code")
-                return False
-
-            # 创建matplotlib图形
-            fig, ax = plt.subplots(figsize=(12, 8))
-            fig.patch.set_facecolor('#f8f9fa')
-            ax.set_facecolor('#ffffff')
-
-            # 创建NetworkX图
-            G = nx.DiGraph()
-
-            # 添加节点和边
-            for node_id, node_data in graph_data['nodes'].items():
-                G.add_node(node_id, **node_data)
+        """使用matplotlib在UI内部渲染真正的流程图（同一份Mermaid代码的Figure会被缓存复用）
 
-            for edge in graph_data['edges']:
-                G.add_edge(edge['from'], edge['to'])
-
-            # 使用层次布局
-            try:
-                pos = nx.spring_layout(G, k=3, iterations=50)
-            except:
-                pos = nx.random_layout(G)
-
-            # 绘制边
-            nx.draw_networkx_edges(G, pos, ax=ax,
-                                 edge_color='#666666',
-                                 arrows=True,
-                                 arrowsize=20,
-                                 arrowstyle='->',
-                                 width=2,
-                                 alpha=0.7)
-
-            # 绘制节点
-            for node_id, (x, y) in pos.items():
-                node_data = graph_data['nodes'][node_id]
-                color = node_data.get('color', '#3498db')
-                label = node_data.get('label', node_id)
-
-                # 绘制节点背景
-                circle = patches.Circle((x, y), 0.1,
-                                      facecolor=color,
-                                      edgecolor='white',
-                                      linewidth=2,
-                                      alpha=0.8)
-                ax.add_patch(circle)
-
-                # 添加文本标签
-                ax.text(x, y-0.15, label,
-                       horizontalalignment='center',
-                       verticalalignment='center',
-                       fontsize=9,
-                       fontweight='bold',
-                       bbox=dict(boxstyle="round,pad=0.3",
-                               facecolor='white',
-                               edgecolor=color,
-                               alpha=0.9))
-
-            # 设置图形样式
-            ax.set_title('🔄 STM32项目调用流程图',
-                        fontsize=16,
-                        fontweight='bold',
-                        pad=20)
-            ax.axis('off')
-
-            # 添加图例
-            legend_elements = [
-                patches.Patch(color='#e74c3c', label='🔴 main函数'),
-                patches.Patch(color='#27ae60', label='🟢 HAL/GPIO函数'),
-                patches.Patch(color='#3498db', label='🔵 用户函数'),
-                patches.Patch(color='#f39c12', label='🟡 深层函数')
-            ]
-            ax.legend(handles=legend_elements,
-                     loc='upper right',
-                     bbox_to_anchor=(1, 1))
-
-            plt.tight_layout()
+        缓存未命中时解析、布局和绘制在后台线程完成，结果通过root.after回到主线程嵌入；
+        返回True表示已显示或已开始后台渲染，后台渲染失败时继续尝试后面的备选方案
+        """
+        try:
+            # matplotlib/networkx已在模块加载时导入，这里不再重复走导入机制
+            if not MATPLOTLIB_AVAILABLE:
+                raise ImportError("matplotlib/networkx not installed")
+
+            self.debug_log("Trying matplotlib rendering")
+
+            # Mermaid代码未变化时直接复用已绘制的Figure，跳过解析、布局和绘制
+            mermaid_code = self.mermaid_code
+            cache_key = hashlib.blake2b(mermaid_code.encode('utf-8'), digest_size=16).digest()
+            fig = self._matplotlib_figure_cache.get(cache_key)
+            if fig is not None:
+                self._matplotlib_figure_cache.move_to_end(cache_key)
+                self.debug_log("Reusing cached matplotlib figure")
+                self.embed_matplotlib_figure(fig)
+                return True
 
-            # 嵌入到tkinter中
-            canvas_frame = ttk.Frame(self.graph_preview_frame)
-            canvas_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+            # 力导向布局是O(n²)迭代，放到后台线程，避免冻结Tk事件循环
+            if self.graph_status_label is not None:
+                try:
+                    self.graph_status_label.config(text="🔄 正在后台布局流程图...")
+                except tk.TclError:
+                    pass
 
-            canvas = FigureCanvasTkAgg(fig, canvas_frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            # 记下提交时的预览区版本，结果回来时预览区已换成别的内容就不再显示
+            generation = self._preview_generation
 
-            # 添加工具栏
-            toolbar_frame = ttk.Frame(canvas_frame)
-            toolbar_frame.pack(fill=tk.X, pady=(5, 0))
+            def finish(future):
+                try:
+                    fig = future.result()
+                except Exception as e:
+                    self.log_message(f"🔧 DEBUG: Matplotlib rendering failed: {e}")
+                    fig = None
+                else:
+                    if fig is None:
+                        self.log_message("🔧 DEBUG: Failed to parse Mermaid code")
+                    else:
+                        self._matplotlib_figure_cache[cache_key] = fig
+                        if len(self._matplotlib_figure_cache) > 8:
+                            self._matplotlib_figure_cache.popitem(last=False)
 
-            # 保存按钮
-            def save_figure():
-                from tkinter import filedialog
-                file_path = filedialog.asksaveasfilename(
-                    defaultextension=".png",
-                    filetypes=[("PNG files", "*.png"), ("PDF files", "*.pdf"), ("SVG files", "*.svg")]
-                )
-                if file_path:
-                    fig.savefig(file_path, dpi=300, bbox_inches='tight')
-                    self.log_message(f"🔧 DEBUG: Figure saved to {file_path}")
+                # 后台渲染期间预览区已更新时只缓存结果，不覆盖新的显示
+                if generation != self._preview_generation:
+                    self.debug_log("Discarding stale matplotlib render result")
+                    return
 
-            save_btn = ttk.Button(toolbar_frame, text="💾 保存图片", command=save_figure)
-            save_btn.pack(side=tk.LEFT, padx=(0, 10))
+                if fig is None:
+                    # 继续尝试matplotlib之后的备选方案
+                    self.try_fallback_rendering(exclude=(self.render_mermaid_with_matplotlib,))
+                    return
+                self.embed_matplotlib_figure(fig)
 
-            # 更新状态
-            if hasattr(self, 'graph_status_label'):
+            def schedule_finish(future):
                 try:
-                    self.graph_status_label.config(text="✅ 流程图已在UI内部渲染")
-                except tk.TclError:
-                    pass
+                    self.root.after(0, finish, future)
+                except (RuntimeError, tk.TclError):
+                    pass  # 窗口已关闭
 
-            self.log_message("🔧 DEBUG: Matplotlib rendering successful")
+            future = self._render_pool.submit(self.build_matplotlib_figure_from_code, mermaid_code)
+            future.add_done_callback(schedule_finish)
             return True
 
         except ImportError as e:
@@ -5885,31 +7013,209 @@ class MCUAnalyzerGUI:
             traceback.print_exc()
             return False
 
-    def parse_mermaid_to_graph(self):
-        """解析Mermaid代码为图形数据"""
+    def embed_matplotlib_figure(self, fig):
+        """在预览区嵌入matplotlib Figure（只能在Tk主线程调用）"""
+        # 嵌入到tkinter中（复用常驻宿主Frame，替换掉上一次的内容）
+        canvas_frame = ttk.Frame(self._preview_host())
+        canvas_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        # 只请求空闲时重绘：控件打包、获得实际尺寸后由Tk驱动首次绘制（FigureCanvasTk
+        # 自带的<Configure>处理也只调用draw_idle，连续缩放会合并为一次绘制）
+        canvas = FigureCanvasTkAgg(fig, canvas_frame)
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        canvas.draw_idle()
+
+        # 添加工具栏
+        toolbar_frame = ttk.Frame(canvas_frame)
+        toolbar_frame.pack(fill=tk.X, pady=(5, 0))
+
+        # 保存按钮
+        def save_figure():
+            from tkinter import filedialog
+            file_path = filedialog.asksaveasfilename(
+                defaultextension=".png",
+                filetypes=[("PNG files", "*.png"), ("PDF files", "*.pdf"), ("SVG files", "*.svg")]
+            )
+            if file_path:
+                # 只有PNG是位图，按150 DPI栅格化；PDF/SVG为矢量格式，DPI无意义
+                save_kwargs = {'bbox_inches': 'tight'}
+                if os.path.splitext(file_path)[1].lower() == '.png':
+                    save_kwargs['dpi'] = 150
+                fig.savefig(file_path, **save_kwargs)
+                self.debug_log("Figure saved to %s", file_path)
+
+        save_btn = ttk.Button(toolbar_frame, text="💾 保存图片", command=save_figure)
+        save_btn.pack(side=tk.LEFT, padx=(0, 10))
+
+        # 更新状态
+        if self.graph_status_label is not None:
+            try:
+                self.graph_status_label.config(text="✅ 流程图已在UI内部渲染")
+            except tk.TclError:
+                pass
+
+        self.debug_log("Matplotlib rendering successful")
+
+    def build_matplotlib_figure_from_code(self, mermaid_code):
+        """解析Mermaid代码并绘制Figure，不访问Tk控件，可在后台线程调用；解析失败返回None"""
+        graph_data = self.parse_mermaid_to_graph(mermaid_code)
+        if not graph_data:
+            return None
+        return self.build_matplotlib_flowchart_figure(graph_data)
+
+    def build_matplotlib_flowchart_figure(self, graph_data):
+        """根据解析出的图形数据绘制matplotlib流程图，返回Figure（调用前需确认MATPLOTLIB_AVAILABLE）"""
+        from matplotlib.collections import PatchCollection
+        import numpy as np
+
+        # 创建matplotlib图形（直接构造Figure，不注册到pyplot的全局图形管理器，
+        # 不再引用时即可被回收）
+        fig = Figure(figsize=(12, 8))
+        # 坐标轴已关闭、尺寸固定：直接给出固定边距，顶部只留出标题位置，
+        # 不再用tight_layout遍历所有文本框计算包围盒
+        fig.subplots_adjust(left=0, right=1, top=0.92, bottom=0)
+        ax = fig.add_subplot()
+        fig.patch.set_facecolor('#f8f9fa')
+        ax.set_facecolor('#ffffff')
+
+        labels = graph_data['labels']
+        node_colors = graph_data['colors']
+        edge_src, edge_dst = graph_data['edges']
+
+        # 创建NetworkX图：节点直接用整数下标，不再以字符串为键
+        G = nx.DiGraph()
+        G.add_nodes_from(range(len(labels)))
+        G.add_edges_from(zip(edge_src.tolist(), edge_dst.tolist()))
+
+        # 使用力导向布局：迭代次数随节点数调整，固定seed使同一张图每次布局一致
+        node_count = G.number_of_nodes()
+        initial_pos = None
+        if node_count < 30:
+            iterations = 20
+        elif node_count < 200:
+            iterations = 50
+        elif node_count <= 500:
+            iterations = 100
+        else:
+            # 大图先用谱布局（稀疏特征分解）得到近似解作为初始位置，
+            # 力导向只需少量迭代微调；NetworkX对500+节点自动使用稀疏FR实现
+            iterations = 50
+            try:
+                initial_pos = nx.spectral_layout(G)
+            except Exception as e:
+                self.log_message(f"🔧 DEBUG: Spectral warm start failed: {e}")
         try:
-            if not hasattr(self, 'mermaid_code') or not self.mermaid_code:
-                return None
+            # k按Fruchterman-Reingold单位正方形公式随节点数缩放
+            pos = nx.spring_layout(G, pos=initial_pos, k=3 / max(node_count, 1) ** 0.5,
+                                   iterations=iterations, seed=42)
+        except:
+            pos = nx.random_layout(G)
+
+        # 节点坐标按整数下标排成(N, 2)数组
+        positions = np.array([pos[i] for i in range(len(labels))], dtype=float)
+
+        # 绘制边：按下标从坐标数组直接取出起点/终点，用一个quiver画出线段和箭头，
+        # 不再逐条边构造FancyArrowPatch
+        non_loop = edge_src != edge_dst
+        if non_loop.any():
+            starts = positions[edge_src[non_loop]]
+            vectors = positions[edge_dst[non_loop]] - starts
+            # 箭头停在目标节点圆（半径0.1）的边缘
+            lengths = np.hypot(vectors[:, 0], vectors[:, 1])
+            shrink = np.clip((lengths - 0.1) / np.maximum(lengths, 1e-9), 0.0, 1.0)
+            vectors *= shrink[:, np.newaxis]
+            ax.quiver(starts[:, 0], starts[:, 1], vectors[:, 0], vectors[:, 1],
+                      angles='xy', scale_units='xy', scale=1,
+                      color='#666666', alpha=0.7,
+                      width=0.002, headwidth=5, headlength=7, headaxislength=6)
+
+        # 绘制节点：所有节点圆合并为一个PatchCollection，只产生一次draw_path_collection
+        circles = []
+        text_style = dict(horizontalalignment='center',
+                          verticalalignment='center',
+                          fontsize=9,
+                          fontweight='bold')
+        for (x, y), label, color in zip(positions.tolist(), labels, node_colors):
+            circles.append(patches.Circle((x, y), 0.1))
+
+            # 添加文本标签
+            ax.text(x, y-0.15, label,
+                   bbox=dict(boxstyle="round,pad=0.3",
+                           facecolor='white',
+                           edgecolor=color,
+                           alpha=0.9),
+                   **text_style)
+
+        ax.add_collection(PatchCollection(circles,
+                                          facecolors=list(node_colors),
+                                          edgecolors='white',
+                                          linewidths=2,
+                                          alpha=0.8,
+                                          match_original=False))
+        ax.autoscale_view()
+
+        # 设置图形样式
+        ax.set_title('🔄 STM32项目调用流程图',
+                    fontsize=16,
+                    fontweight='bold',
+                    pad=20)
+        ax.axis('off')
+
+        # 添加图例
+        legend_elements = [
+            patches.Patch(color='#e74c3c', label='🔴 main函数'),
+            patches.Patch(color='#27ae60', label='🟢 HAL/GPIO函数'),
+            patches.Patch(color='#3498db', label='🔵 用户函数'),
+            patches.Patch(color='#f39c12', label='🟡 深层函数')
+        ]
+        ax.legend(handles=legend_elements,
+                 loc='upper right',
+                 bbox_to_anchor=(1, 1))
 
-            import re
+        return fig
 
-            # 初始化图形数据
-            graph_data = {
-                'nodes': {},
-                'edges': []
-            }
+    def parse_mermaid_to_graph(self, mermaid_code=None):
+        """解析Mermaid代码为图形数据（mermaid_code为空时使用self.mermaid_code）
+
+        返回按列存放的数组：节点用整数下标表示，
+        {'ids': {节点名: 下标}, 'names': [节点名], 'labels': ndarray, 'colors': ndarray,
+         'edges': (起点下标ndarray, 终点下标ndarray)}
+        """
+        try:
+            import numpy as np
 
-            # 解析节点和边
-            lines = self.mermaid_code.strip().split('\n')
+            if mermaid_code is None:
+                mermaid_code = self.mermaid_code
+            if not mermaid_code:
+                return None
 
-            for line in lines:
+            # 节点名 -> 整数下标；标签/颜色/边端点按下标分列累积
+            name_to_idx = {}
+            names = []
+            labels = []
+            colors = []
+            edge_src = []
+            edge_dst = []
+
+            def node_index(name, label):
+                idx = name_to_idx.get(name)
+                if idx is None:
+                    idx = name_to_idx[name] = len(names)
+                    names.append(name)
+                    labels.append(label)
+                    colors.append(self.get_node_color(label))
+                return idx
+
+            # 解析节点和边（同一条边只保留一次）；逐行流式读取，不生成整份代码的行列表
+            seen_edges = set()
+
+            for line in io.StringIO(mermaid_code):
                 line = line.strip()
                 if not line or line.startswith('graph') or line.startswith('flowchart'):
                     continue
 
                 # 解析边: A --> B 或 A["label"] --> B["label"]
-                edge_pattern = r'(\w+)(?:\[\"([^\"]+)\"\])?\s*-->\s*(\w+)(?:\[\"([^\"]+)\"\])?'
-                edge_match = re.match(edge_pattern, line)
+                edge_match = _MERMAID_EDGE_RE.match(line)
 
                 if edge_match:
                     from_node = edge_match.group(1)
@@ -5918,36 +7224,37 @@ class MCUAnalyzerGUI:
                     to_label = edge_match.group(4) or to_node
 
                     # 添加节点
-                    if from_node not in graph_data['nodes']:
-                        graph_data['nodes'][from_node] = {
-                            'label': from_label,
-                            'color': self.get_node_color(from_label)
-                        }
-
-                    if to_node not in graph_data['nodes']:
-                        graph_data['nodes'][to_node] = {
-                            'label': to_label,
-                            'color': self.get_node_color(to_label)
-                        }
+                    src = node_index(from_node, from_label)
+                    dst = node_index(to_node, to_label)
 
                     # 添加边
-                    graph_data['edges'].append({
-                        'from': from_node,
-                        'to': to_node
-                    })
+                    edge_key = (src, dst)
+                    if edge_key not in seen_edges:
+                        seen_edges.add(edge_key)
+                        edge_src.append(src)
+                        edge_dst.append(dst)
 
                 # 解析样式定义
-                style_pattern = r'style\s+(\w+)\s+fill:(#[0-9a-fA-F]{6})'
-                style_match = re.match(style_pattern, line)
+                style_match = _MERMAID_STYLE_RE.match(line)
 
                 if style_match:
                     node_id = style_match.group(1)
                     color = style_match.group(2)
-                    if node_id in graph_data['nodes']:
-                        graph_data['nodes'][node_id]['color'] = color
+                    idx = name_to_idx.get(node_id)
+                    if idx is not None:
+                        colors[idx] = color
+
+            self.debug_log("Parsed %s nodes and %s edges", len(names), len(edge_src))
+            if not names:
+                return None
 
-            self.log_message(f"🔧 DEBUG: Parsed {len(graph_data['nodes'])} nodes and {len(graph_data['edges'])} edges")
-            return graph_data if graph_data['nodes'] else None
+            return {
+                'ids': name_to_idx,
+                'names': names,
+                'labels': np.array(labels, dtype=object),
+                'colors': np.array(colors, dtype=object),
+                'edges': (np.array(edge_src, dtype=np.intp), np.array(edge_dst, dtype=np.intp))
+            }
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to parse Mermaid: {e}")
@@ -5955,43 +7262,58 @@ class MCUAnalyzerGUI:
 
     def get_node_color(self, label):
         """根据节点标签确定颜色"""
-        label_lower = label.lower()
-
-        if 'main' in label_lower:
-            return '#e74c3c'  # 红色 - main函数
-        elif any(keyword in label_lower for keyword in ['hal_', 'gpio_', 'uart_', 'spi_', 'i2c_']):
-            return '#27ae60'  # 绿色 - HAL函数
-        elif any(keyword in label_lower for keyword in ['init', 'config', 'setup']):
-            return '#3498db'  # 蓝色 - 初始化函数
-        else:
-            return '#f39c12'  # 橙色 - 其他函数
+        return _node_color(label)
+
+    def probe_render_backends(self):
+        """探测可选渲染后端是否已安装，结果缓存在self._backends；安装新后端后重新调用"""
+        # 清除导入系统的目录缓存，否则进程内刚用pip安装的模块可能仍然找不到
+        importlib.invalidate_caches()
+        self._backends = {name: _module_installed(module) for name, module in _RENDER_BACKEND_MODULES.items()}
+        self._backends['matplotlib'] = MATPLOTLIB_AVAILABLE
+
+    def get_mermaid_html_file(self):
+        """返回当前Mermaid代码对应的HTML临时文件路径
+
+        文件写在本进程私有的临时目录中（mkdtemp，仅当前用户可访问），只复用本次运行自己写出的文件
+        """
+        digest = hashlib.blake2b(
+            f"{_MERMAID_JS_VERSION}\n{self.mermaid_code}".encode('utf-8'), digest_size=8
+        ).hexdigest()
+        html_file = self._mermaid_html_files.get(digest)
+        if html_file is not None and os.path.exists(html_file):
+            return html_file
+
+        if self._mermaid_html_dir is None:
+            self._mermaid_html_dir = tempfile.mkdtemp(prefix="mcu_mermaid_")
+        html_file = os.path.join(self._mermaid_html_dir, f"mermaid_{digest}.html")
+        Path(html_file).write_text(self.create_mermaid_html_content(), encoding='utf-8')
+        self._mermaid_html_files[digest] = html_file
+        return html_file
 
     def try_pywebview_internal(self):
         """使用pywebview在tkinter内部渲染Mermaid - 必须成功"""
+        if not self._backends['webview']:
+            self.log_message("🔧 DEBUG: pywebview not available (cached probe)")
+            self.try_install_pywebview()
+            return False
+
         try:
             import webview
             import threading
-            import tempfile
             import os
 
-            self.log_message("🔧 DEBUG: Starting pywebview internal rendering - MUST SUCCEED")
-
-            # 创建HTML内容
-            html_content = self.create_mermaid_html_content()
-
-            # 保存HTML到临时文件
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8') as f:
-                f.write(html_content)
-                temp_file = f.name
-
-            self.log_message(f"🔧 DEBUG: HTML file created: {temp_file}")
+            self.debug_log("Starting pywebview internal rendering - MUST SUCCEED")
 
-            # 清理现有内容
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            # 按Mermaid代码内容复用HTML临时文件，代码未变化时不重新生成和写入
+            temp_file = self.get_mermaid_html_file()
+
+            self.debug_log("HTML file ready: %s", temp_file)
+
+            # 复用常驻宿主Frame，只替换其中的内容
+            host = self._preview_host()
 
             # 创建webview容器
-            webview_frame = ttk.Frame(self.graph_preview_frame)
+            webview_frame = ttk.Frame(host)
             webview_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
             # 状态标签
@@ -6005,7 +7327,7 @@ class MCUAnalyzerGUI:
             # 创建webview窗口的函数
             def create_embedded_webview():
                 try:
-                    self.log_message("🔧 DEBUG: Creating webview window...")
+                    self.debug_log("Creating webview window...")
 
                     # 创建webview窗口
                     window = webview.create_window(
@@ -6020,7 +7342,7 @@ class MCUAnalyzerGUI:
                         maximizable=True
                     )
 
-                    self.log_message("🔧 DEBUG: Starting webview...")
+                    self.debug_log("Starting webview...")
                     # 启动webview - 这会创建一个独立窗口但与主程序集成
                     webview.start(debug=False, private_mode=False)
 
@@ -6056,13 +7378,13 @@ class MCUAnalyzerGUI:
             self.root.after(2000, update_status)
 
             # 更新全局状态
-            if hasattr(self, 'graph_status_label'):
+            if self.graph_status_label is not None:
                 try:
                     self.graph_status_label.config(text="✅ Mermaid图形已在UI内部渲染")
                 except tk.TclError:
                     pass
 
-            self.log_message("🔧 DEBUG: pywebview internal rendering initiated successfully")
+            self.debug_log("pywebview internal rendering initiated successfully")
             return True
 
         except ImportError as e:
@@ -6082,13 +7404,12 @@ class MCUAnalyzerGUI:
             import subprocess
             import sys
 
-            self.log_message("🔧 DEBUG: Attempting to install pywebview...")
+            self.debug_log("Attempting to install pywebview...")
 
-            # 在UI中显示安装提示
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            # 在UI中显示安装提示（复用常驻宿主Frame）
+            host = self._preview_host()
 
-            install_frame = ttk.Frame(self.graph_preview_frame)
+            install_frame = ttk.Frame(host)
             install_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
 
             title_label = ttk.Label(
@@ -6113,10 +7434,11 @@ class MCUAnalyzerGUI:
 
                     result = subprocess.run([
                         sys.executable, "-m", "pip", "install", "pywebview"
-                    ], capture_output=True, text=True)
+                    ], capture_output=True, text=True, **_SUBPROC_KWARGS)
 
                     if result.returncode == 0:
                         status_text.insert(tk.END, "✅ pywebview安装成功！\n")
+                        self.probe_render_backends()
                         status_text.insert(tk.END, "请重新点击流程图按钮\n")
                     else:
                         status_text.insert(tk.END, f"❌ 安装失败: {result.stderr}\n")
@@ -6133,18 +7455,21 @@ class MCUAnalyzerGUI:
 
     def try_cefpython_internal(self):
         """尝试使用cefpython在tkinter中嵌入浏览器 - 纯内部模式"""
+        if not self._backends['cef']:
+            self.log_message("🔧 DEBUG: cefpython3 not available (cached probe)")
+            self.try_install_cefpython()
+            return False
+
         try:
             from cefpython3 import cefpython as cef
-            import sys
 
-            self.log_message("🔧 DEBUG: Trying CEFPython internal rendering - MUST SUCCEED")
+            self.debug_log("Trying CEFPython internal rendering - MUST SUCCEED")
 
-            # 清理现有内容
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            # 复用常驻宿主Frame，只替换其中的内容
+            host = self._preview_host()
 
             # 创建CEF容器
-            cef_frame = ttk.Frame(self.graph_preview_frame)
+            cef_frame = ttk.Frame(host)
             cef_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
             # 状态标签
@@ -6155,30 +7480,14 @@ class MCUAnalyzerGUI:
             )
             status_label.pack(pady=20)
 
-            # 创建HTML内容
-            html_content = self.create_mermaid_html_content()
-
-            # CEF设置
-            settings = {
-                "multi_threaded_message_loop": False,
-                "auto_zooming": "system_dpi",
-                "log_severity": cef.LOGSEVERITY_INFO,
-                "log_file": "",
-            }
+            # 创建HTML内容（mermaid.js由请求拦截从内存提供，不内联进data URL）
+            html_content = self.create_mermaid_html_content(external_mermaid_js=True)
 
-            # 初始化CEF
-            sys.excepthook = cef.ExceptHook
-            cef.Initialize(settings)
+            # 初始化CEF（进程内只初始化一次）
+            self.ensure_cef_initialized(cef)
 
             # 创建浏览器窗口 - 嵌入到tkinter中
-            window_info = cef.WindowInfo()
-            window_info.SetAsChild(cef_frame.winfo_id(), [0, 0, 800, 600])
-
-            # 创建浏览器
-            browser = cef.CreateBrowserSync(
-                window_info,
-                url=cef.GetDataUrl(html_content)
-            )
+            browser = self.create_cef_mermaid_browser(cef, cef_frame, html_content)
 
             # 更新状态
             status_label.config(
@@ -6187,20 +7496,16 @@ class MCUAnalyzerGUI:
             )
 
             # 更新全局状态
-            if hasattr(self, 'graph_status_label'):
+            if self.graph_status_label is not None:
                 try:
                     self.graph_status_label.config(text="✅ Mermaid图形已在UI内部渲染")
                 except tk.TclError:
                     pass
 
-            # 设置消息循环
-            def message_loop():
-                cef.MessageLoopWork()
-                self.root.after(10, message_loop)
+            # 设置消息循环（自适应间隔）
+            self.start_cef_message_pump(cef, browser, cef_frame)
 
-            message_loop()
-
-            self.log_message("🔧 DEBUG: CEFPython internal rendering successful")
+            self.debug_log("CEFPython internal rendering successful")
             return True
 
         except ImportError as e:
@@ -6220,13 +7525,12 @@ class MCUAnalyzerGUI:
             import subprocess
             import sys
 
-            self.log_message("🔧 DEBUG: Attempting to install cefpython3...")
+            self.debug_log("Attempting to install cefpython3...")
 
-            # 在UI中显示安装提示
-            for widget in self.graph_preview_frame.winfo_children():
-                widget.destroy()
+            # 在UI中显示安装提示（复用常驻宿主Frame）
+            host = self._preview_host()
 
-            install_frame = ttk.Frame(self.graph_preview_frame)
+            install_frame = ttk.Frame(host)
             install_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
 
             title_label = ttk.Label(
@@ -6251,10 +7555,11 @@ class MCUAnalyzerGUI:
 
                     result = subprocess.run([
                         sys.executable, "-m", "pip", "install", "cefpython3"
-                    ], capture_output=True, text=True)
+                    ], capture_output=True, text=True, **_SUBPROC_KWARGS)
 
                     if result.returncode == 0:
                         status_text.insert(tk.END, "✅ cefpython3安装成功！\n")
+                        self.probe_render_backends()
                         status_text.insert(tk.END, "请重新点击流程图按钮\n")
                     else:
                         status_text.insert(tk.END, f"❌ 安装失败: {result.stderr}\n")
@@ -6272,7 +7577,7 @@ class MCUAnalyzerGUI:
     def show_mermaid_code_internal(self):
         """在UI内部显示Mermaid代码和工具"""
         try:
-            self.log_message("🔧 DEBUG: Showing Mermaid code internally")
+            self.debug_log("Showing Mermaid code internally")
 
             # 创建主容器
             main_frame = ttk.Frame(self.graph_preview_frame)
@@ -6303,11 +7608,13 @@ class MCUAnalyzerGUI:
                 relief=tk.SOLID,
                 borderwidth=1,
                 padx=15,
-                pady=15
+                pady=15,
+                undo=False,
+                autoseparators=False
             )
             code_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-            # 插入Mermaid代码
+            # 插入Mermaid代码（只读展示，关闭撤销记录，一次插入）
             code_text.insert(tk.END, self.mermaid_code)
             code_text.config(state=tk.DISABLED)
 
@@ -6317,8 +7624,7 @@ class MCUAnalyzerGUI:
 
             # 复制按钮
             def copy_code():
-                self.root.clipboard_clear()
-                self.root.clipboard_append(self.mermaid_code)
+                self.copy_mermaid_code_to_clipboard()
                 copy_btn.config(text="✅ 已复制")
                 self.root.after(2000, lambda: copy_btn.config(text="📋 复制代码"))
 
@@ -6416,68 +7722,22 @@ class MCUAnalyzerGUI:
             help_text.config(state=tk.DISABLED)
 
             # 更新状态
-            if hasattr(self, 'graph_status_label'):
+            if self.graph_status_label is not None:
                 try:
                     self.graph_status_label.config(text="✅ Mermaid代码已在UI内部显示")
                 except tk.TclError:
                     pass
 
-            self.log_message("🔧 DEBUG: Mermaid code internal display successful")
+            self.debug_log("Mermaid code internal display successful")
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to show Mermaid code internally: {e}")
 
-    def try_cefpython_rendering(self):
-        """尝试使用cefpython在tkinter中嵌入浏览器"""
-        try:
-            from cefpython3 import cefpython as cef
-            import threading
-
-            self.log_message("🔧 DEBUG: Trying CEFPython rendering")
-
-            # 创建CEF容器
-            cef_frame = ttk.Frame(self.graph_preview_frame)
-            cef_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-
-            # 创建HTML内容
-            html_content = self.create_mermaid_html_content()
-
-            # CEF设置
-            sys.excepthook = cef.ExceptHook
-            cef.Initialize()
-
-            # 创建浏览器窗口
-            window_info = cef.WindowInfo()
-            window_info.SetAsChild(cef_frame.winfo_id())
-
-            browser = cef.CreateBrowserSync(
-                window_info,
-                url=cef.GetDataUrl(html_content)
-            )
-
-            # 更新状态
-            if hasattr(self, 'graph_status_label'):
-                try:
-                    self.graph_status_label.config(text="✅ Mermaid图形已在UI内部渲染（CEF）")
-                except tk.TclError:
-                    pass
-
-            self.log_message("🔧 DEBUG: CEFPython rendering successful")
-            return True
-
-        except ImportError:
-            self.log_message("🔧 DEBUG: cefpython3 not available")
-            return False
-        except Exception as e:
-            self.log_message(f"🔧 DEBUG: CEFPython rendering failed: {e}")
-            return False
-
-
-
-
-
     def try_tkinter_html_rendering(self):
         """尝试使用tkinter HTML渲染"""
+        if not self._backends['tkhtml']:
+            return False
+
         try:
             # 尝试使用tkinter.html（如果可用）
             from tkinter import html
@@ -6492,13 +7752,13 @@ class MCUAnalyzerGUI:
             html_widget.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
             # 更新状态
-            if hasattr(self, 'graph_status_label'):
+            if self.graph_status_label is not None:
                 try:
                     self.graph_status_label.config(text="✅ Mermaid图形已渲染（HTML）")
                 except tk.TclError:
                     pass
 
-            self.log_message("🔧 DEBUG: tkinter HTML rendering successful")
+            self.debug_log("tkinter HTML rendering successful")
             return True
 
         except ImportError:
@@ -6532,294 +7792,156 @@ class MCUAnalyzerGUI:
                 bg='#f8f9fa',
                 relief=tk.FLAT,
                 padx=10,
-                pady=10
+                pady=10,
+                undo=False,
+                autoseparators=False
             )
             info_text.pack(fill=tk.BOTH, expand=True)
 
-            # 插入Mermaid代码和说明
-            content = "真正的Mermaid流程图渲染\n\n"
-            content += "由于技术限制，当前使用WebView在独立窗口中显示Mermaid图形。\n\n"
-            content += "Mermaid代码：\n"
-
-            info_text.insert(tk.END, content)
+            # 说明、Mermaid代码和使用说明先拼成一个字符串，只调用一次insert
+            parts = [
+                "真正的Mermaid流程图渲染\n\n",
+                "由于技术限制，当前使用WebView在独立窗口中显示Mermaid图形。\n\n",
+                "Mermaid代码：\n",
+            ]
 
             # 安全地插入Mermaid代码
-            if hasattr(self, 'mermaid_code') and self.mermaid_code:
+            if self.mermaid_code:
                 try:
-                    info_text.insert(tk.END, str(self.mermaid_code))
+                    parts.append(str(self.mermaid_code))
                 except Exception as e:
-                    info_text.insert(tk.END, "[Mermaid代码显示错误]")
+                    parts.append("[Mermaid代码显示错误]")
                     self.log_message(f"🔧 DEBUG: Error inserting mermaid code: {e}")
             else:
-                info_text.insert(tk.END, "[暂无Mermaid代码]")
+                parts.append("[暂无Mermaid代码]")
 
             # 继续插入说明
-            usage_content = "\n\n使用说明：\n"
-            usage_content += "1. 上面的Mermaid代码已经在独立窗口中渲染\n"
-            usage_content += "2. 您可以复制代码到支持Mermaid的Markdown编辑器查看\n"
-            usage_content += "3. 或点击'本地渲染'按钮在浏览器中查看\n\n"
-            usage_content += "图例说明：\n"
-            usage_content += "🔴 红色节点: main函数 (程序入口)\n"
-            usage_content += "🟢 绿色节点: HAL/GPIO/UART等接口函数\n"
-            usage_content += "🔵 蓝色节点: 用户自定义函数\n"
-            usage_content += "🟡 黄色节点: 深层调用函数\n"
-
-            info_text.insert(tk.END, usage_content)
+            parts.extend((
+                "\n\n使用说明：\n",
+                "1. 上面的Mermaid代码已经在独立窗口中渲染\n",
+                "2. 您可以复制代码到支持Mermaid的Markdown编辑器查看\n",
+                "3. 或点击'本地渲染'按钮在浏览器中查看\n\n",
+                "图例说明：\n",
+                "🔴 红色节点: main函数 (程序入口)\n",
+                "🟢 绿色节点: HAL/GPIO/UART等接口函数\n",
+                "🔵 蓝色节点: 用户自定义函数\n",
+                "🟡 黄色节点: 深层调用函数\n",
+            ))
+
+            info_text.insert('1.0', ''.join(parts))
             info_text.config(state=tk.DISABLED)
 
             # 更新状态
-            if hasattr(self, 'graph_status_label'):
+            if self.graph_status_label is not None:
                 try:
                     self.graph_status_label.config(text="✅ Mermaid代码已显示")
                 except tk.TclError:
                     pass
 
-            self.log_message("🔧 DEBUG: Mermaid as image rendering completed")
+            self.debug_log("Mermaid as image rendering completed")
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to render Mermaid as image: {e}")
             # 最终降级到Canvas
             self.render_simplified_graph_in_canvas()
 
-    def create_mermaid_html_content(self):
-        """创建包含Mermaid的HTML内容 - 使用本地mermaid.js"""
-        # 获取本地mermaid.js文件
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        mermaid_js_path = os.path.join(script_dir, "assets", "mermaid.min.js")
-
-        mermaid_js_content = ""
-        if os.path.exists(mermaid_js_path):
-            try:
-                with open(mermaid_js_path, 'r', encoding='utf-8') as f:
-                    mermaid_js_content = f.read()
-            except Exception as e:
-                self.log_message(f"🔧 DEBUG: Failed to read local mermaid.js: {e}")
-
-        return f"""<!DOCTYPE html>
-<html>
-<head>
-    <title>STM32 Call Flow Chart - Mermaid (离线版)</title>
-    <meta charset="utf-8">
-    <script>
-{mermaid_js_content}
-    </script>
-    <style>
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            margin: 0;
-            padding: 20px;
-            background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-            min-height: 100vh;
-        }}
-        .container {{
-            background: white;
-            padding: 30px;
-            border-radius: 15px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-            max-width: 100%;
-            margin: 0 auto;
-        }}
-        h1 {{
-            color: #2c3e50;
-            text-align: center;
-            margin-bottom: 30px;
-            font-size: 28px;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-        }}
-        .mermaid {{
-            text-align: center;
-            background: white;
-            padding: 20px;
-            border-radius: 10px;
-            margin: 20px 0;
-            box-shadow: 0 4px 15px rgba(0,0,0,0.05);
-        }}
-        .legend {{
-            margin-top: 30px;
-            padding: 20px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border-radius: 10px;
-            box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-        }}
-        .legend h3 {{
-            margin-top: 0;
-            color: white;
-            text-shadow: 1px 1px 2px rgba(0,0,0,0.3);
-        }}
-        .legend ul {{
-            list-style: none;
-            padding: 0;
-        }}
-        .legend li {{
-            margin: 10px 0;
-            padding: 8px 15px;
-            background: rgba(255,255,255,0.1);
-            border-radius: 5px;
-            backdrop-filter: blur(10px);
-        }}
-        .zoom-controls {{
-            position: fixed;
-            top: 20px;
-            right: 20px;
-            background: white;
-            padding: 10px;
-            border-radius: 8px;
-            box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-            z-index: 1000;
-        }}
-        .zoom-btn {{
-            background: #3498db;
-            color: white;
-            border: none;
-            padding: 8px 12px;
-            margin: 0 2px;
-            border-radius: 4px;
-            cursor: pointer;
-            font-size: 14px;
-        }}
-        .zoom-btn:hover {{
-            background: #2980b9;
-        }}
-    </style>
-</head>
-<body>
-    <div class="zoom-controls">
-        <button class="zoom-btn" onclick="zoomIn()">🔍+</button>
-        <button class="zoom-btn" onclick="zoomOut()">🔍-</button>
-        <button class="zoom-btn" onclick="resetZoom()">↻</button>
-    </div>
-
-    <div class="container">
-        <h1>🔄 STM32项目调用流程图</h1>
-        <div class="mermaid" id="mermaid-diagram">
-{self.mermaid_code}
-        </div>
-
-        <div class="legend">
-            <h3>📖 图例说明</h3>
-            <ul>
-                <li>🔴 <strong>红色节点</strong>: main函数 (程序入口)</li>
-                <li>🟢 <strong>绿色节点</strong>: HAL/GPIO/UART等接口函数</li>
-                <li>🔵 <strong>蓝色节点</strong>: 用户自定义函数</li>
-                <li>🟡 <strong>黄色节点</strong>: 深层调用函数</li>
-            </ul>
-        </div>
-    </div>
+    def create_mermaid_html_content(self, external_mermaid_js=False):
+        """创建包含Mermaid的HTML内容 - 使用本地mermaid.js
 
-    <script>
-        // 初始化Mermaid
-        mermaid.initialize({{
-            startOnLoad: true,
-            theme: 'default',
-            flowchart: {{
-                useMaxWidth: true,
-                htmlLabels: true,
-                curve: 'basis'
-            }},
-            themeVariables: {{
-                primaryColor: '#ff6b6b',
-                primaryTextColor: '#fff',
-                primaryBorderColor: '#e55656',
-                lineColor: '#495057',
-                secondaryColor: '#51cf66',
-                tertiaryColor: '#339af0'
-            }}
-        }});
+        external_mermaid_js为True时通过_CEF_MERMAID_JS_URL引用mermaid.js而不内联（CEF页面使用）
+        """
+        if external_mermaid_js and _MERMAID_JS_EXISTS:
+            mermaid_js_parts = (f'<script src="{_CEF_MERMAID_JS_URL}"></script>',)
+        else:
+            # 获取本地mermaid.js文件
+            mermaid_js_path = _MERMAID_JS_PATH
 
-        // 缩放功能
-        let currentZoom = 1;
-        const diagram = document.getElementById('mermaid-diagram');
+            mermaid_js_content = ""
+            if _MERMAID_JS_EXISTS:
+                try:
+                    mermaid_js_content = _load_mermaid_js(mermaid_js_path)[0]
+                except Exception as e:
+                    self.log_message(f"🔧 DEBUG: Failed to read local mermaid.js: {e}")
+            # 内联的mermaid.js直接作为join的片段，不先拼成中间字符串
+            mermaid_js_parts = ("<script>\n", mermaid_js_content, "\n    </script>")
 
-        function zoomIn() {{
-            currentZoom += 0.1;
-            diagram.style.transform = `scale(${{currentZoom}})`;
-        }}
+        return ''.join((_MERMAID_HTML_PAGE_HEAD, "    ", *mermaid_js_parts, _MERMAID_HTML_PAGE_MIDDLE,
+                        self.mermaid_code, _MERMAID_HTML_PAGE_TAIL))
 
-        function zoomOut() {{
-            currentZoom = Math.max(0.3, currentZoom - 0.1);
-            diagram.style.transform = `scale(${{currentZoom}})`;
-        }}
+    def render_professional_mermaid_in_ui(self):
+        """在UI内部渲染专业级Mermaid样式流程图"""
+        # 计算合适的Canvas大小
+        canvas_width = 1400
+        canvas_height = 1000
 
-        function resetZoom() {{
-            currentZoom = 1;
-            diagram.style.transform = 'scale(1)';
-        }}
+        def build_professional_view():
+            # 创建专业级Canvas容器
+            canvas_container = ttk.Frame(self.graph_preview_frame)
 
-        // 键盘快捷键
-        document.addEventListener('keydown', function(e) {{
-            if (e.ctrlKey) {{
-                if (e.key === '=') {{
-                    e.preventDefault();
-                    zoomIn();
-                }} else if (e.key === '-') {{
-                    e.preventDefault();
-                    zoomOut();
-                }} else if (e.key === '0') {{
-                    e.preventDefault();
-                    resetZoom();
-                }}
-            }}
-        }});
-    </script>
-</body>
-</html>"""
+            # 创建Canvas和滚动条
+            canvas_frame = ttk.Frame(canvas_container)
+            canvas_frame.pack(fill=tk.BOTH, expand=True)
 
-    def render_professional_mermaid_in_ui(self):
-        """在UI内部渲染专业级Mermaid样式流程图"""
-        # 清理现有内容，保留控制按钮
-        widgets_to_keep = []
-        if hasattr(self, 'preview_control_frame'):
-            widgets_to_keep.append(self.preview_control_frame)
+            # 创建Canvas
+            canvas = tk.Canvas(
+                canvas_frame,
+                width=canvas_width,
+                height=canvas_height,
+                bg='#f8f9fa',  # 浅灰背景
+                highlightthickness=0
+            )
+            self._node_items = {}  # 新Canvas上没有可复用的节点图元
+            self._rendered_subtree_hashes = {}
 
-        for widget in self.graph_preview_frame.winfo_children():
-            if widget not in widgets_to_keep:
-                widget.destroy()
+            # 添加滚动条
+            v_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=canvas.yview)
+            h_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=canvas.xview)
 
-        # 创建专业级Canvas容器
-        canvas_container = ttk.Frame(self.graph_preview_frame)
-        canvas_container.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+            # 视图滚动或尺寸变化时刷新可见节点（视口裁剪）
+            def on_yscroll(first, last):
+                v_scrollbar.set(first, last)
+                self.schedule_professional_viewport_refresh()
 
-        # 创建Canvas和滚动条
-        canvas_frame = ttk.Frame(canvas_container)
-        canvas_frame.pack(fill=tk.BOTH, expand=True)
+            def on_xscroll(first, last):
+                h_scrollbar.set(first, last)
+                self.schedule_professional_viewport_refresh()
 
-        # 计算合适的Canvas大小
-        canvas_width = 1400
-        canvas_height = 1000
+            canvas.configure(yscrollcommand=on_yscroll, xscrollcommand=on_xscroll)
+            canvas.bind('<Configure>', lambda e: self.schedule_professional_viewport_refresh())
 
-        # 创建Canvas
-        self.professional_canvas = tk.Canvas(
-            canvas_frame,
-            width=canvas_width,
-            height=canvas_height,
-            bg='#f8f9fa',  # 浅灰背景
-            highlightthickness=0
-        )
+            # 布局
+            canvas.grid(row=0, column=0, sticky="nsew")
+            v_scrollbar.grid(row=0, column=1, sticky="ns")
+            h_scrollbar.grid(row=1, column=0, sticky="ew")
 
-        # 添加滚动条
-        v_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=self.professional_canvas.yview)
-        h_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=self.professional_canvas.xview)
+            canvas_frame.grid_rowconfigure(0, weight=1)
+            canvas_frame.grid_columnconfigure(0, weight=1)
 
-        self.professional_canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+            # Ctrl+=/Ctrl+- 缩放（点击Canvas获得键盘焦点）
+            canvas.bind("<Button-1>", lambda e: canvas.focus_set())
+            canvas.bind("<Control-equal>", lambda e: self.zoom_in_canvas())
+            canvas.bind("<Control-plus>", lambda e: self.zoom_in_canvas())
+            canvas.bind("<Control-minus>", lambda e: self.zoom_out_canvas())
 
-        # 布局
-        self.professional_canvas.grid(row=0, column=0, sticky="nsew")
-        v_scrollbar.grid(row=0, column=1, sticky="ns")
-        h_scrollbar.grid(row=1, column=0, sticky="ew")
+            return {
+                'frame': canvas_container,
+                'pack': {'fill': tk.BOTH, 'expand': True, 'padx': 5, 'pady': 5},
+                'canvas': canvas,
+            }
 
-        canvas_frame.grid_rowconfigure(0, weight=1)
-        canvas_frame.grid_columnconfigure(0, weight=1)
+        # Canvas和滚动条只创建一次，之后重绘只更新Canvas中的图元
+        view = self._show_preview_view('professional_flowchart', build_professional_view)
+        self.professional_canvas = view['canvas']
 
         # 渲染专业级流程图
         self.draw_professional_mermaid_flowchart(self.professional_canvas, canvas_width, canvas_height)
 
         # 更新滚动区域
         self.professional_canvas.update_idletasks()
-        self.professional_canvas.configure(scrollregion=self.professional_canvas.bbox("all"))
+        self.professional_canvas.configure(scrollregion=self.professional_scrollregion(self.professional_canvas))
 
         # 更新状态
-        if hasattr(self, 'graph_status_label'):
+        if self.graph_status_label is not None:
             try:
                 self.graph_status_label.config(text="✅ 专业级Mermaid流程图已渲染")
             except tk.TclError:
@@ -6848,12 +7970,14 @@ class MCUAnalyzerGUI:
             if os.path.exists(self.config_file):
                 with open(self.config_file, 'r', encoding='utf-8') as f:
                     config = json.load(f)
+                if isinstance(config, dict):
+                    self._config_cache = config
 
                 # 加载上次的项目路径
                 last_project_path = config.get('last_project_path', '')
                 if last_project_path and os.path.exists(last_project_path):
                     self.project_path_var.set(last_project_path)
-                    self.log_message(f"🔧 DEBUG: Loaded last project path: {last_project_path}")
+                    self.debug_log("Loaded last project path: %s", last_project_path)
 
                     # 自动设置输出路径
                     if not self.output_path_var.get():
@@ -6869,120 +7993,192 @@ class MCUAnalyzerGUI:
             self.log_message(f"🔧 DEBUG: Failed to load config: {e}")
 
     def save_current_config(self):
-        """保存当前配置"""
-        try:
-            config = {
-                'last_project_path': self.project_path_var.get().strip(),
-                'last_output_path': self.output_path_var.get().strip(),
-                'saved_time': datetime.now().isoformat()
-            }
-
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+        """保存当前配置（延迟合并写入，见flush_config）"""
+        self._config_cache.update({
+            'last_project_path': self.project_path_var.get().strip(),
+            'last_output_path': self.output_path_var.get().strip(),
+            'saved_time': datetime.now().isoformat()
+        })
+        self.mark_config_dirty()
 
-            self.log_message(f"🔧 DEBUG: Config saved to: {self.config_file}")
+    def save_last_project_path(self, project_path):
+        """保存最后使用的项目路径（延迟合并写入，见flush_config）"""
+        self._config_cache['project_path'] = project_path
+        self.mark_config_dirty()
+
+    def mark_config_dirty(self):
+        """标记配置已修改，安排在_CONFIG_FLUSH_DELAY_MS后写入配置文件；已有待执行的写入时不重复安排"""
+        self._config_dirty = True
+        if self._config_flush_after_id is None:
+            self._config_flush_after_id = self.root.after(_CONFIG_FLUSH_DELAY_MS, self.flush_config)
+
+    def flush_config(self):
+        """把配置的内存副本一次写入配置文件（不再先读回文件）"""
+        if self._config_flush_after_id is not None:
+            try:
+                self.root.after_cancel(self._config_flush_after_id)
+            except tk.TclError:
+                pass
+            self._config_flush_after_id = None
 
-        except Exception as e:
-            self.log_message(f"🔧 DEBUG: Failed to save config: {e}")
+        if not self._config_dirty:
+            return
 
-    def save_last_project_path(self, project_path):
-        """保存最后使用的项目路径"""
         try:
-            config = {}
-            # 尝试读取现有配置
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
+            self._config_dirty = False
+            with open(self.config_file, 'w', encoding='utf-8') as f:
+                json.dump(self._config_cache, f, ensure_ascii=False, indent=2)
 
-            # 更新项目路径
-            config['project_path'] = project_path
+            self.debug_log("Config saved to: %s", self.config_file)
 
-            # 保存配置
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
-            self.log_message(f"🔧 DEBUG: Last project path saved: {project_path}")
         except Exception as e:
-            self.log_message(f"🔧 DEBUG: Failed to save last project path: {e}")
+            self._config_dirty = True  # 写入失败，下次写入时重试
+            self.log_message(f"🔧 DEBUG: Failed to save config: {e}")
 
     def draw_professional_mermaid_flowchart(self, canvas, canvas_width, canvas_height):
-        """绘制专业级Mermaid样式流程图"""
-        if not hasattr(self, 'call_graph') or not self.call_graph:
-            self.draw_no_data_message(canvas, canvas_width, canvas_height)
-            return
-
-        call_tree = self.call_graph.get('call_tree')
+        """绘制专业级Mermaid样式流程图
+
+        图例每次重画；连接线和节点只重画子树哈希有变化的部分（见draw_professional_connections），
+        节点图元按函数名缓存在self._node_items中，再次绘制时只更新坐标和属性。
+        所有节点带"nodes"标签，连接线带"edges"标签
+        """
+        canvas.delete("legend", "placeholder")
+        if self._professional_zoom != 1.0:
+            # 缩放过的图元坐标不再对应布局坐标，不能按子树哈希复用
+            self._rendered_subtree_hashes = {}
+        if not self._rendered_subtree_hashes:
+            canvas.delete("edges")
+        self._professional_zoom = 1.0  # 节点按布局坐标重新定位，缩放随之复位
+
+        call_tree = self.call_graph.get('call_tree') if self.call_graph else None
         if not call_tree:
+            canvas.delete("nodes", "edges")
+            self._node_items = {}
+            self._rendered_subtree_hashes = {}
+            self._professional_node_layer = None
+            self._professional_layer_nodes = None
+            self._professional_layout = None
             self.draw_no_data_message(canvas, canvas_width, canvas_height)
             return
 
-        # 专业级样式配置
-        self.mermaid_style = {
-            'main_node': {
-                'fill': '#ff6b6b',
-                'stroke': '#e55656',
-                'text_color': 'white',
-                'shadow': True,
-                'gradient': True
-            },
-            'interface_node': {
-                'fill': '#51cf66',
-                'stroke': '#40c057',
-                'text_color': 'white',
-                'shadow': True,
-                'gradient': True
-            },
-            'user_node': {
-                'fill': '#339af0',
-                'stroke': '#228be6',
-                'text_color': 'white',
-                'shadow': True,
-                'gradient': True
-            },
-            'connection': {
-                'stroke': '#495057',
-                'width': 2,
-                'arrow_size': 8
-            }
-        }
-
-        # 计算布局
-        layout = self.calculate_professional_layout(call_tree, canvas_width, canvas_height)
+        # 计算布局（同一份call_graph和画布尺寸复用已算好的布局）
+        layout_key = (self._call_graph_sig, canvas_width, canvas_height)
+        layout = self._layout_cache.get(layout_key) if self._call_graph_sig is not None else None
+        if layout is None:
+            layout = self.calculate_professional_layout(call_tree, canvas_width, canvas_height)
+            if self._call_graph_sig is not None:
+                self._layout_cache[layout_key] = layout
+                if len(self._layout_cache) > 8:
+                    self._layout_cache.popitem(last=False)
+        else:
+            self._layout_cache.move_to_end(layout_key)
 
-        # 绘制连接线（先绘制，避免覆盖节点）
-        self.draw_professional_connections(canvas, layout)
+        # 绘制连接线（返回子树哈希有变化的函数名）
+        dirty = self.draw_professional_connections(canvas, layout)
 
         # 绘制节点
-        self.draw_professional_nodes(canvas, layout)
+        self.draw_professional_nodes(canvas, layout, dirty)
+
+        # 连接线放到最底层，避免覆盖（可能是复用的）节点
+        canvas.tag_lower("edges")
 
         # 绘制图例
         self.draw_professional_legend(canvas, canvas_width, canvas_height)
 
+        self._professional_canvas_size = (canvas_width, canvas_height)
+
+    def zoom_in_canvas(self):
+        """放大专业级流程图"""
+        self.zoom_professional_canvas(1.1)
+
+    def zoom_out_canvas(self):
+        """缩小专业级流程图"""
+        self.zoom_professional_canvas(1 / 1.1)
+
+    def zoom_professional_canvas(self, factor):
+        """用Canvas.scale()就地缩放所有图元坐标，不重新布局和创建图元；节点文字按基准字号同步缩放"""
+        canvas = self.professional_canvas
+        if canvas is None:
+            return
+
+        try:
+            zoom = self._professional_zoom * factor
+            if not 0.2 <= zoom <= 5.0:
+                return
+            self._professional_zoom = zoom
+
+            canvas.scale("all", 0, 0, factor, factor)
+
+            # 图例的圆角贴图和字号不随坐标缩放，按新倍数重画
+            if self._professional_layout is not None:
+                canvas.delete("legend")
+                self.draw_professional_legend(canvas, *self._professional_canvas_size, zoom)
+
+            # 位图不随坐标缩放，按新倍数重画节点位图层；放大后位图过大时改用多边形（缩小后再恢复位图）
+            if self._professional_layer_nodes:
+                baked = self.render_professional_node_layer(canvas, self._professional_layer_nodes, zoom)
+                self._professional_items_per_node = 1 if baked else 3
+
+            # 字号和文字换行宽度不随坐标缩放，逐个文本图元更新
+            for func_name, items in self._node_items.items():
+                text_id = items[-1]
+                font_size = max(1, round(self.professional_node_font_size(func_name) * zoom))
+                wrap_width = float(canvas.itemcget(text_id, 'width')) * factor
+                canvas.itemconfig(text_id, font=("Microsoft YaHei", font_size, "bold"), width=wrap_width)
+
+            canvas.configure(scrollregion=self.professional_scrollregion(canvas))
+            # 缩放后可见的布局范围变了，补建/删除节点图元
+            self.refresh_professional_viewport()
+        except tk.TclError:
+            pass  # Canvas已销毁
+
     def draw_no_data_message(self, canvas, canvas_width, canvas_height):
         """绘制无数据提示"""
         # 背景
         canvas.create_rectangle(
             canvas_width//2 - 200, canvas_height//2 - 100,
             canvas_width//2 + 200, canvas_height//2 + 100,
-            fill='#f8f9fa', outline='#dee2e6', width=2
+            fill='#f8f9fa', outline='#dee2e6', width=2, tags="placeholder"
         )
 
         # 图标
         canvas.create_text(
             canvas_width//2, canvas_height//2 - 40,
-            text="📊", font=("Arial", 32), fill='#6c757d'
+            text="📊", font=("Arial", 32), fill='#6c757d', tags="placeholder"
         )
 
         # 文本
         canvas.create_text(
             canvas_width//2, canvas_height//2,
-            text="暂无调用关系数据", font=("Microsoft YaHei", 16, "bold"), fill='#495057'
+            text="暂无调用关系数据", font=("Microsoft YaHei", 16, "bold"), fill='#495057', tags="placeholder"
         )
 
         canvas.create_text(
             canvas_width//2, canvas_height//2 + 30,
-            text="请先运行代码分析", font=("Microsoft YaHei", 12), fill='#6c757d'
+            text="请先运行代码分析", font=("Microsoft YaHei", 12), fill='#6c757d', tags="placeholder"
         )
 
+    def measure_node_text(self, text, size):
+        """节点文本在给定字号下（粗体Microsoft YaHei）的像素宽度，按(文本, 字号)缓存"""
+        key = (text, size)
+        width = self._measure_cache.get(key)
+        if width is None:
+            font = self._font_cache.get(size)
+            if font is None:
+                import tkinter.font as tkFont
+                font = tkFont.Font(root=self.root, family="Microsoft YaHei", size=size, weight="bold")
+                self._font_cache[size] = font
+            width = font.measure(text)
+            self._measure_cache[key] = width
+        return width
+
+    def professional_node_font_size(self, func_name):
+        """专业级流程图节点文本的基准字号：节点最大宽度内能单行放下的最大字号，都放不下时用最小字号（换行）"""
+        for size in _PROFESSIONAL_NODE_FONT_SIZES:
+            if self.measure_node_text(func_name, size) + _PROFESSIONAL_NODE_TEXT_PADDING <= _PROFESSIONAL_NODE_MAX_WIDTH:
+                return size
+        return _PROFESSIONAL_NODE_FONT_SIZES[-1]
+
     def calculate_professional_layout(self, call_tree, canvas_width, canvas_height):
         """计算专业级布局"""
         layout = {}
@@ -6994,40 +8190,49 @@ class MCUAnalyzerGUI:
         level_height = 120
         min_spacing = 60
 
-        def calculate_tree_width(node, level=0):
-            """递归计算树的宽度"""
-            if not node:
-                return 0
-
-            children = node.get('children', [])
-            if not children:
-                return base_node_width + min_spacing
-
-            total_width = 0
-            for child in children:
-                total_width += calculate_tree_width(child, level + 1)
+        # 子树宽度按节点对象缓存：定位时对每个子节点的查询不再重新遍历整棵子树
+        tree_widths = {}
 
-            return max(base_node_width + min_spacing, total_width)
-
-        def position_nodes(node, x, y, level=0, parent_x=None):
-            """递归定位节点"""
+        def calculate_tree_width(node):
+            """计算树的宽度（显式栈后序遍历，深调用链不受递归深度限制）"""
             if not node:
-                return x
+                return 0
 
+            stack = [(node, False)]
+            while stack:
+                current, children_done = stack.pop()
+                key = id(current)
+                if key in tree_widths:
+                    continue
+                children = [child for child in current.get('children', []) if child]
+                if children and not children_done:
+                    # 子节点先出栈计算，之后再回到当前节点求和
+                    stack.append((current, True))
+                    stack.extend((child, False) for child in children)
+                    continue
+                total_width = sum(tree_widths[id(child)] for child in children)
+                tree_widths[key] = max(base_node_width + min_spacing, total_width)
+            return tree_widths[id(node)]
+
+        def position_nodes(root, start_x, start_y):
+            """定位所有节点（显式栈先序遍历，访问顺序与递归版本相同）"""
+            stack = [(root, start_x, start_y, 0, None)] if root else []
+            while stack:
+                node, x, y, level, parent_x = stack.pop()
+                position_node(node, x, y, level, parent_x, stack)
+
+        def position_node(node, x, y, level, parent_x, stack):
+            """定位单个节点，并把子节点按从左到右的顺序压栈"""
             func_name = node['name']
 
-            # 计算节点宽度（根据文本长度调整）
-            text_length = len(func_name)
-            node_width = max(base_node_width, min(base_node_width * 1.8, text_length * 10 + 40))
+            # 计算节点宽度（按实际字体测得的文本宽度调整）
+            text_width = self.measure_node_text(func_name, self.professional_node_font_size(func_name))
+            node_width = max(base_node_width,
+                             min(_PROFESSIONAL_NODE_MAX_WIDTH, text_width + _PROFESSIONAL_NODE_TEXT_PADDING))
             node_height = base_node_height
 
             # 确定节点类型和样式
-            if func_name == 'main':
-                node_type = 'main_node'
-            elif func_name.startswith(('HAL_', 'GPIO_', 'UART_', 'SPI_', 'I2C_', 'TIM_', 'ADC_', 'DMA_')):
-                node_type = 'interface_node'
-            else:
-                node_type = 'user_node'
+            node_type = _professional_node_type(func_name)
 
             # 存储节点信息
             node_positions[func_name] = {
@@ -7044,21 +8249,23 @@ class MCUAnalyzerGUI:
             children = node.get('children', [])
             if children:
                 # 计算子节点总宽度
-                total_child_width = sum(calculate_tree_width(child, level + 1) for child in children)
+                child_widths = [calculate_tree_width(child) for child in children]
+                total_child_width = sum(child_widths)
 
                 # 计算起始位置（居中对齐）
                 child_start_x = x + node_width/2 - total_child_width/2
                 current_x = child_start_x
 
-                for child in children:
-                    child_width = calculate_tree_width(child, level + 1)
-                    child_x = current_x + child_width/2 - base_node_width/2
-                    child_y = y + level_height
-
-                    position_nodes(child, child_x, child_y, level + 1, x + node_width/2)
+                pending = []
+                for child, child_width in zip(children, child_widths):
+                    if child:
+                        child_x = current_x + child_width/2 - base_node_width/2
+                        child_y = y + level_height
+                        pending.append((child, child_x, child_y, level + 1, x + node_width/2))
                     current_x += child_width
 
-            return x + node_width + min_spacing
+                # 逆序压栈，保证最左侧的子节点最先出栈
+                stack.extend(reversed(pending))
 
         # 计算起始位置
         tree_width = calculate_tree_width(call_tree)
@@ -7068,173 +8275,355 @@ class MCUAnalyzerGUI:
         # 定位所有节点
         position_nodes(call_tree, start_x, start_y)
 
+        # 子树哈希（后序遍历）：节点自身的位置、尺寸、类型与各子树哈希的组合。
+        # 同一函数在树中多处出现时合并各处的哈希，任一处变化都会改变该函数的subtree_hash
+        subtree_hashes = {}
+        stack = [(call_tree, False)] if call_tree else []
+        while stack:
+            node, children_done = stack.pop()
+            children = [child for child in node.get('children', []) if child]
+            if children and not children_done:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children)
+                continue
+            info = node_positions[node['name']]
+            node_hash = hash((node['name'], info['x'], info['y'], info['width'], info['height'], info['type'],
+                              tuple(subtree_hashes[id(child)] for child in children)))
+            subtree_hashes[id(node)] = node_hash
+            info['subtree_hash'] = hash((info.get('subtree_hash'), node_hash))
+
         layout['nodes'] = node_positions
         layout['tree'] = call_tree
 
         return layout
 
-    def draw_professional_nodes(self, canvas, layout):
-        """绘制专业级节点"""
-        nodes = layout['nodes']
-
-        for func_name, node_info in nodes.items():
-            x, y = node_info['x'], node_info['y']
-            width, height = node_info['width'], node_info['height']
-            node_type = node_info['type']
-            style = self.mermaid_style[node_type]
-
-            # 绘制阴影（如果启用）
-            if style.get('shadow', False):
-                shadow_offset = 4
-                canvas.create_rounded_rectangle(
-                    x + shadow_offset, y + shadow_offset,
-                    x + width + shadow_offset, y + height + shadow_offset,
-                    radius=8, fill='#00000020', outline=''
-                )
+    def draw_professional_nodes(self, canvas, layout, dirty):
+        """绘制专业级节点，已存在的节点中只更新dirty（子树哈希有变化）的节点
 
-            # 绘制主节点
-            if style.get('gradient', False):
-                # 模拟渐变效果
-                self.draw_gradient_rectangle(canvas, x, y, width, height, style['fill'], style['stroke'])
-            else:
-                canvas.create_rounded_rectangle(
-                    x, y, x + width, y + height,
-                    radius=8, fill=style['fill'], outline=style['stroke'], width=2
-                )
+        所有节点的阴影和节点体优先一次性画到一张位图上（见render_professional_node_layer），
+        每个节点只剩一个文本图元；PIL不可用时退回每节点阴影、节点体、文本三个图元。
+        节点图元只为可见区域附近的节点创建（见refresh_professional_viewport）
+        """
+        nodes = layout['nodes']
+        baked = self.render_professional_node_layer(canvas, nodes)
+        self._professional_items_per_node = 1 if baked else 3
+        self._professional_layout = layout
+        self.refresh_professional_viewport(update=dirty)
+
+    def professional_view_region(self, canvas, margin):
+        """当前可见区域换算回布局坐标（四周各扩展margin），返回(x0, y0, x1, y1)"""
+        width = canvas.winfo_width()
+        height = canvas.winfo_height()
+        if width <= 1 or height <= 1:
+            # 尚未显示时按Canvas请求的尺寸估算
+            width = int(canvas.cget('width'))
+            height = int(canvas.cget('height'))
+        zoom = self._professional_zoom
+        return (canvas.canvasx(0) / zoom - margin, canvas.canvasy(0) / zoom - margin,
+                canvas.canvasx(width) / zoom + margin, canvas.canvasy(height) / zoom + margin)
+
+    def schedule_professional_viewport_refresh(self):
+        """滚动/尺寸变化后在空闲时刷新一次可见节点（同一轮事件中的多次请求合并）"""
+        if self._viewport_refresh_id is None:
+            def run():
+                self._viewport_refresh_id = None
+                self.refresh_professional_viewport()
+            self._viewport_refresh_id = self.root.after_idle(run)
+
+    def refresh_professional_viewport(self, update=()):
+        """视口裁剪：只为可见区域附近的节点保留图元
+
+        进入可见区域（外扩_VIEWPORT_CREATE_MARGIN）的节点补建图元，离开较大范围
+        （外扩_VIEWPORT_KEEP_MARGIN）的节点删除图元，两者之间的不动，避免慢速滚动时反复增删。
+        update为需要就地更新位置和样式的函数名集合（重新布局后子树哈希变化的节点）
+        """
+        canvas = self.professional_canvas
+        layout = self._professional_layout
+        if canvas is None or layout is None:
+            return
 
-            # 绘制文本
-            text_x = x + width // 2
-            text_y = y + height // 2
+        try:
+            nodes = layout['nodes']
+            node_items = self._node_items
+            items_per_node = self._professional_items_per_node
+
+            def intersecting(region):
+                x0, y0, x1, y1 = region
+                return {name for name, info in nodes.items()
+                        if info['x'] + info['width'] >= x0 and info['x'] <= x1
+                        and info['y'] + info['height'] >= y0 and info['y'] <= y1}
+
+            visible = intersecting(self.professional_view_region(canvas, _VIEWPORT_CREATE_MARGIN))
+            keep = intersecting(self.professional_view_region(canvas, _VIEWPORT_KEEP_MARGIN))
+
+            # 删除已离开保留范围（含不在本次布局中）或图元结构与当前绘制方式不符的节点
+            for func_name in [name for name, items in node_items.items()
+                              if name not in keep or len(items) != items_per_node]:
+                canvas.delete(*node_items.pop(func_name))
+
+            for func_name in node_items.keys() & update:
+                self.place_professional_node(canvas, func_name, nodes[func_name])
+            new_names = visible - node_items.keys()
+            if new_names:
+                self.emit_professional_nodes(canvas, [(name, nodes[name]) for name in new_names])
+        except tk.TclError:
+            pass  # Canvas已销毁
+
+    def professional_node_geometry(self, func_name, node_info):
+        """按当前缩放计算单个节点的文本位置、字体和（多边形绘制时的）阴影/节点体顶点"""
+        zoom = self._professional_zoom
+        x, y = node_info['x'] * zoom, node_info['y'] * zoom
+        width, height = node_info['width'] * zoom, node_info['height'] * zoom
+        geometry = {
+            # 文本居中，基准字号见professional_node_font_size，按当前缩放倍数换算
+            'text_pos': (x + width // 2, y + height // 2),
+            'font': ("Microsoft YaHei", max(1, round(self.professional_node_font_size(func_name) * zoom)), "bold"),
+            'wrap_width': width - 10 * zoom,
+        }
+        if self._professional_items_per_node == 3:
+            shadow_offset = 4 * zoom
+            radius = 8 * zoom
+            geometry['shadow_points'] = _rounded_rect_points(
+                x + shadow_offset, y + shadow_offset,
+                x + width + shadow_offset, y + height + shadow_offset, radius)
+            geometry['body_points'] = _rounded_rect_points(x, y, x + width, y + height, radius)
+        return geometry
+
+    def place_professional_node(self, canvas, func_name, node_info):
+        """按当前缩放更新单个已存在节点的图元位置和样式"""
+        items = self._node_items[func_name]
+        geometry = self.professional_node_geometry(func_name, node_info)
+        style = self.mermaid_style[node_info['type']]
+
+        text_id = items[-1]
+        canvas.coords(text_id, *geometry['text_pos'])
+        canvas.itemconfig(text_id, font=geometry['font'], fill=style['text_color'],
+                          width=geometry['wrap_width'])
+
+        if len(items) == 3:
+            shadow_id, body_id, _ = items
+            canvas.coords(shadow_id, *geometry['shadow_points'])
+            canvas.itemconfig(shadow_id, state=tk.NORMAL if style.get('shadow', False) else tk.HIDDEN)
+            canvas.coords(body_id, *geometry['body_points'])
+            canvas.itemconfig(body_id, fill=style['fill'], outline=style['stroke'])
+
+    def emit_professional_nodes(self, canvas, entries):
+        """批量创建节点图元（entries为[(func_name, node_info), ...]）
+
+        先计算所有节点的几何信息，再按层依次创建：所有阴影（"shadow"标签）、所有节点体
+        （"body"标签）、所有文本（"text"标签）。层次关系靠标签整体调整，不再逐个节点tag_raise
+        """
+        polygons = self._professional_items_per_node == 3
+        shadows = []
+        bodies = []
+        texts = []
+        for func_name, node_info in entries:
+            geometry = self.professional_node_geometry(func_name, node_info)
+            style = self.mermaid_style[node_info['type']]
+            texts.append((func_name, geometry, style))
+            if polygons:
+                shadows.append((geometry['shadow_points'], style.get('shadow', False)))
+                bodies.append((geometry['body_points'], style))
+
+        # Tk颜色不支持透明度，阴影用实色浅灰
+        shadow_ids = [canvas.create_polygon(points, smooth=True, fill='#ced4da', outline='',
+                                            state=tk.NORMAL if shadow else tk.HIDDEN,
+                                            tags=("nodes", "shadow"))
+                      for points, shadow in shadows]
+        body_ids = [canvas.create_polygon(points, smooth=True, fill=style['fill'], outline=style['stroke'],
+                                          width=2, tags=("nodes", "body"))
+                    for points, style in bodies]
+        text_ids = [canvas.create_text(*geometry['text_pos'], text=func_name, font=geometry['font'],
+                                       fill=style['text_color'], width=geometry['wrap_width'],
+                                       tags=("nodes", "text"))
+                    for func_name, geometry, style in texts]
+
+        if polygons:
+            # 新建的阴影/节点体可能落在已有节点的文本之上，按层整体归位
+            canvas.tag_raise("body", "shadow")
+            canvas.tag_raise("text", "body")
+            for (func_name, _), shadow_id, body_id, text_id in zip(entries, shadow_ids, body_ids, text_ids):
+                self._node_items[func_name] = (shadow_id, body_id, text_id)
+        else:
+            for (func_name, _), text_id in zip(entries, text_ids):
+                self._node_items[func_name] = (text_id,)
+        # 图例始终在最上层
+        canvas.tag_raise("legend")
+
+    def professional_scrollregion(self, canvas):
+        """滚动区域：现有图元与完整布局范围（按当前缩放）的并集，未创建图元的节点也能滚动到"""
+        x0, y0, x1, y1 = canvas.bbox("all") or (0, 0, 0, 0)
+        layout = self._professional_layout
+        if layout and layout['nodes']:
+            zoom = self._professional_zoom
+            nodes = layout['nodes'].values()
+            x0 = min(x0, min(info['x'] for info in nodes) * zoom)
+            y0 = min(y0, min(info['y'] for info in nodes) * zoom)
+            x1 = max(x1, max(info['x'] + info['width'] for info in nodes) * zoom)
+            y1 = max(y1, max(info['y'] + info['height'] for info in nodes) * zoom)
+        return (x0, y0, x1, y1)
+
+    def render_professional_node_layer(self, canvas, nodes, zoom=1.0):
+        """把所有节点的阴影和节点体画到一张PIL位图上，以单个图像图元（"node_layer"标签）显示
+
+        zoom为当前缩放倍数（布局坐标 * zoom = Canvas坐标）。成功返回True，PIL不可用或位图超过
+        _FLOWCHART_BITMAP_MAX_PIXELS时返回False（后者仍记录nodes，缩小后可重新生成位图）
+        """
+        canvas.delete("node_layer")
+        self._professional_node_layer = None
+        self._professional_layer_nodes = None
+        if not nodes:
+            return False
 
-            # 根据文本长度调整字体大小
-            text_length = len(func_name)
-            if text_length > 20:
-                font_size = 9
-            elif text_length > 15:
-                font_size = 10
-            elif text_length > 10:
-                font_size = 11
-            else:
-                font_size = 12
+        try:
+            from PIL import Image, ImageDraw, ImageTk
+
+            shadow_offset = 4
+            min_x = min(info['x'] for info in nodes.values())
+            min_y = min(info['y'] for info in nodes.values())
+            max_x = max(info['x'] + info['width'] for info in nodes.values()) + shadow_offset
+            max_y = max(info['y'] + info['height'] for info in nodes.values()) + shadow_offset
+
+            width = int((max_x - min_x) * zoom) + 2
+            height = int((max_y - min_y) * zoom) + 2
+            if width * height > _FLOWCHART_BITMAP_MAX_PIXELS:
+                self.debug_log("Node layer bitmap too large (%sx%s), drawing canvas polygons", width, height)
+                self._professional_layer_nodes = nodes
+                return False
 
-            canvas.create_text(
-                text_x, text_y,
-                text=func_name,
-                font=("Microsoft YaHei", font_size, "bold"),
-                fill=style['text_color'],
-                width=width - 10
-            )
+            image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+            draw = ImageDraw.Draw(image)
+            radius = max(1, round(8 * zoom))
+            outline_width = max(1, round(2 * zoom))
+
+            # 先画所有阴影，再画所有节点体
+            for info in nodes.values():
+                if self.mermaid_style[info['type']].get('shadow', False):
+                    x = (info['x'] - min_x + shadow_offset) * zoom
+                    y = (info['y'] - min_y + shadow_offset) * zoom
+                    draw.rounded_rectangle((x, y, x + info['width'] * zoom, y + info['height'] * zoom),
+                                           radius=radius, fill='#ced4da')
+            for info in nodes.values():
+                style = self.mermaid_style[info['type']]
+                x = (info['x'] - min_x) * zoom
+                y = (info['y'] - min_y) * zoom
+                draw.rounded_rectangle((x, y, x + info['width'] * zoom, y + info['height'] * zoom),
+                                       radius=radius, fill=style['fill'], outline=style['stroke'],
+                                       width=outline_width)
+
+            photo = ImageTk.PhotoImage(image)
+            canvas.create_image(min_x * zoom, min_y * zoom, image=photo, anchor='nw',
+                                tags=("nodes", "node_layer"))
+            # 位图层放在连接线之上、节点文本之下
+            canvas.tag_lower("node_layer")
+            canvas.tag_lower("edges")
+
+            self._professional_node_layer = photo  # 保持引用，防止PhotoImage被回收
+            self._professional_layer_nodes = nodes
+            return True
 
-    def draw_gradient_rectangle(self, canvas, x, y, width, height, color, border_color):
-        """绘制渐变矩形（模拟效果）"""
-        # 创建多个矩形模拟渐变
-        steps = 10
-        for i in range(steps):
-            alpha = 1.0 - (i * 0.1)
-            y_offset = i * 2
-            if y_offset < height - 4:
-                canvas.create_rounded_rectangle(
-                    x, y + y_offset, x + width, y + height,
-                    radius=8, fill=color, outline=border_color if i == 0 else '', width=2 if i == 0 else 0
-                )
+        except (ImportError, AttributeError) as e:
+            # AttributeError: Pillow < 8.2 没有rounded_rectangle
+            self.log_message(f"🔧 DEBUG: Node layer bitmap unavailable, drawing canvas polygons: {e}")
+            return False
 
     def draw_professional_connections(self, canvas, layout):
-        """绘制专业级连接线"""
+        """绘制专业级连接线，返回子树哈希与上次绘制不同的函数名集合
+
+        每个函数发出的连接线带"sub:函数名"标签。subtree_hash与上次绘制时相同的子树整棵跳过，
+        只删除并重画哈希有变化的函数的连接线
+        """
         nodes = layout['nodes']
         tree = layout['tree']
         style = self.mermaid_style['connection']
+        rendered = self._rendered_subtree_hashes
+
+        # 显式栈先序遍历调用树，先收集有变化的子树中所有连接线端点再统一绘制
+        dirty = set()
+        segments = []
+        owners = []
+        stack = [tree] if tree else []
+        while stack:
+            node = stack.pop()
+            parent_info = nodes.get(node['name'])
+            if not parent_info or rendered.get(node['name']) == parent_info['subtree_hash']:
+                continue
+            dirty.add(node['name'])
 
-        def draw_connections_recursive(node):
-            if not node:
-                return
-
-            parent_name = node['name']
-            parent_info = nodes.get(parent_name)
-            if not parent_info:
-                return
+            # 计算连接点
+            parent_x = parent_info['x'] + parent_info['width'] // 2
+            parent_y = parent_info['y'] + parent_info['height']
 
-            children = node.get('children', [])
-            for child in children:
-                child_name = child['name']
-                child_info = nodes.get(child_name)
+            pending = []
+            for child in node.get('children', []):
+                child_info = nodes.get(child['name'])
                 if not child_info:
                     continue
 
-                # 计算连接点
-                parent_x = parent_info['x'] + parent_info['width'] // 2
-                parent_y = parent_info['y'] + parent_info['height']
-
                 child_x = child_info['x'] + child_info['width'] // 2
                 child_y = child_info['y']
+                segments.append((parent_x, parent_y, child_x, child_y))
+                owners.append(node['name'])
+                pending.append(child)
+
+            # 逆序压栈，保证子树按从左到右的顺序遍历
+            stack.extend(reversed(pending))
 
-                # 绘制曲线连接
-                self.draw_curved_arrow(canvas, parent_x, parent_y, child_x, child_y, style)
+        # 删除有变化的函数和已不在布局中的函数的旧连接线
+        for func_name in dirty | (rendered.keys() - nodes.keys()):
+            canvas.delete(f"sub:{func_name}")
 
-                # 递归绘制子节点连接
-                draw_connections_recursive(child)
+        # 所有箭头一次算好，再逐条绘制曲线连接（Tk每个图元仍需一次调用）
+        heads = _arrow_head_points(segments, style['arrow_size'])
+        for (parent_x, parent_y, child_x, child_y), head, owner in zip(segments, heads, owners):
+            self.draw_curved_arrow(canvas, parent_x, parent_y, child_x, child_y, style, head, f"sub:{owner}")
 
-        draw_connections_recursive(tree)
+        self._rendered_subtree_hashes = {name: info['subtree_hash'] for name, info in nodes.items()}
+        return dirty
 
-    def draw_curved_arrow(self, canvas, x1, y1, x2, y2, style):
-        """绘制曲线箭头"""
+    def draw_curved_arrow(self, canvas, x1, y1, x2, y2, style, head=None, tag=None):
+        """绘制曲线箭头（head为预先算好的箭头底角，见_arrow_head_points；tag为附加的Canvas标签）"""
+        tags = ("edges",) if tag is None else ("edges", tag)
         # 计算控制点（贝塞尔曲线）
         mid_y = (y1 + y2) // 2
 
-        # 绘制曲线路径
-        points = []
-        steps = 20
-        for i in range(steps + 1):
-            t = i / steps
-            # 三次贝塞尔曲线
-            x = (1-t)**3 * x1 + 3*(1-t)**2*t * x1 + 3*(1-t)*t**2 * x2 + t**3 * x2
-            y = (1-t)**3 * y1 + 3*(1-t)**2*t * mid_y + 3*(1-t)*t**2 * mid_y + t**3 * y2
-            points.extend([x, y])
-
-        # 绘制曲线
-        if len(points) >= 4:
-            canvas.create_line(points, fill=style['stroke'], width=style['width'], smooth=True)
+        # 绘制曲线：smooth='raw'时Tk把4个点当作三次贝塞尔控制点，在C中完成采样
+        canvas.create_line(
+            x1, y1, x1, mid_y, x2, mid_y, x2, y2,
+            fill=style['stroke'], width=style['width'], smooth='raw', splinesteps=12, tags=tags
+        )
 
         # 绘制箭头
-        arrow_size = style['arrow_size']
-        angle = 0.5  # 箭头角度
-
-        # 计算箭头点
-        dx = x2 - x1
-        dy = y2 - y1
-        length = (dx**2 + dy**2)**0.5
-        if length > 0:
-            dx /= length
-            dy /= length
-
-            # 箭头的两个边
-            arrow_x1 = x2 - arrow_size * (dx + dy * angle)
-            arrow_y1 = y2 - arrow_size * (dy - dx * angle)
-            arrow_x2 = x2 - arrow_size * (dx - dy * angle)
-            arrow_y2 = y2 - arrow_size * (dy + dx * angle)
+        if head is None:
+            head = _arrow_head_points([(x1, y1, x2, y2)], style['arrow_size'])[0]
+        if head is not None:
+            arrow_x1, arrow_y1, arrow_x2, arrow_y2 = head
 
             # 绘制箭头
             canvas.create_polygon(
                 x2, y2, arrow_x1, arrow_y1, arrow_x2, arrow_y2,
-                fill=style['stroke'], outline=style['stroke']
+                fill=style['stroke'], outline=style['stroke'], tags=tags
             )
 
-    def draw_professional_legend(self, canvas, canvas_width, canvas_height):
-        """绘制专业级图例"""
+    def draw_professional_legend(self, canvas, canvas_width, canvas_height, zoom=1.0):
+        """绘制专业级图例（zoom为当前缩放倍数，贴图尺寸和字号按其重新计算）"""
+        def s(value):
+            return value * zoom
+
         legend_x = canvas_width - 280
         legend_y = 30
         legend_width = 250
         legend_height = 180
 
         # 图例背景
-        canvas.create_rounded_rectangle(
-            legend_x, legend_y, legend_x + legend_width, legend_y + legend_height,
-            radius=10, fill='white', outline='#dee2e6', width=2
-        )
+        self.draw_rounded_tile(canvas, s(legend_x), s(legend_y), round(s(legend_width)), round(s(legend_height)),
+                               radius=max(1, round(s(10))), fill='white', outline='#dee2e6',
+                               border_width=max(1, round(s(2))), tags="legend")
 
         # 图例标题
         canvas.create_text(
-            legend_x + legend_width//2, legend_y + 20,
-            text="📖 图例说明", font=("Microsoft YaHei", 14, "bold"), fill='#495057'
+            s(legend_x + legend_width//2), s(legend_y + 20),
+            text="📖 图例说明", font=("Microsoft YaHei", max(1, round(s(14))), "bold"), fill='#495057', tags="legend"
         )
 
         # 图例项目
@@ -7253,30 +8642,56 @@ class MCUAnalyzerGUI:
             sample_width = 40
             sample_height = 25
 
-            canvas.create_rounded_rectangle(
-                sample_x, item_y, sample_x + sample_width, item_y + sample_height,
-                radius=4, fill=style['fill'], outline=style['stroke'], width=1
-            )
+            self.draw_rounded_tile(canvas, s(sample_x), s(item_y), round(s(sample_width)), round(s(sample_height)),
+                                   radius=max(1, round(s(4))), fill=style['fill'], outline=style['stroke'],
+                                   border_width=1, tags="legend")
 
             # 绘制描述
             canvas.create_text(
-                sample_x + sample_width + 15, item_y + sample_height//2,
-                text=f"{emoji} {description}", font=("Microsoft YaHei", 10), fill='#495057', anchor='w'
+                s(sample_x + sample_width + 15), s(item_y + sample_height//2),
+                text=f"{emoji} {description}", font=("Microsoft YaHei", max(1, round(s(10)))), fill='#495057',
+                anchor='w', tags="legend"
             )
 
             item_y += 35
 
+    def get_rounded_tile(self, width, height, radius, fill, outline, border_width):
+        """返回圆角矩形贴图（PhotoImage），同样的尺寸和颜色只用PIL绘制一次；PIL不可用时返回None"""
+        key = (width, height, radius, fill, outline, border_width)
+        tile = self._tile_cache.get(key)
+        if tile is not None:
+            self._tile_cache.move_to_end(key)
+        else:
+            try:
+                from PIL import Image, ImageDraw, ImageTk
+
+                image = Image.new('RGBA', (width + 1, height + 1), (0, 0, 0, 0))
+                ImageDraw.Draw(image).rounded_rectangle((0, 0, width, height), radius=radius,
+                                                        fill=fill, outline=outline, width=border_width)
+                tile = self._tile_cache[key] = ImageTk.PhotoImage(image)
+                # 每个缩放倍数各有一组图例贴图，只保留最近用过的
+                if len(self._tile_cache) > 32:
+                    self._tile_cache.popitem(last=False)
+            except (ImportError, AttributeError):
+                # AttributeError: Pillow < 8.2 没有rounded_rectangle
+                return None
+        return tile
+
+    def draw_rounded_tile(self, canvas, x, y, width, height, radius, fill, outline, border_width, tags=()):
+        """在(x, y)处贴一个缓存的圆角矩形贴图；PIL不可用时退回平滑多边形"""
+        tile = self.get_rounded_tile(width, height, radius, fill, outline, border_width)
+        if tile is not None:
+            return canvas.create_image(x, y, image=tile, anchor='nw', tags=tags)
+        return canvas.create_rounded_rectangle(
+            x, y, x + width, y + height,
+            radius=radius, fill=fill, outline=outline, width=border_width, tags=tags
+        )
+
     # 添加圆角矩形绘制方法
     def create_rounded_rectangle_method(self):
         """为Canvas添加圆角矩形方法"""
         def create_rounded_rectangle(self, x1, y1, x2, y2, radius=10, **kwargs):
-            points = []
-            for x, y in [(x1, y1 + radius), (x1, y1), (x1 + radius, y1),
-                        (x2 - radius, y1), (x2, y1), (x2, y1 + radius),
-                        (x2, y2 - radius), (x2, y2), (x2 - radius, y2),
-                        (x1 + radius, y2), (x1, y2), (x1, y2 - radius)]:
-                points.extend([x, y])
-            return self.create_polygon(points, smooth=True, **kwargs)
+            return self.create_polygon(_rounded_rect_points(x1, y1, x2, y2, radius), smooth=True, **kwargs)
 
         tk.Canvas.create_rounded_rectangle = create_rounded_rectangle
 
@@ -7300,38 +8715,60 @@ class MCUAnalyzerGUI:
 
     def render_call_flowchart_directly(self):
         """直接在Call Flowchart标签页渲染调用关系图"""
-        self.log_message(f"🔧 DEBUG: render_call_flowchart_directly called")
-        self.log_message(f"🔧 DEBUG: hasattr call_graph: {hasattr(self, 'call_graph')}")
-        if hasattr(self, 'call_graph'):
-            self.log_message(f"🔧 DEBUG: call_graph content: {self.call_graph}")
+        self.debug_log("render_call_flowchart_directly called")
+        self.debug_log("call_graph content: %s", self.call_graph)
 
-        if not hasattr(self, 'call_graph') or not self.call_graph:
+        if not self.call_graph:
             # 如果没有调用关系数据，显示提示信息
             self.log_message("🔧 DEBUG: No call_graph data, showing no data message")
             self.show_no_data_message()
             return
 
         try:
-            self.log_message("🔧 DEBUG: Attempting to render flowchart")
             # 直接在Call Flowchart标签页显示，无需切换子标签页
 
             # 检查是否已有Mermaid代码，如果没有则生成
-            has_mermaid = hasattr(self, 'mermaid_code') and self.mermaid_code
-            self.log_message(f"🔧 DEBUG: Has mermaid_code: {has_mermaid}")
+            has_mermaid = self.mermaid_code
+            self.debug_log("Attempting to render flowchart")
+            self.debug_log("Has mermaid_code: %s", bool(has_mermaid))
             if has_mermaid:
-                self.log_message(f"🔧 DEBUG: Existing mermaid_code length: {len(self.mermaid_code)}")
-                self.log_message(f"🔧 DEBUG: First 200 chars: {self.mermaid_code[:200]}")
+                self.debug_log("Existing mermaid_code length: %s", len(self.mermaid_code))
+                self.debug_log("First 200 chars: %.200s", self.mermaid_code)
 
+            sig = self._call_graph_sig
             if not has_mermaid:
-                self.log_message("🔧 DEBUG: Generating Mermaid code")
-                self.generate_mermaid_flowchart(self.call_graph)
+                cached_code = self._mermaid_cache.get(sig) if sig is not None else None
+                if cached_code:
+                    self.debug_log("Using cached Mermaid code for unchanged call_graph")
+                    self.mermaid_code = cached_code
+                else:
+                    # 在后台线程生成，标签页切换不被阻塞；生成完成后重新进入本方法完成渲染
+                    self.debug_log("Generating Mermaid code in background")
+                    self.generate_mermaid_flowchart_async(self.call_graph, self.render_call_flowchart_directly)
+                    return
             else:
-                self.log_message("🔧 DEBUG: Using existing Mermaid code")
+                self.debug_log("Using existing Mermaid code")
+            if sig is not None and self.mermaid_code:
+                self._mermaid_cache[sig] = self.mermaid_code
+                if len(self._mermaid_cache) > 8:
+                    self._mermaid_cache.popitem(last=False)
+
+            # 数据、代码和渲染配置都没变，且预览区仍是上次渲染的内容：无需重建
+            render_sig = (sig, self._mermaid_code_version,
+                          self.config.get('mermaid', {}).get('rendering_mode', 'online'),
+                          getattr(self, 'current_flowchart_format', 'mermaid'))
+            if (sig is not None and self._last_rendered_sig is not None
+                    and self._last_rendered_sig == (render_sig, self._preview_generation)):
+                self.debug_log("call_graph unchanged, keeping current flowchart")
+                return
 
             # 强制使用Mermaid渲染（不降级到Canvas）
             try:
-                self.render_mermaid_internal_only()
-                self.log_message("🔧 DEBUG: Mermaid flowchart rendered successfully")
+                if self.render_mermaid_internal_only():
+                    self._last_rendered_sig = (render_sig, self._preview_generation)
+                else:
+                    self._last_rendered_sig = None  # 渲染失败，下次切换标签页时重试
+                self.debug_log("Mermaid flowchart rendered successfully")
             except Exception as mermaid_error:
                 self.log_message(f"🔧 DEBUG: Mermaid rendering failed: {mermaid_error}, still showing Mermaid source")
                 # 仍然显示Mermaid源码，不降级到Canvas
@@ -7352,8 +8789,7 @@ class MCUAnalyzerGUI:
     def show_no_data_message(self):
         """显示无数据提示"""
         # 清理现有内容
-        for widget in self.graph_preview_frame.winfo_children():
-            widget.destroy()
+        self._clear_preview_frame(keep_control=False)
 
         # 显示提示信息
         message_label = ttk.Label(
@@ -7367,8 +8803,7 @@ class MCUAnalyzerGUI:
     def show_render_error_message(self):
         """显示渲染错误提示"""
         # 清理现有内容
-        for widget in self.graph_preview_frame.winfo_children():
-            widget.destroy()
+        self._clear_preview_frame(keep_control=False)
 
         # 显示错误信息
         error_label = ttk.Label(
@@ -7382,8 +8817,7 @@ class MCUAnalyzerGUI:
     def show_render_error_message_with_details(self, error_msg, traceback_details):
         """显示详细的渲染错误信息"""
         # 清理现有内容
-        for widget in self.graph_preview_frame.winfo_children():
-            widget.destroy()
+        self._clear_preview_frame(keep_control=False)
 
         # 创建滚动文本框显示详细错误
         import tkinter.scrolledtext as scrolledtext
@@ -7405,8 +8839,8 @@ class MCUAnalyzerGUI:
 {traceback_details}
 
 调试信息:
-- call_graph 存在: {hasattr(self, 'call_graph')}
-- call_graph 内容: {getattr(self, 'call_graph', 'None')}
+- call_graph 非空: {bool(self.call_graph)}
+- call_graph 内容: {self.call_graph}
 """
 
         error_text.insert(tk.END, error_content)
@@ -7416,65 +8850,66 @@ class MCUAnalyzerGUI:
 
     def render_simplified_graph_in_canvas(self):
         """直接在Call Flowchart标签页渲染简化的调用关系图"""
-        # 只清理显示区域，保留控制按钮
-        widgets_to_keep = []
-
-        # 保存需要保留的控制widget
-        if hasattr(self, 'preview_control_frame'):
-            widgets_to_keep.append(self.preview_control_frame)
+        def build_simplified_view():
+            # 创建Canvas和滚动条
+            canvas_frame = ttk.Frame(self.graph_preview_frame)
 
-        # 销毁除控制按钮外的所有widget
-        for widget in self.graph_preview_frame.winfo_children():
-            if widget not in widgets_to_keep:
-                widget.destroy()
+            canvas = tk.Canvas(canvas_frame, bg='white')
+            v_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=canvas.yview)
+            h_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=canvas.xview)
 
-        # 创建Canvas和滚动条
-        canvas_frame = ttk.Frame(self.graph_preview_frame)
-        canvas_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+            canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
 
-        self.flowchart_canvas = tk.Canvas(canvas_frame, bg='white')
-        v_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=self.flowchart_canvas.yview)
-        h_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=self.flowchart_canvas.xview)
+            # Pack scrollbars and canvas
+            v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+            canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        self.flowchart_canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+            return {
+                'frame': canvas_frame,
+                'pack': {'fill': tk.BOTH, 'expand': True, 'padx': 5, 'pady': 5},
+                'canvas': canvas,
+            }
 
-        # Pack scrollbars and canvas
-        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
-        self.flowchart_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        # 复用已有的Canvas（保留控制按钮），只清空其中的图元
+        view = self._show_preview_view('simplified_flowchart', build_simplified_view)
+        self.flowchart_canvas = view['canvas']
+        self.flowchart_canvas.delete("all")
 
-        # Draw simplified flowchart in the canvas
+        # Draw simplified flowchart in the canvas（同时设置滚动区域）
         self.draw_simplified_flowchart(self.flowchart_canvas)
 
-        # Update scroll region
-        self.flowchart_canvas.update_idletasks()
-        self.flowchart_canvas.configure(scrollregion=self.flowchart_canvas.bbox("all"))
-
         # 更新状态标签（现在应该仍然存在）
-        if hasattr(self, 'graph_status_label'):
+        if self.graph_status_label is not None:
             try:
                 self.graph_status_label.config(text="✅ Call graph displayed successfully")
             except tk.TclError:
                 self.log_message("🔧 DEBUG: graph_status_label已被销毁，无法更新状态")
-        self.log_message("🔧 DEBUG: Call graph displayed successfully")
+        self.debug_log("Call graph displayed successfully")
+        return True
 
     def draw_simplified_flowchart(self, canvas):
-        """Draw simplified flowchart on canvas with auto-sizing"""
-        if not hasattr(self, 'call_graph') or not self.call_graph:
+        """Draw simplified flowchart on canvas with auto-sizing
+
+        画布尺寸只在开始时查询一次；滚动区域由节点位置直接算出，不再扫描全部图元
+        """
+        if not self.call_graph:
             canvas.create_text(400, 300, text="No call relationship data available", font=("Arial", 16), fill="gray")
+            canvas.configure(scrollregion=canvas.bbox("all"))
             return
 
         call_tree = self.call_graph.get('call_tree')
         if not call_tree:
             canvas.create_text(400, 300, text="No main function or call relationships found", font=("Arial", 16), fill="gray")
+            canvas.configure(scrollregion=canvas.bbox("all"))
             return
 
-        # Debug: Print call tree structure
-        self.log_message(f"🔧 DEBUG: call_tree structure: {call_tree}")
-        self.log_message(f"🔧 DEBUG: call_tree type: {type(call_tree)}")
+        # Debug: Print call tree structure（只在调试模式下格式化整棵树）
+        self.debug_log("call_tree structure: %s", call_tree)
+        self.debug_log("call_tree type: %s", type(call_tree))
         if isinstance(call_tree, dict):
-            self.log_message(f"🔧 DEBUG: call_tree keys: {call_tree.keys()}")
-            self.log_message(f"🔧 DEBUG: call_tree children: {call_tree.get('children', 'No children key')}")
+            self.debug_log("call_tree keys: %s", call_tree.keys())
+            self.debug_log("call_tree children: %s", call_tree.get('children', 'No children key'))
 
         # Get canvas size for auto-sizing
         canvas.update_idletasks()
@@ -7497,10 +8932,18 @@ class MCUAnalyzerGUI:
             start_x = 50
             start_y = 50
 
-        # 存储节点位置用于连线
+        # 子节点间距在整次绘制中不变，只计算一次
+        child_spacing = max(20, canvas_width // 20)
+
+        # 存储节点位置用于连线；所有节点（含同名函数的每次出现）的矩形用于计算滚动区域，
+        # 可能换行（文字可能超出节点矩形）的文本图元另外按实际外接矩形计入
         node_positions = {}
+        node_boxes = []
+        wrapped_texts = []
 
-        def draw_node(node, x, y, level=0):
+        # 绘制参数作为默认参数绑定，递归中按局部变量访问
+        def draw_node(node, x, y, level=0, base_node_width=base_node_width, base_node_height=base_node_height,
+                      level_height=level_height, child_spacing=child_spacing):
             if not node:
                 return x
 
@@ -7514,19 +8957,9 @@ class MCUAnalyzerGUI:
             # Adjust font size based on node size
             font_size = max(8, min(12, node_width // 10))
 
-            # 初始化child_spacing，确保在所有代码路径下都有值
-            child_spacing = max(20, canvas_width // 20)
-
             # 根据函数类型选择颜色
-            if func_name == 'main':
-                color = "#ff9999"  # 红色
-                text_color = "black"
-            elif func_name.startswith(('HAL_', 'GPIO_', 'UART_', 'SPI_', 'I2C_', 'TIM_', 'ADC_', 'DMA_')):
-                color = "#99ff99"  # 绿色
-                text_color = "black"
-            else:
-                color = "#99ccff"  # 蓝色
-                text_color = "black"
+            color = _CANVAS_FLOWCHART_COLORS[_classify_node(func_name)]
+            text_color = "black"
 
             # 绘制节点
             rect = canvas.create_rectangle(
@@ -7543,6 +8976,10 @@ class MCUAnalyzerGUI:
 
             # 存储节点位置
             node_positions[func_name] = (x + node_width/2, y + node_height/2, node_width, node_height)
+            node_boxes.append((x, y, x + node_width, y + node_height))
+            # 按每字符不超过一个字号宽度从宽估算，可能换行时记录文本图元
+            if text_length * font_size > node_width - 10:
+                wrapped_texts.append(text)
 
             # 处理子节点
             children = node.get('children', [])
@@ -7579,24 +9016,39 @@ class MCUAnalyzerGUI:
         legend_y = start_y + 20
         legend_font_size = max(8, min(12, canvas_width // 80))
 
-        canvas.create_text(legend_x, legend_y, text="Legend:", font=("Arial", legend_font_size + 2, "bold"), anchor="w")
+        canvas.create_text(legend_x, legend_y, text="Legend:", font=("Arial", legend_font_size + 2, "bold"), anchor="w",
+                           tags="legend")
 
         # Red legend
-        canvas.create_rectangle(legend_x, legend_y + 25, legend_x + 20, legend_y + 40, fill="#ff9999", outline="black")
-        canvas.create_text(legend_x + 25, legend_y + 32, text="main function (Program entry)", font=("Arial", legend_font_size), anchor="w")
+        canvas.create_rectangle(legend_x, legend_y + 25, legend_x + 20, legend_y + 40, fill="#ff9999", outline="black",
+                                tags="legend")
+        canvas.create_text(legend_x + 25, legend_y + 32, text="main function (Program entry)", font=("Arial", legend_font_size), anchor="w",
+                           tags="legend")
 
         # Green legend
-        canvas.create_rectangle(legend_x, legend_y + 50, legend_x + 20, legend_y + 65, fill="#99ff99", outline="black")
-        canvas.create_text(legend_x + 25, legend_y + 57, text="Interface functions (HAL/GPIO/UART etc.)", font=("Arial", legend_font_size), anchor="w")
+        canvas.create_rectangle(legend_x, legend_y + 50, legend_x + 20, legend_y + 65, fill="#99ff99", outline="black",
+                                tags="legend")
+        canvas.create_text(legend_x + 25, legend_y + 57, text="Interface functions (HAL/GPIO/UART etc.)", font=("Arial", legend_font_size), anchor="w",
+                           tags="legend")
 
         # Blue legend
-        canvas.create_rectangle(legend_x, legend_y + 75, legend_x + 20, legend_y + 90, fill="#99ccff", outline="black")
-        canvas.create_text(legend_x + 25, legend_y + 82, text="User-defined functions", font=("Arial", legend_font_size), anchor="w")
+        canvas.create_rectangle(legend_x, legend_y + 75, legend_x + 20, legend_y + 90, fill="#99ccff", outline="black",
+                                tags="legend")
+        canvas.create_text(legend_x + 25, legend_y + 82, text="User-defined functions", font=("Arial", legend_font_size), anchor="w",
+                           tags="legend")
+
+        # 滚动区域：图例（只有几个图元）、可能换行的节点文本与由节点位置算出的流程图范围的并集
+        x0, y0, x1, y1 = canvas.bbox("legend")
+        if wrapped_texts:
+            node_boxes.append(canvas.bbox(*wrapped_texts))
+        for bx0, by0, bx1, by1 in node_boxes:
+            x0, y0, x1, y1 = min(x0, bx0), min(y0, by0), max(x1, bx1), max(y1, by1)
+        canvas.configure(scrollregion=(x0 - 2, y0 - 2, x1 + 2, y1 + 2))
 
     def on_format_changed(self):
         """当格式选项改变时的回调"""
         # 如果当前有图形显示，重新渲染
-        if hasattr(self, 'call_graph') and self.call_graph:
+        if self.call_graph:
             self.render_graph_in_ui()
 
     def on_quality_changed(self, event=None):
@@ -7611,14 +9063,14 @@ class MCUAnalyzerGUI:
             event.widget.set("超高质量")
 
         # 如果当前有图形显示，重新渲染
-        if hasattr(self, 'call_graph') and self.call_graph:
+        if self.call_graph:
             self.render_graph_in_ui()
 
     def render_graph_in_ui(self):
         """在UI内部渲染Mermaid图形"""
         try:
             # 检查是否有调用图数据
-            if not hasattr(self, 'call_graph') or not self.call_graph:
+            if not self.call_graph:
                 messagebox.showwarning("Warning", "No call graph data available. Please run analysis first.")
                 return
 
@@ -7634,18 +9086,16 @@ class MCUAnalyzerGUI:
     def render_mermaid_only(self):
         """渲染Mermaid流程图"""
         try:
-            self.log_message("🔧 DEBUG: Rendering Mermaid flowchart")
+            self.debug_log("Rendering Mermaid flowchart")
 
             # 获取格式和质量设置
             format_type = self.format_var.get()  # svg 或 png
             quality = self.quality_var.get()     # standard, high, ultra
 
-            self.log_message(f"🔧 DEBUG: Format: {format_type}, Quality: {quality}")
+            self.debug_log("Format: %s, Quality: %s", format_type, quality)
 
             # 清理现有内容（保留控制面板）
-            for widget in self.graph_preview_frame.winfo_children():
-                if not hasattr(widget, '_is_control_frame'):
-                    widget.destroy()
+            self._clear_preview_frame()
 
             # 创建容器
             container = ttk.LabelFrame(
@@ -7665,7 +9115,7 @@ class MCUAnalyzerGUI:
     def render_mermaid_in_frame(self, parent_frame, format_type="svg", quality="high"):
         """在指定框架中渲染Mermaid - 仅显示源码"""
         try:
-            self.log_message(f"🔧 DEBUG: Rendering Mermaid in frame - showing source code only")
+            self.debug_log("Rendering Mermaid in frame - showing source code only")
             # 直接显示Mermaid代码
             self.show_mermaid_code_in_frame(parent_frame)
 
@@ -7685,7 +9135,7 @@ class MCUAnalyzerGUI:
             )
             code_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
-            if hasattr(self, 'mermaid_code') and self.mermaid_code:
+            if self.mermaid_code:
                 code_text.insert(tk.END, self.mermaid_code)
             else:
                 code_text.insert(tk.END, "暂无Mermaid代码，请先进行分析")
@@ -7701,16 +9151,18 @@ class MCUAnalyzerGUI:
             current_mode = self.config.get('mermaid', {}).get('rendering_mode', 'online')
             if current_mode == 'local':
                 self.rendering_mode_var.set("🖥️ 本地渲染")
+            elif current_mode == 'canvas':
+                self.rendering_mode_var.set("🎨 Canvas渲染")
             else:
                 self.rendering_mode_var.set("🌐 在线渲染")
         except:
             self.rendering_mode_var.set("🌐 在线渲染")
 
     def toggle_rendering_mode(self):
-        """切换渲染模式"""
+        """切换渲染模式（在线 -> 本地 -> Canvas -> 在线）"""
         try:
             current_mode = self.config.get('mermaid', {}).get('rendering_mode', 'online')
-            new_mode = 'online' if current_mode == 'local' else 'local'
+            new_mode = {'online': 'local', 'local': 'canvas'}.get(current_mode, 'online')
 
             # 更新配置
             if 'mermaid' not in self.config:
@@ -7728,11 +9180,11 @@ class MCUAnalyzerGUI:
             self.update_rendering_mode_display()
 
             # 显示切换消息
-            mode_text = "本地渲染" if new_mode == 'local' else "在线渲染"
+            mode_text = {'local': "本地渲染", 'canvas': "Canvas渲染"}.get(new_mode, "在线渲染")
             self.log_message(f"🔄 已切换到{mode_text}模式")
 
             # 如果当前有Mermaid图表，重新渲染
-            if hasattr(self, 'mermaid_code') and self.mermaid_code:
+            if self.mermaid_code:
                 self.log_message(f"🔄 使用{mode_text}重新渲染图表...")
                 self.render_mermaid_internal_only()
 
@@ -7755,7 +9207,11 @@ class MCUAnalyzerGUI:
                 self.last_window_size = current_size
                 return
 
-            if current_size == self.last_window_size:
+            # 与上次触发渲染时的尺寸相比变化不足阈值时不重新渲染（拖动中的小幅变化会累积）
+            mermaid_config = self.config.get('mermaid', {})
+            threshold = mermaid_config.get('resize_threshold', 40)
+            last_width, last_height = self.last_window_size
+            if abs(current_size[0] - last_width) + abs(current_size[1] - last_height) < threshold:
                 return
 
             # 记录新尺寸
@@ -7765,16 +9221,40 @@ class MCUAnalyzerGUI:
             if self.resize_timer:
                 self.root.after_cancel(self.resize_timer)
 
-            # 设置新的定时器，延迟重新渲染（避免频繁渲染）
-            delay = self.config.get('mermaid', {}).get('resize_delay', 500)
-            self.resize_timer = self.root.after(delay, self.on_window_resize_complete)
+            self._render_epoch += 1
+            if self.graph_preview_frame.winfo_viewable():
+                # 设置新的定时器，延迟重新渲染（避免频繁渲染）
+                delay = mermaid_config.get('resize_delay', 500)
+                self.resize_timer = self.root.after(delay, self.on_window_resize_complete, self._render_epoch)
+            else:
+                # 预览区不可见时只做标记，再次可见时渲染一次（见on_preview_mapped）
+                self.resize_timer = None
+                self._resize_render_pending = True
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Window configure event failed: {e}")
 
-    def on_window_resize_complete(self):
-        """窗口尺寸变化完成后的处理"""
+    def on_preview_mapped(self, event):
+        """预览区重新可见（切换到流程图标签页、窗口还原）时，补上隐藏期间的尺寸变化渲染"""
         try:
+            if not self._resize_render_pending or not self.graph_preview_frame.winfo_viewable():
+                return
+            self._resize_render_pending = False
+
+            if self.resize_timer:
+                self.root.after_cancel(self.resize_timer)
+            self._render_epoch += 1
+            delay = self.config.get('mermaid', {}).get('resize_delay', 500)
+            self.resize_timer = self.root.after(delay, self.on_window_resize_complete, self._render_epoch)
+
+        except Exception as e:
+            self.log_message(f"🔧 DEBUG: Preview map event failed: {e}")
+
+    def on_window_resize_complete(self, epoch=None):
+        """窗口尺寸变化完成后的处理（epoch为安排本次渲染时的_render_epoch，已过期则放弃）"""
+        try:
+            if epoch is not None and epoch != self._render_epoch:
+                return
             self.resize_timer = None
 
             # 检查是否启用了自动重新渲染
@@ -7784,18 +9264,17 @@ class MCUAnalyzerGUI:
                 return
 
             # 检查是否有Mermaid图表需要重新渲染
-            if not hasattr(self, 'mermaid_code') or not self.mermaid_code:
+            if not self.mermaid_code:
                 return
 
             # 检查当前是否使用本地渲染模式
             rendering_mode = self.config.get('mermaid', {}).get('rendering_mode', 'online')
             if rendering_mode != 'local':
-                self.log_message("🔧 DEBUG: Window resized, but not in local rendering mode - skipping re-render")
+                self.debug_log("Window resized, but not in local rendering mode - skipping re-render")
                 return
 
             # 获取新的窗口尺寸
-            new_width, new_height = self.last_window_size
-            self.log_message(f"🔧 DEBUG: Window resized to {new_width}x{new_height}, re-rendering Mermaid with local renderer")
+            self.debug_log("Window resized to %sx%s, re-rendering Mermaid with local renderer", *self.last_window_size)
 
             # 重新渲染Mermaid图表
             self.render_mermaid_internal_only()
@@ -7810,48 +9289,193 @@ class MCUAnalyzerGUI:
     def show_simple_failure_message(self):
         """显示简单的渲染失败消息"""
         try:
-            # 清理现有内容（保留控制面板）
-            for widget in self.graph_preview_frame.winfo_children():
-                if not hasattr(widget, '_is_control_frame'):
-                    widget.destroy()
+            def build_failure_view():
+                # 创建简单提示
+                message_frame = ttk.Frame(self.graph_preview_frame)
+
+                # 主要消息
+                main_label = ttk.Label(
+                    message_frame,
+                    text="⚠️ Mermaid渲染工具不可用",
+                    font=("Microsoft YaHei", 16, "bold"),
+                    foreground="orange"
+                )
+                main_label.pack(pady=(50, 20))
 
-            # 创建简单提示
-            message_frame = ttk.Frame(self.graph_preview_frame)
-            message_frame.pack(expand=True, fill=tk.BOTH)
+                # 简单说明
+                info_label = ttk.Label(
+                    message_frame,
+                    text="请安装 Mermaid CLI 以启用图形渲染：\nnpm install -g @mermaid-js/mermaid-cli",
+                    font=("Microsoft YaHei", 11),
+                    foreground="gray",
+                    justify=tk.CENTER
+                )
+                info_label.pack(pady=(0, 30))
 
-            # 主要消息
-            main_label = ttk.Label(
-                message_frame,
-                text="⚠️ Mermaid渲染工具不可用",
-                font=("Microsoft YaHei", 16, "bold"),
-                foreground="orange"
-            )
-            main_label.pack(pady=(50, 20))
+                return {'frame': message_frame, 'pack': {'expand': True, 'fill': tk.BOTH}}
 
-            # 简单说明
-            info_label = ttk.Label(
-                message_frame,
-                text="请安装 Mermaid CLI 以启用图形渲染：\nnpm install -g @mermaid-js/mermaid-cli",
-                font=("Microsoft YaHei", 11),
-                foreground="gray",
-                justify=tk.CENTER
-            )
-            info_label.pack(pady=(0, 30))
+            # 提示内容固定，视图建好后直接复用
+            self._show_preview_view('simple_failure', build_failure_view)
 
             self.log_message("🔧 DEBUG: Simple failure message displayed")
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to show simple failure message: {e}")
 
+    def try_native_canvas_rendering(self):
+        """小调用图直接在Tk Canvas上绘制，跳过浏览器、mermaid.js、SVG解码和PIL缩放
+
+        节点数超过mermaid.native_canvas_max_nodes（默认40，设为0关闭）时返回False，交给Mermaid渲染
+        """
+        try:
+            max_nodes = self.config.get('mermaid', {}).get('native_canvas_max_nodes', _NATIVE_CANVAS_MAX_NODES)
+            if not max_nodes or self.current_flowchart_format != 'mermaid':
+                return False
+
+            call_tree = (self.call_analysis_data or {}).get('call_tree')
+            if not call_tree:
+                return False
+
+            # 按前序遍历首次出现的深度分层（与generate_mermaid_flowchart的分层一致）
+            layers = {}
+            seen = set()
+            edges = []
+            seen_edges = set()
+            stack = [(call_tree, 0)]
+            while stack:
+                node, depth = stack.pop()
+                func_name = node['name']
+                if func_name not in seen:
+                    seen.add(func_name)
+                    if len(seen) > max_nodes:
+                        return False
+                    layers.setdefault(depth, []).append(func_name)
+
+                children = node.get('children', [])
+                for child in children:
+                    edge = (func_name, child['name'])
+                    if edge not in seen_edges:
+                        seen_edges.add(edge)
+                        edges.append(edge)
+                stack.extend((child, depth + 1) for child in reversed(children))
+
+            return self.render_native_call_graph([layers[depth] for depth in sorted(layers)], edges)
+
+        except Exception as e:
+            self.log_message(f"🔧 DEBUG: Native canvas rendering failed: {e}")
+            return False
+
+    def render_native_call_graph(self, layers, edges):
+        """在Canvas上按层绘制调用图：layers为逐层函数名列表，edges为(调用者, 被调用者)列表"""
+        node_width, node_height = 160, 44
+        h_gap, v_gap, margin = 24, 60, 20
+        nodes_per_row = self.last_nodes_per_row
+
+        # 清理现有内容（保留控制面板）
+        self._clear_preview_frame()
+
+        container = ttk.LabelFrame(
+            self.graph_preview_frame,
+            text="🎨 调用关系流程图 (Canvas原生渲染)",
+            padding=5
+        )
+        container.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        canvas = self._make_scrollable_canvas(container)
+
+        # 每层按每行节点数折行，与Mermaid自适应布局一致
+        rows = []
+        for layer in layers:
+            for start in range(0, len(layer), nodes_per_row):
+                rows.append(layer[start:start + nodes_per_row])
+
+        widest = max(len(row) for row in rows)
+        total_width = widest * node_width + (widest - 1) * h_gap
+
+        # 计算节点位置：(中心x, 顶部y, 底部y)
+        positions = {}
+        for row_idx, row in enumerate(rows):
+            row_width = len(row) * node_width + (len(row) - 1) * h_gap
+            x0 = margin + (total_width - row_width) / 2
+            y = margin + row_idx * (node_height + v_gap)
+            for i, func_name in enumerate(row):
+                positions[func_name] = (x0 + i * (node_width + h_gap) + node_width / 2, y, y + node_height)
+
+        def node_color(func_name):
+            return _CALL_GRAPH_NODE_COLORS[_classify_node(func_name)]
+
+        try:
+            from PIL import Image, ImageDraw, ImageTk
+
+            # 连线和节点框绘制到同一张位图上，Canvas只保留一个图片项和节点文字，
+            # 显示列表从2N+E项降到N+1项
+            image_width = int(total_width + 2 * margin)
+            image_height = int(margin * 2 + len(rows) * (node_height + v_gap) - v_gap)
+            background = Image.new("RGB", (image_width, image_height), "white")
+            draw = ImageDraw.Draw(background)
+
+            # 先画连线，节点覆盖在连线之上
+            for caller, callee in edges:
+                px, _, p_bottom = positions[caller]
+                cx, c_top, c_bottom = positions[callee]
+                if c_top > p_bottom:
+                    _draw_pil_arrow(draw, (px, p_bottom), (cx, c_top), "#555555", width=2)
+                else:
+                    # 回调或同层调用用虚线标出
+                    _draw_pil_arrow(draw, (px, p_bottom), (cx, c_bottom), "#999999", dash=(4, 2))
+
+            for func_name, (cx, top, bottom) in positions.items():
+                draw.rectangle(
+                    [cx - node_width / 2, top, cx + node_width / 2, bottom],
+                    fill=node_color(func_name), outline="#333333", width=1
+                )
+
+            photo = ImageTk.PhotoImage(background)
+            canvas.create_image(0, 0, image=photo, anchor=tk.NW)
+            canvas.image = photo  # 保持引用
+        except ImportError:
+            # 没有Pillow时退回逐项绘制
+            for caller, callee in edges:
+                px, _, p_bottom = positions[caller]
+                cx, c_top, c_bottom = positions[callee]
+                if c_top > p_bottom:
+                    canvas.create_line(px, p_bottom, cx, c_top, fill="#555555", width=1.5, arrow=tk.LAST)
+                else:
+                    canvas.create_line(px, p_bottom, cx, c_bottom, fill="#999999", width=1, dash=(4, 2), arrow=tk.LAST)
+
+            for func_name, (cx, top, bottom) in positions.items():
+                canvas.create_rectangle(
+                    cx - node_width / 2, top, cx + node_width / 2, bottom,
+                    fill=node_color(func_name), outline="#333333", width=1
+                )
+
+        # 节点文字仍用Canvas文本项（需要Tk字体度量和自动换行）
+        for func_name, (cx, top, bottom) in positions.items():
+            canvas.create_text(
+                cx, (top + bottom) / 2, text=func_name,
+                font=("Microsoft YaHei", 9), width=node_width - 10
+            )
+
+        canvas.configure(scrollregion=canvas.bbox("all"))
+
+        # 更新全局状态
+        if self.graph_status_label is not None:
+            try:
+                self.graph_status_label.config(text=f"✅ 调用图已原生渲染 ({len(positions)} 个节点)")
+            except tk.TclError:
+                pass
+
+        return True
+
     def render_canvas_flowchart(self):
-        """使用Canvas直接绘制流程图 - 保证能显示"""
+        """使用Canvas直接按调用树绘制流程图（备选渲染方案）；没有调用树或绘制失败时返回False"""
+        if not (self.call_graph or {}).get('call_tree'):
+            return False
+
         try:
-            self.log_message("🔧 DEBUG: Rendering flowchart with Canvas - GUARANTEED SUCCESS")
+            self.debug_log("Rendering flowchart with Canvas")
 
             # 清理现有内容（保留控制面板）
-            for widget in self.graph_preview_frame.winfo_children():
-                if not hasattr(widget, '_is_control_frame'):
-                    widget.destroy()
+            self._clear_preview_frame()
 
             # 创建Canvas容器
             canvas_container = ttk.LabelFrame(
@@ -7869,7 +9493,16 @@ class MCUAnalyzerGUI:
             v_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=canvas.yview)
             h_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=canvas.xview)
 
-            canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+            # 视图变化（滚动条、鼠标滚轮、尺寸变化）后重新生成可见区域的图元
+            def on_yscroll(first, last):
+                v_scrollbar.set(first, last)
+                self.schedule_canvas_flowchart_refresh(canvas)
+
+            def on_xscroll(first, last):
+                h_scrollbar.set(first, last)
+                self.schedule_canvas_flowchart_refresh(canvas)
+
+            canvas.configure(yscrollcommand=on_yscroll, xscrollcommand=on_xscroll)
 
             # 布局
             v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -7898,17 +9531,25 @@ class MCUAnalyzerGUI:
             )
             status_label.pack(pady=5)
 
-            self.log_message("🔧 DEBUG: Canvas flowchart rendered successfully")
+            self.debug_log("Canvas flowchart rendered successfully")
+            return True
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Canvas flowchart rendering failed: {e}")
-            # 最后的备选方案
-            self.show_simple_failure_message()
+            return False
 
     def draw_flowchart_on_canvas(self, canvas):
-        """在Canvas上绘制流程图"""
+        """在Canvas上绘制流程图
+
+        先遍历调用树算出所有节点和连线，按原绘制顺序记录在self._canvas_flowchart_ops中。
+        节点矩形和连线优先一次性画到一张位图上（见render_canvas_flowchart_bitmap），
+        图元只为可见区域附近的部分创建（见refresh_canvas_flowchart_viewport）
+        """
+        self._canvas_flowchart_ops = None
+        self._canvas_flowchart_baked = False
+        self._canvas_flowchart_items = {}
         try:
-            if not hasattr(self, 'call_graph') or not self.call_graph:
+            if not self.call_graph:
                 canvas.create_text(400, 300, text="无调用关系数据", font=("Microsoft YaHei", 16), fill="gray")
                 return
 
@@ -7923,93 +9564,181 @@ class MCUAnalyzerGUI:
             level_gap = 100
             node_gap = 200
 
-            # 存储节点位置
-            node_positions = {}
-
-            def draw_node_recursive(node, x, y, level=0):
-                if not node:
-                    return x
-
-                func_name = node['name']
-
-                # 根据函数类型选择颜色
-                if func_name == 'main':
-                    fill_color = "#ff9999"  # 红色
-                    text_color = "black"
-                elif func_name.startswith(('HAL_', 'GPIO_', 'UART_', 'SPI_', 'I2C_', 'TIM_', 'ADC_', 'DMA_')):
-                    fill_color = "#99ff99"  # 绿色
-                    text_color = "black"
+            # 布局（纯计算，按列存放），再按绘制顺序展开为节点/连线：(外接矩形, 'node'|'edge', 绘制参数)
+            layout = _layout_flowchart_tree(call_tree, start_x, start_y, level_gap, node_gap)
+            names, xs, ys, types = layout['name'], layout['x'], layout['y'], layout['type']
+            ops = []
+            for kind, i, j in layout['order']:
+                if kind == 'node':
+                    x, y = xs[i], ys[i]
+                    ops.append(((x, y, x + node_width, y + node_height), 'node',
+                                (names[i], _CANVAS_FLOWCHART_COLORS[types[i]], "black")))
                 else:
-                    fill_color = "#99ccff"  # 蓝色
-                    text_color = "black"
-
-                # 绘制节点矩形
-                rect = canvas.create_rectangle(
-                    x, y, x + node_width, y + node_height,
-                    fill=fill_color, outline="black", width=2
-                )
-
-                # 绘制文本
-                text = canvas.create_text(
-                    x + node_width/2, y + node_height/2,
-                    text=func_name, font=("Microsoft YaHei", 10, "bold"),
-                    fill=text_color, width=node_width-10
-                )
-
-                # 存储节点位置
-                node_positions[func_name] = (x + node_width/2, y + node_height/2)
-
-                # 处理子节点
-                children = node.get('children', [])
-                if children:
-                    child_y = y + level_gap
-                    child_start_x = x - (len(children) - 1) * node_gap / 2
-
-                    for i, child in enumerate(children):
-                        child_x = child_start_x + i * node_gap
-                        draw_node_recursive(child, child_x, child_y, level + 1)
-
-                        # 绘制连线
-                        child_name = child['name']
-                        if child_name in node_positions:
-                            parent_pos = node_positions[func_name]
-                            child_pos = node_positions[child_name]
-
-                            canvas.create_line(
-                                parent_pos[0], parent_pos[1] + node_height/2,
-                                child_pos[0], child_pos[1] - node_height/2,
-                                fill="black", width=2, arrow=tk.LAST
-                            )
-
-                return x + node_width + node_gap
-
-            # 开始绘制
-            draw_node_recursive(call_tree, start_x, start_y)
+                    # 父节点底边中点 -> 子节点顶边中点
+                    line = (xs[i] + node_width/2, ys[i] + node_height, xs[j] + node_width/2, ys[j])
+                    ops.append(((min(line[0], line[2]), min(line[1], line[3]),
+                                 max(line[0], line[2]), max(line[1], line[3])), 'edge', line))
 
             # 添加图例
             legend_x, legend_y = start_x + 500, start_y
-            canvas.create_text(legend_x, legend_y, text="图例:", font=("Microsoft YaHei", 12, "bold"), anchor="w")
+            canvas.create_text(legend_x, legend_y, text="图例:", font=("Microsoft YaHei", 12, "bold"), anchor="w",
+                               tags="legend")
 
             # 红色图例
-            canvas.create_rectangle(legend_x, legend_y + 25, legend_x + 20, legend_y + 40, fill="#ff9999", outline="black")
-            canvas.create_text(legend_x + 25, legend_y + 32, text="主函数 (程序入口)", font=("Microsoft YaHei", 10), anchor="w")
+            canvas.create_rectangle(legend_x, legend_y + 25, legend_x + 20, legend_y + 40, fill="#ff9999", outline="black",
+                                    tags="legend")
+            canvas.create_text(legend_x + 25, legend_y + 32, text="主函数 (程序入口)", font=("Microsoft YaHei", 10), anchor="w",
+                               tags="legend")
 
             # 绿色图例
-            canvas.create_rectangle(legend_x, legend_y + 50, legend_x + 20, legend_y + 65, fill="#99ff99", outline="black")
-            canvas.create_text(legend_x + 25, legend_y + 57, text="接口函数 (HAL/GPIO等)", font=("Microsoft YaHei", 10), anchor="w")
+            canvas.create_rectangle(legend_x, legend_y + 50, legend_x + 20, legend_y + 65, fill="#99ff99", outline="black",
+                                    tags="legend")
+            canvas.create_text(legend_x + 25, legend_y + 57, text="接口函数 (HAL/GPIO等)", font=("Microsoft YaHei", 10), anchor="w",
+                               tags="legend")
 
             # 蓝色图例
-            canvas.create_rectangle(legend_x, legend_y + 75, legend_x + 20, legend_y + 90, fill="#99ccff", outline="black")
-            canvas.create_text(legend_x + 25, legend_y + 82, text="用户定义函数", font=("Microsoft YaHei", 10), anchor="w")
+            canvas.create_rectangle(legend_x, legend_y + 75, legend_x + 20, legend_y + 90, fill="#99ccff", outline="black",
+                                    tags="legend")
+            canvas.create_text(legend_x + 25, legend_y + 82, text="用户定义函数", font=("Microsoft YaHei", 10), anchor="w",
+                               tags="legend")
 
-            # 更新滚动区域
+            # 更新滚动区域：图例与全部节点/连线（包括尚未创建图元的）的外接矩形
             canvas.update_idletasks()
-            canvas.configure(scrollregion=canvas.bbox("all"))
+            x0, y0, x1, y1 = canvas.bbox("legend")
+            for (bx0, by0, bx1, by1), _, _ in ops:
+                x0, y0, x1, y1 = min(x0, bx0), min(y0, by0), max(x1, bx1), max(y1, by1)
+            canvas.configure(scrollregion=(x0 - 2, y0 - 2, x1 + 2, y1 + 2))
+
+            self._canvas_flowchart_ops = ops
+            self._canvas_flowchart_baked = self.render_canvas_flowchart_bitmap(canvas, ops)
+            self.refresh_canvas_flowchart_viewport(canvas)
+            canvas.bind("<Configure>", lambda event: self.schedule_canvas_flowchart_refresh(canvas), add="+")
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Failed to draw flowchart on canvas: {e}")
             canvas.create_text(400, 300, text="绘制流程图时出错", font=("Microsoft YaHei", 16), fill="red")
 
+    def render_canvas_flowchart_bitmap(self, canvas, ops):
+        """把Canvas流程图的所有节点矩形和连线按原绘制顺序画到一张PIL位图上，
+        以单个图像图元（"flowchart_layer"标签）显示在最底层；节点文本仍是Canvas图元
+
+        同一份call_graph的位图会被复用。成功返回True，PIL不可用或位图过大时返回False
+        """
+        try:
+            key = self._call_graph_sig
+            cached = self._canvas_flowchart_bitmap
+            if key is not None and cached is not None and cached[0] == key:
+                _, origin, photo = cached
+            else:
+                from PIL import Image, ImageDraw, ImageTk
+
+                min_x = min(box[0] for box, _, _ in ops) - 2
+                min_y = min(box[1] for box, _, _ in ops) - 2
+                width = int(max(box[2] for box, _, _ in ops) - min_x) + 3
+                height = int(max(box[3] for box, _, _ in ops) - min_y) + 3
+                if width * height > _FLOWCHART_BITMAP_MAX_PIXELS:
+                    self.debug_log("Flowchart bitmap too large (%sx%s), drawing canvas items", width, height)
+                    return False
+
+                # 连线箭头与Tk默认箭头形状（长10、半宽3）一致
+                edges = [args for _, kind, args in ops if kind == 'edge']
+                heads = iter(_arrow_head_points(
+                    [(x1 - min_x, y1 - min_y, x2 - min_x, y2 - min_y) for x1, y1, x2, y2 in edges], 10, 0.3))
+
+                image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+                draw = ImageDraw.Draw(image)
+                for (x0, y0, x1, y1), kind, args in ops:
+                    if kind == 'node':
+                        draw.rectangle((x0 - min_x, y0 - min_y, x1 - min_x, y1 - min_y),
+                                       fill=args[1], outline="black", width=2)
+                    else:
+                        line_x1, line_y1, line_x2, line_y2 = args
+                        tip = (line_x2 - min_x, line_y2 - min_y)
+                        draw.line((line_x1 - min_x, line_y1 - min_y) + tip, fill="black", width=2)
+                        head = next(heads)
+                        if head is not None:
+                            draw.polygon([tip, head[0:2], head[2:4]], fill="black")
+
+                origin = (min_x, min_y)
+                photo = ImageTk.PhotoImage(image)
+                self._canvas_flowchart_bitmap = (key, origin, photo)
+
+            canvas.delete("flowchart_layer")
+            canvas.create_image(*origin, image=photo, anchor='nw', tags="flowchart_layer")
+            canvas.tag_lower("flowchart_layer")
+            return True
+
+        except ImportError as e:
+            self.log_message(f"🔧 DEBUG: Flowchart bitmap unavailable, drawing canvas items: {e}")
+            return False
+
+    def schedule_canvas_flowchart_refresh(self, canvas):
+        """滚动/尺寸变化后在空闲时刷新一次Canvas流程图的可见图元（同一轮事件中的多次请求合并）"""
+        if self._canvas_flowchart_refresh_id is None and self._canvas_flowchart_ops:
+            self._canvas_flowchart_refresh_id = self.root.after_idle(self.refresh_canvas_flowchart_viewport, canvas)
+
+    def refresh_canvas_flowchart_viewport(self, canvas):
+        """视口裁剪：只为可见区域附近的节点/连线保留图元
+
+        与refresh_professional_viewport相同：进入可见区域（外扩_VIEWPORT_CREATE_MARGIN）的部分补建图元，
+        离开较大范围（外扩_VIEWPORT_KEEP_MARGIN）的删除，两者之间的不动。
+        新建图元按ops顺序插到已有图元之间，保持原绘制顺序；节点矩形和连线已在位图层中时只创建节点文本
+        """
+        self._canvas_flowchart_refresh_id = None
+        ops = self._canvas_flowchart_ops
+        if not ops:
+            return
+        baked = self._canvas_flowchart_baked
+        op_items = self._canvas_flowchart_items
+
+        try:
+            width = canvas.winfo_width()
+            height = canvas.winfo_height()
+            if width <= 1 or height <= 1:
+                # 尚未显示时按Canvas请求的尺寸估算
+                width = canvas.winfo_reqwidth()
+                height = canvas.winfo_reqheight()
+
+            def intersecting(margin):
+                vx0, vy0 = canvas.canvasx(0) - margin, canvas.canvasy(0) - margin
+                vx1, vy1 = canvas.canvasx(width) + margin, canvas.canvasy(height) + margin
+                return {i for i, ((x0, y0, x1, y1), _, _) in enumerate(ops)
+                        if x1 >= vx0 and x0 <= vx1 and y1 >= vy0 and y0 <= vy1}
+
+            visible = intersecting(_VIEWPORT_CREATE_MARGIN)
+            keep = intersecting(_VIEWPORT_KEEP_MARGIN)
+
+            # 删除已离开保留范围的图元
+            for i in [i for i in op_items if i not in keep]:
+                canvas.delete(*op_items.pop(i))
+
+            kept = sorted(op_items)
+            for i in sorted(visible - op_items.keys()):
+                (x0, y0, x1, y1), kind, args = ops[i]
+                items = []
+                if kind == 'node':
+                    func_name, fill_color, text_color = args
+                    if not baked:
+                        items.append(canvas.create_rectangle(x0, y0, x1, y1, fill=fill_color, outline="black",
+                                                             width=2, tags="culled"))
+                    items.append(canvas.create_text((x0 + x1) / 2, (y0 + y1) / 2, text=func_name,
+                                                    font=("Microsoft YaHei", 10, "bold"),
+                                                    fill=text_color, width=x1 - x0 - 10, tags="culled"))
+                elif not baked:
+                    items.append(canvas.create_line(*args, fill="black", width=2, arrow=tk.LAST, tags="culled"))
+                if not items:
+                    continue
+                # 放到ops顺序中后一个已有图元之下
+                pos = bisect.bisect_right(kept, i)
+                if pos < len(kept):
+                    for item in items:
+                        canvas.tag_lower(item, op_items[kept[pos]][0])
+                op_items[i] = tuple(items)
+            # 图例保持在最上层
+            canvas.tag_raise("legend")
+        except tk.TclError:
+            pass  # Canvas已销毁
+
     def _add_nodes_to_graph(self, G, tree_node, parent=None):
         """递归添加节点到NetworkX图"""
         if not tree_node:
@@ -8036,13 +9765,8 @@ class MCUAnalyzerGUI:
             self._add_nodes_to_graph(G, child, func_name)
 
     def _get_node_type(self, func_name):
-        """获取节点类型"""
-        if func_name == 'main':
-            return 'main'
-        elif func_name.startswith(('HAL_', 'GPIO_', 'UART_', 'SPI_', 'I2C_', 'TIM_', 'ADC_', 'DMA_')):
-            return 'interface'
-        else:
-            return 'user'
+        """获取节点类型（见_classify_node）"""
+        return ('main', 'interface', 'user')[_classify_node(func_name)]
 
     def _create_hierarchical_layout(self, G, root_node):
         """创建层次化布局"""
@@ -8133,7 +9857,7 @@ class MCUAnalyzerGUI:
     def show_mermaid_source(self):
         """显示Mermaid源码"""
         try:
-            if not hasattr(self, 'mermaid_code') or not self.mermaid_code:
+            if not self.mermaid_code:
                 messagebox.showinfo("提示", "请先进行分析并生成流程图")
                 return
 
@@ -8165,8 +9889,7 @@ class MCUAnalyzerGUI:
 
             # 复制按钮
             def copy_to_clipboard():
-                source_window.clipboard_clear()
-                source_window.clipboard_append(self.mermaid_code)
+                self.copy_mermaid_code_to_clipboard()
                 messagebox.showinfo("成功", "Mermaid源码已复制到剪贴板")
 
             copy_btn = ttk.Button(
@@ -8190,7 +9913,7 @@ class MCUAnalyzerGUI:
     def export_mermaid_graph(self):
         """导出Mermaid图形"""
         try:
-            if not hasattr(self, 'mermaid_code') or not self.mermaid_code:
+            if not self.mermaid_code:
                 messagebox.showinfo("提示", "请先进行分析并生成流程图")
                 return
 
@@ -8283,42 +10006,30 @@ class MCUAnalyzerGUI:
         """尝试使用mermaid-cli导出图片"""
         try:
             import subprocess
-            import tempfile
             import os
 
             # 检查mermaid-cli是否可用
             try:
-                result = subprocess.run(['mmdc', '--version'], capture_output=True, text=True, timeout=5)
+                result = subprocess.run(['mmdc', '--version'], capture_output=True, text=True, timeout=5,
+                                        **_SUBPROC_KWARGS)
                 if result.returncode != 0:
                     return False
             except:
                 return False
 
-            # 创建临时Mermaid文件
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.mmd', delete=False, encoding='utf-8') as f:
-                f.write(self.mermaid_code)
-                mmd_file = f.name
-
-            try:
-                # 使用mermaid-cli转换
-                cmd = ['mmdc', '-i', mmd_file, '-o', file_path]
-                if format_type == 'svg':
-                    cmd.extend(['-f', 'svg'])
-                elif format_type == 'png':
-                    # 删除固定尺寸参数，仅支持在线渲染
-                    cmd.extend(['-f', 'png'])
-
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-                success = result.returncode == 0 and os.path.exists(file_path)
+            # 使用mermaid-cli转换，Mermaid代码经stdin传入，无需临时文件
+            cmd = ['mmdc', '-i', '-', '-o', file_path]
+            if format_type == 'svg':
+                cmd.extend(['-f', 'svg'])
+            elif format_type == 'png':
+                # 删除固定尺寸参数，仅支持在线渲染
+                cmd.extend(['-f', 'png'])
 
-                return success
+            result = subprocess.run(cmd, input=self.mermaid_code, capture_output=True, text=True, timeout=30,
+                                    **_SUBPROC_KWARGS)
+            success = result.returncode == 0 and os.path.exists(file_path)
 
-            finally:
-                # 清理临时文件
-                try:
-                    os.unlink(mmd_file)
-                except:
-                    pass
+            return success
 
         except Exception as e:
             self.log_message(f"🔧 DEBUG: Export image failed: {e}")
@@ -8328,14 +10039,14 @@ class MCUAnalyzerGUI:
         """清空图形显示"""
         if MATPLOTLIB_AVAILABLE and hasattr(self, 'graph_figure'):
             self.graph_figure.clear()
-            self.graph_canvas.draw()
+            self.graph_canvas.draw_idle()
             # 安全地更新状态标签
-            if hasattr(self, 'graph_status_label'):
+            if self.graph_status_label is not None:
                 try:
                     self.graph_status_label.config(text="已清空")
                 except tk.TclError:
                     self.log_message("🔧 DEBUG: graph_status_label已被销毁，无法更新状态")
-            self.log_message("🔧 DEBUG: Graph display cleared")
+            self.debug_log("Graph display cleared")
         elif hasattr(self, 'graph_display_text'):
             self.graph_display_text.config(state=tk.NORMAL)
             self.graph_display_text.delete(1.0, tk.END)
@@ -9113,7 +10824,7 @@ Chip Information:
 
 把上面C代码分析后画出mermaid流程图。"""
 
-            self.log_message(f"🔧 DEBUG: 已生成基于main函数文件的用户提示词，文件: {main_file_path}")
+            self.debug_log("已生成基于main函数文件的用户提示词，文件: %s", main_file_path)
             return prompt
 
         except Exception as e:
@@ -9133,7 +10844,7 @@ Chip Information:
             # main函数应该在call_tree的根节点
             if call_tree.get('name') == 'main' and 'file' in call_tree:
                 file_path = call_tree['file']
-                self.log_message(f"🔧 DEBUG: 找到main函数文件路径: {file_path}")
+                self.debug_log("找到main函数文件路径: %s", file_path)
                 return file_path
 
             return None
@@ -9522,7 +11233,7 @@ Chip Information:
             'code_analysis': getattr(self, 'last_code_analysis', {}),
             'call_analysis': getattr(self, 'last_call_analysis', {}),
             'interfaces': getattr(self, 'last_interfaces', {}),
-            'mermaid_code': getattr(self, 'mermaid_code', '')
+            'mermaid_code': self.mermaid_code
         }
         return data
 
@@ -9672,7 +11383,7 @@ Chip Information:
             if matches:
                 # 返回第一个找到的Mermaid代码块
                 mermaid_code = matches[0].strip()
-                self.log_message(f"🔧 DEBUG: 从LLM结果中提取到Mermaid代码，长度: {len(mermaid_code)}")
+                self.debug_log("从LLM结果中提取到Mermaid代码，长度: %s", len(mermaid_code))
                 return mermaid_code
 
             # 尝试其他可能的格式
@@ -9686,7 +11397,7 @@ Chip Information:
                 matches = re.findall(pattern, llm_content, re.DOTALL | re.IGNORECASE)
                 if matches:
                     mermaid_code = matches[0].strip()
-                    self.log_message(f"🔧 DEBUG: 使用备用模式提取到Mermaid代码，长度: {len(mermaid_code)}")
+                    self.debug_log("使用备用模式提取到Mermaid代码，长度: %s", len(mermaid_code))
                     return mermaid_code
 
             self.log_message("🔧 DEBUG: 未在LLM结果中找到Mermaid代码")
@@ -9751,7 +11462,7 @@ Chip Information:
             self.log_message("🔄 开始渲染LLM结果中的Mermaid流程图...")
 
             # 临时保存当前的mermaid_code，以便使用现有的渲染方法
-            original_mermaid_code = getattr(self, 'mermaid_code', '')
+            original_mermaid_code = self.mermaid_code
             self.mermaid_code = mermaid_code
 
             # 尝试本地Playwright渲染
@@ -9796,7 +11507,8 @@ Chip Information:
             theme = self.config.get('mermaid', {}).get('theme', 'default')
             scale = self.config.get('mermaid', {}).get('scale', 2.0)
 
-            self.log_message(f"🔧 DEBUG: LLM Mermaid Playwright渲染 - Size: {width}x{height}, Theme: {theme}, Scale: {scale}x")
+            self.debug_log("LLM Mermaid Playwright渲染 - Size: %sx%s, Theme: %s, Scale: %sx",
+                           width, height, theme, scale)
 
             # 渲染为PIL图像
             pil_image = render_mermaid_to_pil(
@@ -9808,12 +11520,12 @@ Chip Information:
             )
 
             if pil_image:
-                self.log_message(f"🔧 DEBUG: LLM Mermaid Playwright渲染成功，图像尺寸: {pil_image.size}")
+                self.debug_log("LLM Mermaid Playwright渲染成功，图像尺寸: %s", pil_image.size)
                 # 在UI线程中显示图像
                 self.root.after(0, lambda: self.display_llm_mermaid_image_from_pil(pil_image))
                 return True
             else:
-                self.log_message("🔧 DEBUG: LLM Mermaid Playwright渲染返回None")
+                self.debug_log("LLM Mermaid Playwright渲染返回None")
                 return False
 
         except Exception as e:
@@ -9828,14 +11540,14 @@ Chip Information:
             from PIL import Image, ImageTk
             import io
 
-            self.log_message("🔧 DEBUG: LLM Mermaid尝试在线渲染")
+            self.debug_log("LLM Mermaid尝试在线渲染")
 
             # 获取在线渲染配置
             mermaid_config = self.config.get('mermaid', {})
             online_config = mermaid_config.get('online', {})
 
             if not online_config.get('enabled', True):
-                self.log_message("🔧 DEBUG: LLM Mermaid在线渲染已禁用")
+                self.debug_log("LLM Mermaid在线渲染已禁用")
                 return False
 
             # 使用kroki.io服务
@@ -9845,7 +11557,7 @@ Chip Information:
             encoded_diagram = base64.urlsafe_b64encode(self.mermaid_code.encode('utf-8')).decode('ascii')
             full_url = f"{kroki_url}/{encoded_diagram}"
 
-            self.log_message(f"🔧 DEBUG: LLM Mermaid请求URL长度: {len(full_url)}")
+            self.debug_log("LLM Mermaid请求URL长度: %s", len(full_url))
 
             # 发送请求
             response = requests.get(full_url, timeout=30)
@@ -9853,7 +11565,7 @@ Chip Information:
             if response.status_code == 200:
                 # 转换为PIL图像
                 pil_image = Image.open(io.BytesIO(response.content))
-                self.log_message(f"🔧 DEBUG: LLM Mermaid在线渲染成功，图像尺寸: {pil_image.size}")
+                self.debug_log("LLM Mermaid在线渲染成功，图像尺寸: %s", pil_image.size)
 
                 # 在UI线程中显示图像
                 self.root.after(0, lambda: self.display_llm_mermaid_image_from_pil(pil_image))
@@ -9893,7 +11605,7 @@ Chip Information:
             if scale < 1.0:
                 new_width = int(img_width * scale)
                 new_height = int(img_height * scale)
-                pil_image = pil_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                pil_image = pil_image.resize((new_width, new_height), Image.Resampling.LANCZOS, reducing_gap=2.0)
 
             # 转换为Tkinter图像
             tk_image = ImageTk.PhotoImage(pil_image)
@@ -9947,7 +11659,7 @@ Chip Information:
         self.root.mainloop()
 
     def log_message(self, message):
-        """添加日志消息"""
+        """添加日志消息（总是输出，用于错误和提示；调试跟踪日志使用debug_log）"""
         timestamp = datetime.now().strftime("%H:%M:%S")
         log_line = f"[{timestamp}] {message}\n"
 
@@ -9957,9 +11669,15 @@ Chip Information:
 
         self.root.after(0, append_log)
 
-    def debug_log(self, message):
-        """输出debug信息到log页面"""
-        self.log_message(f"🔧 DEBUG: {message}")
+    def debug_log(self, message, *args):
+        """输出debug信息到log页面（仅app.debug开启时）
+
+        给出args时按message % args格式化，只在真正输出时才把较大的对象转成字符串
+        """
+        if self._debug:
+            if args:
+                message = message % args
+            self.log_message(f"{_DEBUG_LOG_PREFIX} {message}")
 
     def export_high_quality_image(self):
         """导出最高质量的流程图图片"""
@@ -9967,7 +11685,7 @@ Chip Information:
             self.log_message("📸 开始导出高质量图片...")
 
             # 检查是否有mermaid代码
-            if not hasattr(self, 'mermaid_code') or not self.mermaid_code:
+            if not self.mermaid_code:
                 messagebox.showwarning("导出失败", "没有可导出的流程图\n请先进行项目分析生成流程图")
                 return
 
@@ -10011,7 +11729,7 @@ Chip Information:
     def export_svg_image(self, file_path):
         """导出SVG格式图片"""
         try:
-            self.log_message("🔧 DEBUG: 开始导出SVG格式...")
+            self.debug_log("开始导出SVG格式...")
 
             # 使用在线API获取SVG
             svg_content = self.get_high_quality_svg()
@@ -10019,7 +11737,7 @@ Chip Information:
             if svg_content:
                 with open(file_path, 'w', encoding='utf-8') as f:
                     f.write(svg_content)
-                self.log_message(f"🔧 DEBUG: SVG文件已保存: {file_path}")
+                self.debug_log("SVG文件已保存: %s", file_path)
                 return True
             else:
                 self.log_message("🔧 DEBUG: 无法获取SVG内容")
@@ -10032,7 +11750,7 @@ Chip Information:
     def export_png_image(self, file_path, format_type='png'):
         """导出PNG/JPG格式图片"""
         try:
-            self.log_message(f"🔧 DEBUG: 开始导出{format_type.upper()}格式...")
+            self.debug_log("开始导出%s格式...", format_type.upper())
 
             # 使用在线API获取高质量PNG
             png_content = self.get_high_quality_png()
@@ -10044,7 +11762,7 @@ Chip Information:
 
                 with open(file_path, 'wb') as f:
                     f.write(png_content)
-                self.log_message(f"🔧 DEBUG: {format_type.upper()}文件已保存: {file_path}")
+                self.debug_log("%s文件已保存: %s", format_type.upper(), file_path)
                 return True
             else:
                 self.log_message("🔧 DEBUG: 无法获取PNG内容")
@@ -10060,7 +11778,7 @@ Chip Information:
             import requests
             import urllib.parse
 
-            self.log_message("🔧 DEBUG: 请求高质量SVG...")
+            self.debug_log("请求高质量SVG...")
 
             # 使用kroki.io API获取SVG
             mermaid_encoded = urllib.parse.quote(self.mermaid_code.encode('utf-8'))
@@ -10073,13 +11791,13 @@ Chip Information:
 
             for api_url in api_endpoints:
                 try:
-                    self.log_message(f"🔧 DEBUG: 尝试API: {api_url[:50]}...")
+                    self.debug_log("尝试API: %s...", api_url[:50])
 
                     response = requests.get(api_url, timeout=30)
                     if response.status_code == 200:
                         svg_content = response.text
                         if svg_content and '<svg' in svg_content:
-                            self.log_message("🔧 DEBUG: 成功获取SVG内容")
+                            self.debug_log("成功获取SVG内容")
                             return svg_content
 
                 except Exception as e:
@@ -10100,7 +11818,7 @@ Chip Information:
             import urllib.parse
             import base64
 
-            self.log_message("🔧 DEBUG: 请求高质量PNG...")
+            self.debug_log("请求高质量PNG...")
 
             # 计算最佳尺寸和DPI
             optimal_width, optimal_height, optimal_dpi = self.calculate_optimal_png_size()
@@ -10116,7 +11834,7 @@ Chip Information:
 
             for api_url in api_endpoints:
                 try:
-                    self.log_message(f"🔧 DEBUG: 尝试PNG API: {api_url[:50]}...")
+                    self.debug_log("尝试PNG API: %s...", api_url[:50])
 
                     # 添加高质量参数
                     headers = {
@@ -10128,7 +11846,7 @@ Chip Information:
                     if response.status_code == 200:
                         png_content = response.content
                         if png_content and len(png_content) > 1000:  # 确保是有效的PNG
-                            self.log_message(f"🔧 DEBUG: 成功获取PNG内容，大小: {len(png_content)} bytes")
+                            self.debug_log("成功获取PNG内容，大小: %s bytes", len(png_content))
                             return png_content
 
                 except Exception as e:
@@ -10148,7 +11866,7 @@ Chip Information:
             from PIL import Image
             import io
 
-            self.log_message("🔧 DEBUG: 转换PNG到JPG...")
+            self.debug_log("转换PNG到JPG...")
 
             # 读取PNG
             png_image = Image.open(io.BytesIO(png_content))
@@ -10166,7 +11884,7 @@ Chip Information:
             jpg_buffer = io.BytesIO()
             png_image.save(jpg_buffer, format='JPEG', quality=95, optimize=True)
 
-            self.log_message("🔧 DEBUG: PNG到JPG转换成功")
+            self.debug_log("PNG到JPG转换成功")
             return jpg_buffer.getvalue()
 
         except Exception as e:
@@ -10203,12 +11921,35 @@ Chip Information:
 
         self.root.after(0, update_ui)
 
+    def close_mermaid_worker(self):
+        """关闭常驻的Playwright Mermaid渲染器（模块未导入过时无需处理）"""
+        renderer_module = sys.modules.get('utils.playwright_mermaid_renderer')
+        if renderer_module is not None:
+            renderer_module.shutdown()
+
     def on_closing(self):
         """应用程序关闭时的清理工作"""
         try:
             # 保存当前项目路径到配置文件
             if hasattr(self, 'project_path_var') and self.project_path_var.get().strip():
                 self.save_last_project_path(self.project_path_var.get().strip())
+            # 立即写出尚未落盘的配置
+            self.flush_config()
+
+            # 关闭常驻Mermaid渲染器
+            self.close_mermaid_worker()
+            self._render_pool.shutdown(wait=False)
+            self._resize_pool.shutdown(wait=False)
+            self._matplotlib_figure_cache.clear()
+
+            # 删除mermaid-cli配置和本进程的Mermaid HTML临时目录
+            if self._mermaid_config_path:
+                try:
+                    os.unlink(self._mermaid_config_path)
+                except OSError:
+                    pass
+            if self._mermaid_html_dir:
+                shutil.rmtree(self._mermaid_html_dir, ignore_errors=True)
 
             print(loc.get_text('application_closing'))
             self.root.quit()
@@ -7,6 +7,8 @@ import os
 import tempfile
 import base64
 import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Tuple, Union
 from PIL import Image
@@ -19,6 +21,21 @@ class PlaywrightMermaidRenderer:
         self.playwright = None
         self.browser = None
         self._initialized = False
+        # Playwright同步API只能在启动它的线程中使用，所有浏览器操作都交给这个专用线程
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _call_in_browser_thread(self, func, *args, **kwargs):
+        """在浏览器专用线程中执行func并等待结果（可从任意线程调用）"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="playwright-mermaid")
+            executor = self._executor
+        return executor.submit(func, *args, **kwargs).result()
+
+    def is_ready(self) -> bool:
+        """浏览器是否已成功启动（启动失败或已关闭时为False）"""
+        return self._initialized
 
     def _initialize_playwright(self):
         """初始化Playwright"""
@@ -166,6 +183,10 @@ class PlaywrightMermaidRenderer:
     def render_to_png(self, mermaid_code: str, width: int = 1200, height: int = 800,
                      theme: str = "default", scale: float = 2.0) -> Optional[bytes]:
         """渲染Mermaid为PNG字节数据"""
+        return self._call_in_browser_thread(self._render_to_png, mermaid_code, width, height, theme, scale)
+
+    def _render_to_png(self, mermaid_code, width, height, theme, scale):
+        """render_to_png的实现（在浏览器专用线程中执行）"""
 
         if not self._initialize_playwright():
             return None
@@ -256,6 +277,10 @@ class PlaywrightMermaidRenderer:
 
     def render_to_svg(self, mermaid_code: str, theme: str = "default") -> Optional[str]:
         """渲染Mermaid为SVG字符串"""
+        return self._call_in_browser_thread(self._render_to_svg, mermaid_code, theme)
+
+    def _render_to_svg(self, mermaid_code, theme):
+        """render_to_svg的实现（在浏览器专用线程中执行）"""
 
         if not self._initialize_playwright():
             return None
@@ -323,7 +348,18 @@ class PlaywrightMermaidRenderer:
             return None
 
     def close(self):
-        """关闭浏览器和Playwright"""
+        """关闭浏览器和Playwright，并结束浏览器专用线程"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        try:
+            executor.submit(self._close).result()
+        finally:
+            executor.shutdown(wait=False)
+
+    def _close(self):
+        """close的实现（在浏览器专用线程中执行）"""
         try:
             if self.browser:
                 self.browser.close()
@@ -336,7 +372,10 @@ class PlaywrightMermaidRenderer:
 
     def __del__(self):
         """析构函数"""
-        self.close()
+        try:
+            self.close()
+        except Exception:
+            pass  # 解释器退出时线程池可能已不可用
 
 
 # 全局渲染器实例
@@ -349,6 +388,13 @@ def get_mermaid_renderer() -> PlaywrightMermaidRenderer:
         _global_renderer = PlaywrightMermaidRenderer()
     return _global_renderer
 
+def shutdown():
+    """关闭全局渲染器（若已创建）；之后再调用get_mermaid_renderer会创建新的实例"""
+    global _global_renderer
+    renderer, _global_renderer = _global_renderer, None
+    if renderer is not None:
+        renderer.close()
+
 def render_mermaid_to_pil(mermaid_code: str, width: int = 1200, height: int = 800,
                          theme: str = "default", scale: float = 2.0) -> Optional[Image.Image]:
     """便捷函数：渲染Mermaid为PIL Image"""